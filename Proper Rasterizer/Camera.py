@@ -16,11 +16,22 @@ class Camera:
 
         self.aspect = aspect
 
-        self.projectionMatrix = self.getProjectionMatrix()
-
         self.rotX = 0
         self.rotY = 0
 
+        # the matrices are rebuilt when the pose or the lens changed, every consumer gets the same arrays
+        self.viewMatrix = np.identity(4, "f")
+        self.inverseViewMatrix = np.identity(4, "f")
+        self.projectionMatrix = np.identity(4, "f")
+        self.inverseProjectionMatrix = np.identity(4, "f")
+        self.viewProjectionMatrix = np.identity(4, "f")
+        self.inverseViewProjectionMatrix = np.identity(4, "f")
+
+        self.viewKey = None
+        self.projectionKey = None
+
+        self.updateMatrices()
+
     def rotate_local(self, x: float, y: float):
         """
         Rotates the camera by the given amount.
@@ -37,7 +48,60 @@ class Camera:
         self.rotX = np.min([np.max([self.rotX, -90]), 90])
 
 
+    def updateMatrices(self):
+        '''
+        Rebuilds the cached view and projection matrices, their product and their inverses,
+        if the position, rotation or lens of the camera changed since they were last built.
+        '''
+        viewKey = (self.transform.version, self.rotX, self.rotY)
+        projectionKey = (self.fov, self.aspect, self.near, self.far)
+
+        if viewKey == self.viewKey and projectionKey == self.projectionKey:
+            return
+
+        if projectionKey != self.projectionKey:
+            projection = self.calculateProjectionMatrix()
+
+            self.projectionMatrix[:] = projection
+            self.inverseProjectionMatrix[:] = np.linalg.inv(projection)
+
+            self.projectionKey = projectionKey
+
+        if viewKey != self.viewKey:
+            position = self.transform.position
+            rotation = np.matmul(Transform.RotationMatrixX(self.rotX), Transform.RotationMatrixY(self.rotY))[:3, :3]
+
+            # V = R T, a rotation after the translation, so the inverse is T^-1 R^T
+            self.viewMatrix[:3, :3] = rotation
+            self.viewMatrix[:3, 3] = rotation @ position
+
+            self.inverseViewMatrix[:3, :3] = rotation.T
+            self.inverseViewMatrix[:3, 3] = -position
+
+            self.viewKey = viewKey
+
+        np.matmul(self.projectionMatrix, self.viewMatrix, out=self.viewProjectionMatrix)
+        np.matmul(self.inverseViewMatrix, self.inverseProjectionMatrix, out=self.inverseViewProjectionMatrix)
+
     def getProjectionMatrix(self):
+        '''
+        Returns the projection matrix for the camera.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 4x4 projection matrix
+        '''
+        self.updateMatrices()
+        return self.projectionMatrix
+
+    def getInverseProjectionMatrix(self):
+        '''
+        Returns the inverse of the projection matrix, mapping clip space back into view space.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 4x4 inverse projection matrix
+        '''
+        self.updateMatrices()
+        return self.inverseProjectionMatrix
+
+    def calculateProjectionMatrix(self):
         '''
         Calculates the projection matrix for the camera.
         :return: the 4x4 projection matrix
@@ -135,18 +199,42 @@ class Camera:
     def getViewMatrix(self):
         '''
         Returns a view matrix for the camera.
+        The matrix is cached and shared, it must not be modified by the caller.
 
         :return: the 4x4 view matrix
         '''
-        #R = self.transform.rotation.ToMatrix()
-        T = self.transform.getTranslationMatrix()
+        self.updateMatrices()
+        return self.viewMatrix
+
+    def getInverseViewMatrix(self):
+        '''
+        Returns the inverse of the view matrix, mapping view space back into world space.
+        The matrix is cached and shared, it must not be modified by the caller.
+
+        :return: the 4x4 inverse view matrix
+        '''
+        self.updateMatrices()
+        return self.inverseViewMatrix
+
+    def getViewProjectionMatrix(self):
+        '''
+        Returns the projection matrix times the view matrix, mapping world space into clip space.
+        The matrix is cached and shared, it must not be modified by the caller.
 
-        R_X = Transform.RotationMatrixX(self.rotX)
-        R_Y = Transform.RotationMatrixY(self.rotY)
+        :return: the 4x4 view projection matrix
+        '''
+        self.updateMatrices()
+        return self.viewProjectionMatrix
 
-        R = np.matmul(R_X, R_Y)
+    def getInverseViewProjectionMatrix(self):
+        '''
+        Returns the inverse of the view projection matrix, mapping clip space back into world space.
+        The matrix is cached and shared, it must not be modified by the caller.
 
-        return np.matmul(R, T)
+        :return: the 4x4 inverse view projection matrix
+        '''
+        self.updateMatrices()
+        return self.inverseViewProjectionMatrix
 
     @staticmethod
     def lookAt(pos, target, up):
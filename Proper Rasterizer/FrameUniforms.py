@@ -0,0 +1,62 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+from Shader import FRAME_BINDING, FRAME_DTYPE
+from Camera import Camera
+from Light import Light
+
+class FrameUniforms:
+    def __init__(self):
+        self.data = np.zeros((), FRAME_DTYPE)
+
+        self.buffer = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.buffer)
+        glBufferData(GL_UNIFORM_BUFFER, FRAME_DTYPE.itemsize, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+        # every shader reading the Frame block is bound to this binding point when it is linked
+        glBindBufferBase(GL_UNIFORM_BUFFER, FRAME_BINDING, self.buffer)
+
+    def update(self, camera: Camera, sun: Light, time: float):
+        """
+        Uploads the data of this frame, once before anything is drawn
+
+        :param camera: the camera the frame is drawn from
+        :param sun: the sun, its cascades need to be updated already
+        :param time: the time in seconds the shaders animate with
+        """
+        FrameUniforms.Pack(self.data, camera, sun, time)
+
+        glBindBuffer(GL_UNIFORM_BUFFER, self.buffer)
+        glBufferSubData(GL_UNIFORM_BUFFER, 0, FRAME_DTYPE.itemsize, self.data.reshape(1).view(np.float32))
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+    @staticmethod
+    def Pack(data: np.ndarray, camera: Camera, sun: Light, time: float):
+        """
+        Fills a FRAME_DTYPE record
+
+        :param data: the record to fill
+        :param camera: the camera the frame is drawn from
+        :param sun: the sun, its cascades need to be updated already
+        :param time: the time in seconds the shaders animate with
+        """
+        data["view"] = camera.getViewMatrix()
+        data["projection"] = camera.getProjectionMatrix()
+        data["inverseView"] = camera.getInverseViewMatrix()
+        data["inverseProjection"] = camera.getInverseProjectionMatrix()
+
+        data["lightSpaceMatrices"] = sun.cascadeMatrices
+        data["cascadeSplits"][:, 0] = sun.cascadeSplits
+
+        # the camera's transform holds the inverse of its position
+        data["camPos"] = -camera.transform.position
+        data["time"] = time
+        data["camFwd"][:3] = -camera.forward()
+        data["camUp"][:3] = camera.up()
+        data["camRight"][:3] = camera.right()
+
+        data["lightPos"][:3] = sun.transform.position
+        data["lightDir"][:3] = -sun.transform.position / np.linalg.norm(sun.transform.position)
+        data["sunColor"][:3] = sun.color
@@ -16,7 +16,6 @@ import time
 class InstancedField:
     def setup(self, camera: Camera, light: Light, worldYBounds: np.array, mesh: Mesh, albedo: Texture, opacity: Texture, normal: Texture, amount: int, spawnRadius: float):
         self.mesh = mesh
-        self.mesh.recalculate_normals()
 
         self.heightTexture = Texture.Load("textures/heightmap.png")
 
@@ -24,36 +23,6 @@ class InstancedField:
 
         glEnableClientState(GL_VERTEX_ARRAY)
 
-        # setup gpu instancing
-        self.vbo = glGenBuffers(1)
-        self.ibo = glGenBuffers(1)
-
-        # uv data
-        self.tbo = glGenBuffers(1)
-        # normals
-        self.nbo = glGenBuffers(1)
-
-        self.tangentbo = glGenBuffers(1)
-        self.bitangentbo = glGenBuffers(1)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBufferData(GL_ARRAY_BUFFER, self.mesh.vertices, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.mesh.faces, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.tbo)
-        glBufferData(GL_ARRAY_BUFFER, self.mesh.uvs, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.nbo)
-        glBufferData(GL_ARRAY_BUFFER, self.mesh.normals, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.tangentbo)
-        glBufferData(GL_ARRAY_BUFFER, self.mesh.tangents, GL_STATIC_DRAW)
-
-        glBindBuffer(GL_ARRAY_BUFFER, self.bitangentbo)
-        glBufferData(GL_ARRAY_BUFFER, self.mesh.bitangents, GL_STATIC_DRAW)
-
         self.albedo = albedo
         self.opacity = opacity
         self.normal = normal
@@ -66,92 +35,50 @@ class InstancedField:
 
         self.shadowMap = None
 
-    def draw(self, shader: Shader, time: float, isShadowMap: bool, viewIndex: int):
+    def draw(self, shader: Shader, isShadowMap: bool, viewIndex: int, cascade: int = 0):
         # both sided drawing
         glDisable(GL_CULL_FACE)
 
         shader.use()
 
-        glUniformMatrix4fv(shader.get_keyword("view"), 1, GL_TRUE, self.camera.getViewMatrix())
-        glUniformMatrix4fv(shader.get_keyword("projection"), 1, GL_TRUE, self.camera.projectionMatrix)
-        glUniform1f(shader.get_keyword("time"), time)
-
-        glUniform3fv(shader.get_keyword("sunPos"), 1, self.sun.transform.position)
-        glUniform3fv(shader.get_keyword("sunDirection"), 1, -self.sun.transform.position)
-        glUniform3fv(shader.get_keyword("sunColor"), 1, self.sun.color)
-
-        # lightSpaceMatrix
-        glUniformMatrix4fv(shader.get_keyword("lightSpaceMatrix"), 1, GL_TRUE, self.sun.getLightSpaceMatrix())
-        glUniform1i(shader.get_keyword("isShadowMap"), isShadowMap)
+        # the cascade rendered in the shadow map pass
+        shader.setMatrix("lightSpaceMatrix", self.sun.cascadeMatrices[cascade])
+        shader.setInt("isShadowMap", isShadowMap)
 
         self.albedo.use(0)
-        glUniform1i(shader.get_keyword("albedoMap"), 0)
+        shader.setInt("albedoMap", 0)
 
         if self.opacity != None:
             self.opacity.use(1)
-            glUniform1i(shader.get_keyword("opacityMap"), 1)
+            shader.setInt("opacityMap", 1)
 
-        glUniform1i(shader.get_keyword("useOpacityMap"), self.opacity != None)
+        shader.setInt("useOpacityMap", self.opacity != None)
 
         self.heightTexture.use(2)
-        glUniform1i(shader.get_keyword("heightMap"), 2)
+        shader.setInt("heightMap", 2)
 
         self.normal.use(3)
-        glUniform1i(shader.get_keyword("normalMap"), 3)
+        shader.setInt("normalMap", 3)
 
-        glActiveTexture(GL_TEXTURE3)
-        glBindTexture(GL_TEXTURE_2D, self.shadowMap)
-        glUniform1i(shader.get_keyword("shadowMap"), 3)
+        if not isShadowMap:
+            self.sun.useShadowMap(shader, self.shadowMap)
 
-        glUniform1f(shader.get_keyword("spawnRadius"), self.spawnRadius)
+        shader.setFloat("spawnRadius", self.spawnRadius)
         
-        glUniform2fv(shader.get_keyword("worldYBounds"), 1, self.worldYBounds)
+        shader.setFloat("worldYBounds", self.worldYBounds)
 
-        glUniform1i(shader.get_keyword("DEBUG_VIEW"), viewIndex)
+        shader.setInt("DEBUG_VIEW", viewIndex)
 
         #glActiveTexture(GL_TEXTURE0)
         #glBindTexture(GL_TEXTURE_2D, self.heightTexture)
         #glUniform1i(shader.get_keyword("heightMap"), 0)
 
-        # draw the grass and feed vertex data in location 0
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-
-        glEnableVertexAttribArray(0)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
-
-        # 1 = uv
-        glEnableVertexAttribArray(1)
-        glBindBuffer(GL_ARRAY_BUFFER, self.tbo)
-        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, 0, None)
-
-        # 2 = normals
-        glEnableVertexAttribArray(2)
-        glBindBuffer(GL_ARRAY_BUFFER, self.nbo)
-        glVertexAttribPointer(2, 3, GL_FLOAT, GL_FALSE, 0, None)
-
-        # 3 = tangents
-        glEnableVertexAttribArray(3)
-        glBindBuffer(GL_ARRAY_BUFFER, self.tangentbo)
-        glVertexAttribPointer(3, 3, GL_FLOAT, GL_FALSE, 0, None)
-
-        # 4 = bitangents
-        glEnableVertexAttribArray(4)
-        glBindBuffer(GL_ARRAY_BUFFER, self.bitangentbo)
-        glVertexAttribPointer(4, 3, GL_FLOAT, GL_FALSE, 0, None)
-        
-        # draw grass
-        glDrawElementsInstanced(GL_TRIANGLES, len(self.mesh.faces) * 3, GL_UNSIGNED_INT, None, self.amount)
-
-        glDisableVertexAttribArray(0)
-        glDisableVertexAttribArray(1)
-        glDisableVertexAttribArray(2)
-        glDisableVertexAttribArray(3)
-        glDisableVertexAttribArray(4)
+        # the instances are placed in the shader, so the level of detail can't follow their distance,
+        # shadow casters use the coarsest level since their silhouettes are blurred by the shadow map anyway
+        lod = len(self.mesh.lods) if isShadowMap else 0
 
-        glBindBuffer(GL_ARRAY_BUFFER, 0)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        # draw grass, the instances share the vertex array object of the mesh
+        self.mesh.draw(lod, self.amount)
 
         # enable back face culling
         glEnable(GL_CULL_FACE)
@@ -1,39 +1,109 @@
 from Transform import Transform
 from Camera import Camera
+from Shader import Shader, CASCADE_COUNT
+
+from OpenGL.GL import *
 
 import numpy as np
 
+# texture unit of the cascaded shadow map, apart from the units the materials use
+SHADOW_MAP_UNIT = 12
+
 class Light:
     def __init__(self, color: list, intensity: float):
         self.color = color
         self.intensity = intensity
         self.transform = Transform()
 
+        # the camera frustum is split into slices, each gets its own shadow map fitted around it
+        self.shadowDistance = 250
+        self.splitBlend = 0.9
+        # how far behind a slice, towards the light, shadow casters are still drawn
+        self.casterDistance = 500
+
+        self.cascadeMatrices = np.tile(np.identity(4, "f"), (CASCADE_COUNT, 1, 1))
+        self.cascadeSplits = np.zeros(CASCADE_COUNT, "f")
+
     def getDirection(self):
         """
         :return: the direction of the light in world space
         """
         return self.transform.forward()
 
-    def getLightProjection(self):
+    def getLightView(self):
+        """
+        :return: the view matrix for the light
         """
-        Projection matrix for the light.
-        
-        It needs to be big enough to cover the entire scene, but enough for shadows to be crisp.
+        return Camera.lookAt(self.transform.position, np.array([0,0,0]), np.array([0,1,0]))
 
-        :return: the projection matrix for the light
+    def updateCascades(self, camera: Camera, size: int):
         """
-        size = 250
-        return Camera.getOrthographicMatrix(-size, size, -size, size, -150, 600)
+        Fits the light space matrix of each cascade around its slice of the camera frustum.
 
-    def getLightView(self):
+        Each slice is enclosed in a sphere, so the size of a cascade doesn't change when the camera turns,
+        and the cascade only moves in whole texels, so the shadow edges don't flicker when the camera moves.
+
+        :param camera: the camera whose frustum the cascades cover
+        :param size: the resolution of each cascade's shadow map
         """
-        :return: the view matrix for the light
+        count = len(self.cascadeSplits)
+        far = min(self.shadowDistance, camera.far)
+        self.cascadeSplits[:] = Light.CascadeSplits(camera.near, far, count, self.splitBlend)
+
+        # the rotation of the light, the translation doesn't matter for an orthographic projection
+        lightView = self.getLightView()
+        cameraToLight = lightView @ camera.getInverseViewMatrix()
+
+        tan = np.tan(np.deg2rad(camera.fov) * 0.5)
+        corners = np.array([[x, y] for x in (-1, 1) for y in (-1, 1)])
+
+        near = camera.near
+        for cascade, split in enumerate(self.cascadeSplits):
+            # the eight corners of the slice in view space, the camera looks down -z
+            depths = np.repeat([near, split], 4)[:, None]
+            points = np.hstack((np.tile(corners, (2, 1)) * depths * [tan * camera.aspect, tan], -depths, np.ones_like(depths)))
+            points = (cameraToLight @ points.T).T[:, :3]
+
+            center = points.mean(axis=0)
+            radius = np.linalg.norm(points - center, axis=1).max()
+
+            # snap the center to the texel grid of the cascade
+            texel = 2 * radius / size
+            center[:2] = np.floor(center[:2] / texel) * texel
+
+            # the light looks down -z, so the distances along it are -z
+            projection = Camera.getOrthographicMatrix(center[0] - radius, center[0] + radius,
+                                                      center[1] - radius, center[1] + radius,
+                                                      -center[2] - radius - self.casterDistance, -center[2] + radius)
+
+            self.cascadeMatrices[cascade] = projection @ lightView
+            near = split
+
+    def useShadowMap(self, shader: Shader, shadowMap: int):
         """
-        return Camera.lookAt(self.transform.position, np.array([0,0,0]), np.array([0,1,0]))
+        Binds the cascaded shadow map for the shaders including shadows.glsl, the cascades are part of the frame uniforms
+
+        :param shader: the shader receiving the shadows
+        :param shadowMap: the depth texture array with one layer per cascade
+        """
+        glActiveTexture(GL_TEXTURE0 + SHADOW_MAP_UNIT)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, shadowMap)
+        shader.setInt("shadowMap", SHADOW_MAP_UNIT)
 
-    def getLightSpaceMatrix(self):
+    @staticmethod
+    def CascadeSplits(near: float, far: float, count: int, blend: float):
         """
-        :return: the light space matrix
+        The distances the cascades reach to, a blend of logarithmic and uniform splits of the view distance
+
+        :param near: the near plane of the camera
+        :param far: the distance the last cascade reaches to
+        :param count: the number of cascades
+        :param blend: 1 for logarithmic splits, which give the nearest cascades the most detail, 0 for uniform splits
+        :return: the far distance of each cascade
         """
-        return np.matmul(self.getLightProjection(), self.getLightView())
\ No newline at end of file
+        fractions = np.arange(1, count + 1) / count
+
+        logarithmic = near * (far / near) ** fractions
+        uniform = near + (far - near) * fractions
+
+        return blend * logarithmic + (1 - blend) * uniform
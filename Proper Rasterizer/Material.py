@@ -54,18 +54,18 @@ class Material:
         for index, name in enumerate(self.textures):
             texture = self.textures[name]
             texture.use(index+1) # 0 = shadow map
-            glUniform1i(shader.get_keyword(name), index+1)
+            shader.setInt(name, index+1)
 
         # material uniforms
-        glUniform2fv(shader.get_keyword("tiling"), 1, self.tiling)
-        glUniform2fv(shader.get_keyword("tiling_speed"), 1, np.array(self.tiling_speed, "f"))
+        shader.setFloat("tiling", self.tiling)
+        shader.setFloat("tiling_speed", self.tiling_speed)
 
-        glUniform1f(shader.get_keyword("Ka"), self.Ka)
-        glUniform1f(shader.get_keyword("Kd"), self.Kd)
-        glUniform1f(shader.get_keyword("Ks"), self.Ks)
+        shader.setFloat("Ka", self.Ka)
+        shader.setFloat("Kd", self.Kd)
+        shader.setFloat("Ks", self.Ks)
         
-        glUniform1f(shader.get_keyword("Ns"), self.Ns)
-        glUniform1f(shader.get_keyword("metallic"), self.metallic)
+        shader.setFloat("Ns", self.Ns)
+        shader.setFloat("metallic", self.metallic)
         
 
     def print(self):
@@ -32,24 +32,62 @@ class MathUtils:
         return a + t * (b - a)
 
     @staticmethod
-    def ProceduralQuad(heightMap: np.ndarray):
-        vertices = []
-        faces = []
-        uvs = []
-        
-        print(heightMap)
+    def FrustumPlanes(matrix: np.ndarray):
+        """
+        Extracts the six planes of the frustum of a view projection matrix (Gribb and Hartmann)
+        Works for perspective and orthographic projections alike
+
+        :param matrix: The 4x4 matrix mapping world space into clip space
+        :return: The 6x4 planes (left, right, bottom, top, near, far) as normal and distance, the normals point inwards
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+
+        # a point is inside when -w <= x, y, z <= w, each inequality is one plane
+        planes = np.concatenate((matrix[3] + matrix[:3], matrix[3] - matrix[:3]))[[0, 3, 1, 4, 2, 5]]
+
+        return planes / np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+
+    @staticmethod
+    def BoxesInFrustum(planes: np.ndarray, minimum: np.ndarray, maximum: np.ndarray):
+        """
+        Tests many axis aligned boxes against a frustum at once
+        A box is culled only if it lies fully outside one of the planes, so boxes near the corners may be kept
+
+        :param planes: The 6x4 frustum planes, from FrustumPlanes
+        :param minimum: The Nx3 minimum corners of the boxes
+        :param maximum: The Nx3 maximum corners of the boxes
+        :return: An N boolean array, True for the boxes that may be visible
+        """
+        center = (minimum + maximum) / 2
+        extent = (maximum - minimum) / 2
+
+        # the distance of the box center to each plane, and how far the box reaches towards it
+        distance = center @ planes[:, :3].T + planes[:, 3]
+        reach = extent @ np.abs(planes[:, :3]).T
+
+        return np.all(distance + reach >= 0, axis=1)
+
+    @staticmethod
+    def ProceduralQuad(heightMap: np.ndarray, strips: bool = False):
+        """
+        Creates a terrain mesh from a height map, one vertex per height sample
+
+        :param heightMap: The heights, indexed [y][x]
+        :param strips: Whether the mesh is drawn as triangle strips, one per row of quads
+        :return: The terrain mesh
+        """
+        heightMap = np.asarray(heightMap, dtype="f")
+        height, width = heightMap.shape
+
+        y, x = np.meshgrid(np.arange(height, dtype="f"), np.arange(width, dtype="f"), indexing="ij")
 
-        for y in range(len(heightMap)):
-            for x in range(len(heightMap[y])):
-                vertices.append([x, heightMap[y][x], y])
-                uvs.append([x / len(heightMap[y]), y / len(heightMap)])
+        vertices = np.stack((x, heightMap, y), axis=-1).reshape(-1, 3)
+        uvs = np.stack((x / width, y / height), axis=-1).reshape(-1, 2)
 
-        for y in range(len(heightMap) - 1):
-            for x in range(len(heightMap[y]) - 1):
-                faces.append([x + y * len(heightMap[y]), x + 1 + y * len(heightMap[y]), x + 1 + (y + 1) * len(heightMap[y])])
-                faces.append([x + y * len(heightMap[y]), x + 1 + (y + 1) * len(heightMap[y]), x + (y + 1) * len(heightMap[y])])
+        faces = Mesh.GridIndices(height, width)
+        strip = Mesh.GridIndices(height, width, True) if strips else None
 
-        quad_mesh = Mesh(np.array(vertices), np.array(faces), np.array([]), np.array(uvs))
+        quad_mesh = Mesh(vertices, faces, np.array([]), uvs, strip=strip)
         quad_mesh.recalculate_normals()
         quad_mesh.name = "Procedural Quad"
 
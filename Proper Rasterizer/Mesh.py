@@ -10,73 +10,182 @@ import Material
 
 from Programs import Programs
 
+import ctypes
+
+# interleaved vertex layout, attribute name and number of floats in the order they are stored
+VERTEX_LAYOUT = [("vertices", 3), ("normals", 3), ("uvs", 2), ("tangents", 3), ("bitangents", 3)]
+
+# number of floats per vertex
+VERTEX_STRIDE = sum(size for _, size in VERTEX_LAYOUT)
+
+# float offset of every attribute inside a vertex
+VERTEX_OFFSETS = {name: sum(size for _, size in VERTEX_LAYOUT[:index]) for index, (name, _) in enumerate(VERTEX_LAYOUT)}
+VERTEX_SIZES = dict(VERTEX_LAYOUT)
+
+# shader location of every attribute, shared by all shaders so one vertex array object fits every pass
+ATTRIBUTE_LOCATIONS = {"vertices": 0, "normals": 1, "uvs": 2, "tangents": 3, "bitangents": 4}
+
+# compact vertex format, 16 bytes per vertex: positions as normalized int16 relative to the bounds with the
+# bitangent sign in w, octahedral int8 normals and tangents, half float uvs, decoded by shaders/common/vertex_format.glsl
+COMPACT_DTYPE = np.dtype([("position", "<i2", 4), ("octahedral", "i1", 4), ("uv", "<f2", 2)])
+
+# shader location of the packed octahedral normal and tangent
+OCTAHEDRAL_LOCATION = 5
+
+# constant attributes set by every draw, how to turn the stored positions back into object space
+DECODE_SCALE_LOCATION = 6
+DECODE_OFFSET_LOCATION = 7
+
+# marks the end of a triangle strip in Mesh.strip, replaced by the primitive restart index of the uploaded index type
+STRIP_RESTART = np.iinfo(np.uint32).max
+
+# vertices between two dirty ranges below which they are uploaded as one, a few kilobytes cost less than another call
+DIRTY_MERGE_GAP = 64
+
+# distance, in bounding radii, at which the first simplified level of detail takes over, doubling for every further level
+LOD_DISTANCE = 8.0
+
 class Mesh:
-    def __init__(self, vertices: np.ndarray, faces: np.ndarray, normals: np.ndarray, uvs: np.ndarray):
-        self.vertices = vertices
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, normals: np.ndarray, uvs: np.ndarray, tangents: np.ndarray = None, bitangents: np.ndarray = None, lods: list = None, strip: np.ndarray = None, compact: bool = False):
+        # all vertex attributes live in one interleaved array, the attributes are views into it
+        self.vertexData = np.zeros((len(vertices), VERTEX_STRIDE), dtype="f")
+
+        for name, size in VERTEX_LAYOUT:
+            offset = VERTEX_OFFSETS[name]
+            setattr(self, name, self.vertexData[:, offset:offset + size])
+
+        self.vertices[:] = vertices
         self.faces = faces
 
-        self.normals = normals
-        self.uvs = uvs
+        # load_mesh fills in missing normals, meshes built in code without them get them from recalculate_normals
+        if len(normals) == len(vertices):
+            self.normals[:] = normals
+        if len(uvs) == len(vertices):
+            self.uvs[:] = uvs
 
-        self.vbo = glGenBuffers(1) #vertex positions
-        self.ibo = glGenBuffers(1) #indices
+        # simplified index buffers over the same vertices, every level has about half the triangles of the previous one
+        self.lods = list(lods) if lods is not None else []
 
-        self.nbo = glGenBuffers(1) #normals
-        self.tbo = glGenBuffers(1) #texture coordinates
+        # optional triangle strips over the same triangles as faces, separated by STRIP_RESTART, drawn instead of faces
+        self.strip = strip
 
-        self.tanbo = glGenBuffers(1) #tangents
-        self.bitbo = glGenBuffers(1) #bitangents
+        # whether the GPU copy uses the 16 byte COMPACT_DTYPE instead of the float layout, the CPU arrays stay float
+        self.compact = compact
+
+        # GPU objects, created on the first draw, so meshes can be loaded and processed without a GL context,
+        # e.g. in worker processes or offline tools
+        self.vao = None #attribute layout
+        self.vbo = None #interleaved vertex data
+        self.ibo = None #indices of the mesh followed by the indices of every level of detail
+
+        # vertex ranges edited on the CPU since the last upload, as [start, stop) rows of vertexData
+        self.dirtyRanges = np.empty((0, 2), dtype=np.int64)
+        self.uploadedVertices = 0
 
         self.transform = Transform()
 
-        self.bounds = self.getBoundingBox()
+        # object space bounds, grown over the edited vertices whenever the vertex data is flushed
+        self.bounds = None
+        self.boundingSphere = None
+        # vertices edited since the bounds were last calculated from all vertices, see growBounds
+        self.editedVertices = 0
+
+        # world space bounds and the transform they were calculated for
+        self.worldBounds = None
+        self.worldBoundingSphere = None
+        self.worldBoundsKey = None
 
         self.material = None
 
         self.name = "unnamed"
 
-        LOG(f"Bounds (including scale): {self.bounds[0] * self.transform.scale} - {self.bounds[1] * self.transform.scale}")
-
         self.isIcon = False
 
         self.scripts = []
 
-        # normal map
-        self.tangents = np.zeros(self.vertices.shape, dtype="f")
-        self.bitangents = np.zeros(self.vertices.shape, dtype="f")
+        # normal map, only calculated when not supplied (e.g. by the mesh cache)
+        if tangents is None or bitangents is None:
+            self.calculateNormalMap()
+        else:
+            self.tangents[:] = tangents
+            self.bitangents[:] = bitangents
 
-        self.initialize()
-        self.calculateNormalMap()
+        self.updateBounds()
+
+        LOG(f"Bounds (including scale): {self.bounds[0] * self.transform.scale} - {self.bounds[1] * self.transform.scale}")
 
     def calculateNormalMap(self):
         """
-        Calculates the normal map of the mesh
+        Calculates the normal map of the mesh, i.e. the tangent and bitangent of every vertex
         """
-        for f in range(self.faces.shape[0]):
-            v0 = self.vertices[self.faces[f, 0]]
-            v1 = self.vertices[self.faces[f, 1]]
-            v2 = self.vertices[self.faces[f, 2]]
+        corners = self.faces.astype(np.intp)
+
+        positions = np.take(self.vertices, corners, axis=0)
+        texcoords = np.take(self.uvs, corners, axis=0)
+
+        v0, v1, v2 = positions[:, 0], positions[:, 1], positions[:, 2]
+        uv0, uv1, uv2 = texcoords[:, 0], texcoords[:, 1], texcoords[:, 2]
 
-            uv0 = self.uvs[self.faces[f, 0]]
-            uv1 = self.uvs[self.faces[f, 1]]
-            uv2 = self.uvs[self.faces[f, 2]]
+        deltaPos1 = v1 - v0
+        deltaPos2 = v2 - v0
 
-            deltaPos1 = v1 - v0
-            deltaPos2 = v2 - v0
+        deltaUV1 = uv1 - uv0
+        deltaUV2 = uv2 - uv0
 
-            deltaUV1 = uv1 - uv0
-            deltaUV2 = uv2 - uv0
+        # triangles without uv area (unmapped or collapsed uvs) have no defined tangent, they contribute nothing
+        determinant = deltaUV1[:, 0] * deltaUV2[:, 1] - deltaUV1[:, 1] * deltaUV2[:, 0]
+        degenerate = np.abs(determinant) < 1e-12
+        r = np.where(degenerate, 0.0, 1.0 / np.where(degenerate, 1.0, determinant))[:, None]
 
-            r = 1.0 / (deltaUV1[0] * deltaUV2[1] - deltaUV1[1] * deltaUV2[0])
-            tangent = (deltaPos1 * deltaUV2[1] - deltaPos2 * deltaUV1[1]) * r
-            bitangent = (deltaPos2 * deltaUV1[0] - deltaPos1 * deltaUV2[0]) * r
+        tangent = (deltaPos1 * deltaUV2[:, 1:2] - deltaPos2 * deltaUV1[:, 1:2]) * r
+        bitangent = (deltaPos2 * deltaUV1[:, 0:1] - deltaPos1 * deltaUV2[:, 0:1]) * r
 
-            for j in range(3):
-                self.tangents[self.faces[f,j],:] += tangent
-                self.bitangents[self.faces[f,j],:] += bitangent
+        # scatter every face to its three corners, one bincount per corner and component
+        vertexCount = len(self.vertices)
+        tangent = np.ascontiguousarray(tangent.T)
+        bitangent = np.ascontiguousarray(bitangent.T)
 
-        self.tangents /= np.linalg.norm(self.tangents, axis=1, keepdims=True)
-        self.bitangents /= np.linalg.norm(self.bitangents, axis=1, keepdims=True)
+        self.tangents[:] = 0
+        self.bitangents[:] = 0
+        for corner in range(3):
+            indices = np.ascontiguousarray(corners[:, corner])
+            for column in range(3):
+                self.tangents[:, column] += np.bincount(indices, tangent[column], vertexCount)
+                self.bitangents[:, column] += np.bincount(indices, bitangent[column], vertexCount)
+
+        Mesh.NormalizeTangents(self.tangents, self.bitangents, self.normals)
+
+    @staticmethod
+    def NormalizeTangents(tangents: np.ndarray, bitangents: np.ndarray, normals: np.ndarray):
+        """
+        Normalizes tangents and bitangents in place, vertices that only touch degenerate uv triangles
+        get an arbitrary frame perpendicular to their normal instead of NaNs
+
+        :param tangents: The accumulated tangents
+        :param bitangents: The accumulated bitangents
+        :param normals: The vertex normals
+        """
+        tangentLength = np.linalg.norm(tangents, axis=1)
+        bitangentLength = np.linalg.norm(bitangents, axis=1)
+
+        missing = (tangentLength < 1e-12) | (bitangentLength < 1e-12)
+
+        if np.any(missing):
+            normal = normals[missing]
+
+            # any axis that isn't parallel to the normal
+            axis = np.zeros_like(normal)
+            axis[np.arange(len(normal)), np.argmin(np.abs(normal), axis=1)] = 1
+
+            tangent = np.cross(normal, axis)
+            tangents[missing] = tangent
+            bitangents[missing] = np.cross(normal, tangent)
+
+            tangentLength = np.linalg.norm(tangents, axis=1)
+            bitangentLength = np.linalg.norm(bitangents, axis=1)
+
+        tangents /= np.maximum(tangentLength, 1e-12)[:, None]
+        bitangents /= np.maximum(bitangentLength, 1e-12)[:, None]
 
     def add_script(self, script):
         """
@@ -100,108 +209,514 @@ class Mesh:
         Returns the bounding box of the mesh, i.e. smallest box that contains the mesh
         
         :return: The bounding box of the mesh"""
-        min = [0, 0, 0]
-        max = [0, 0, 0]
+        if len(self.vertices) == 0:
+            return [np.zeros(3, dtype="f"), np.zeros(3, dtype="f")]
+
+        return [self.vertices.min(axis=0), self.vertices.max(axis=0)]
+
+    def getBoundingSphere(self):
+        """
+        Returns a bounding sphere of the mesh, centered on the bounding box
+
+        :return: The center and radius of the sphere
+        """
+        center = (self.bounds[0] + self.bounds[1]) / 2
+
+        if len(self.vertices) == 0:
+            return center, 0.0
+
+        return center, float(np.sqrt(np.max(np.einsum("ij,ij->i", self.vertices - center, self.vertices - center))))
+
+    def updateBounds(self):
+        """
+        Recalculates the object space bounds after the vertices changed
+        """
+        self.bounds = self.getBoundingBox()
+        self.boundingSphere = self.getBoundingSphere()
+        self.worldBoundsKey = None
+        self.editedVertices = 0
+
+    def growBounds(self, ranges: np.ndarray):
+        """
+        Extends the object space bounds over the edited vertices, so a small edit doesn't scan the whole mesh.
+
+        Vertices moved inwards leave the bounds larger than needed, they are recalculated from all vertices once
+        as many vertices were edited as the mesh has, which keeps the cost per edited vertex constant.
+
+        :param ranges: The edited vertices, as [start, stop) rows of vertexData
+        """
+        edited = int(np.sum(ranges[:, 1] - ranges[:, 0]))
+        if edited == 0:
+            return
 
-        for i in range(len(self.vertices)):
-            for j in range(len(self.vertices[i])):
-                if self.vertices[i][j] < min[j]:
-                    min[j] = self.vertices[i][j]
-                if self.vertices[i][j] > max[j]:
-                    max[j] = self.vertices[i][j]
+        self.editedVertices += edited
+        if self.bounds is None or self.editedVertices >= len(self.vertices):
+            self.updateBounds()
+            return
 
-        return [min, max]
+        vertices = np.concatenate([self.vertices[start:stop] for start, stop in ranges])
 
-    def recalculate_normals(self):
+        self.bounds = [np.minimum(self.bounds[0], vertices.min(axis=0)), np.maximum(self.bounds[1], vertices.max(axis=0))]
+
+        # the sphere keeps its center, it only grows to reach the edited vertices
+        center, radius = self.boundingSphere
+        offsets = vertices - center
+        self.boundingSphere = (center, max(radius, float(np.sqrt(np.max(np.einsum("ij,ij->i", offsets, offsets))))))
+
+        self.worldBoundsKey = None
+
+    def getWorldBoundingBox(self):
+        """
+        Returns the world space bounding box of the mesh, cached until the transform changes
+
+        :return: The minimum and maximum corner of the box
+        """
+        self.updateWorldBounds()
+        return self.worldBounds
+
+    def getWorldBoundingSphere(self):
+        """
+        Returns the world space bounding sphere of the mesh, cached until the transform changes
+
+        :return: The center and radius of the sphere
+        """
+        self.updateWorldBounds()
+        return self.worldBoundingSphere
+
+    def updateWorldBounds(self):
+        """
+        Transforms the object space bounds into world space, if the transform changed since the last call
+        """
+        transform = self.transform
+        key = (transform, transform.worldVersion)
+
+        if key == self.worldBoundsKey:
+            return
+
+        model = transform.getWorldMatrix()[:3]
+
+        # the box center moves with the matrix, the extent is spread over the axes by the absolute matrix
+        center = (self.bounds[0] + self.bounds[1]) / 2
+        extent = (self.bounds[1] - self.bounds[0]) / 2
+
+        worldCenter = model[:, :3] @ center + model[:, 3]
+        worldExtent = np.abs(model[:, :3]) @ extent
+
+        self.worldBounds = [worldCenter - worldExtent, worldCenter + worldExtent]
+
+        sphereCenter, radius = self.boundingSphere
+        # the radius grows with the longest axis of the matrix, which includes the scale of the parents
+        self.worldBoundingSphere = (model[:, :3] @ sphereCenter + model[:, 3], radius * float(np.max(np.linalg.norm(model[:, :3], axis=0))))
+
+        self.worldBoundsKey = key
+
+    def recalculate_normals(self, weighting: str = "area", dirty: np.ndarray = None):
         """
         Recalculates the normals of the mesh and updates the VBO
+
+        :param weighting: How the faces around a vertex are weighted, "area" or "angle"
+        :param dirty: Indices of the vertices to recalculate, e.g. the region touched by a terrain edit, all vertices if None
         """
-        self.normals = np.zeros(self.vertices.shape, dtype="f")
-        
-        for f in range(self.faces.shape[0]):
-            a = self.vertices[self.faces[f, 1]] - self.vertices[self.faces[f, 0]]
-            b = self.vertices[self.faces[f, 2]] - self.vertices[self.faces[f, 0]]
-            n = np.cross(a, b)
+        if dirty is None:
+            self.normals[:] = Mesh.VertexNormals(self.vertices, self.faces, weighting)
+        else:
+            dirty = np.asarray(dirty, dtype=np.intp)
+            self.normals[dirty] = Mesh.VertexNormals(self.vertices, self.faces, weighting, dirty)
 
-            for j in range(3):
-                self.normals[self.faces[f,j],:] += n
+        LOG(f"Recalculated normals for mesh {self.name} with {len(self.normals) if dirty is None else len(dirty)} normals")
 
-        self.normals /= np.linalg.norm(self.normals, axis=1, keepdims=True)
+        self.markDirty(dirty)
+        self.flush()
 
-        LOG(f"Recalculated normals for mesh {self.name} with {len(self.normals)} normals")
+    @staticmethod
+    def VertexNormals(vertices: np.ndarray, faces: np.ndarray, weighting: str = "area", dirty: np.ndarray = None):
+        """
+        Calculates smooth vertex normals by summing the normals of the faces around every vertex
+
+        :param vertices: The vertex positions
+        :param faces: The triangles
+        :param weighting: "area" weights faces by their area, "angle" by their angle at the vertex, which doesn't
+            depend on how the surface around the vertex is triangulated
+        :param dirty: Indices of the vertices to calculate, only the faces touching them are visited
+        :return: The unit normals of all vertices, or of the dirty vertices in the given order
+        """
+        if weighting not in ("area", "angle"):
+            raise ValueError(f"Unknown normal weighting {weighting}, expected 'area' or 'angle'")
 
-        self.initialize()
+        corners = faces.astype(np.intp)
 
-    def initialize(self):
+        if dirty is not None:
+            touched = np.zeros(len(vertices), dtype=bool)
+            touched[dirty] = True
+            corners = corners[touched[corners].any(axis=1)]
+
+        positions = np.take(vertices, corners, axis=0)
+        v0, v1, v2 = positions[:, 0], positions[:, 1], positions[:, 2]
+
+        # the cross product is as long as twice the triangle area, so summing it weights by area
+        faceNormals = np.cross(v1 - v0, v2 - v0)
+
+        if weighting == "area":
+            weights = [np.ascontiguousarray(faceNormals.T)] * 3
+        else:
+            lengths = np.linalg.norm(faceNormals, axis=1, keepdims=True)
+            unit = faceNormals / np.maximum(lengths, 1e-20)
+
+            def angle(a, b, c):
+                e1 = b - a
+                e2 = c - a
+                e1 = e1 / np.maximum(np.linalg.norm(e1, axis=1, keepdims=True), 1e-20)
+                e2 = e2 / np.maximum(np.linalg.norm(e2, axis=1, keepdims=True), 1e-20)
+                return np.arccos(np.clip(np.einsum("ij,ij->i", e1, e2), -1, 1))
+
+            weights = [np.ascontiguousarray((unit * angle(a, b, c)[:, None]).T) for a, b, c in ((v0, v1, v2), (v1, v2, v0), (v2, v0, v1))]
+
+        # scatter the weighted face normals to the corners, one bincount per corner and component
+        normals = np.zeros((len(vertices), 3), dtype=np.float64)
+        for corner in range(3):
+            indices = np.ascontiguousarray(corners[:, corner])
+            for column in range(3):
+                normals[:, column] += np.bincount(indices, weights[corner][column], len(vertices))
+
+        if dirty is not None:
+            normals = normals[dirty]
+
+        # vertices without any faces keep a zero normal
+        normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-20)
+
+        return normals
+
+    def __getstate__(self):
         """
-        Initializes the mesh, i.e. uploads the data to the GPU
+        Pickles the CPU side of the mesh, e.g. to return it from a worker process, the GPU objects stay behind
         """
-        glEnableClientState(GL_VERTEX_ARRAY)
+        state = self.__dict__.copy()
 
-        # vertex positions
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBufferData(GL_ARRAY_BUFFER, self.vertices, GL_STATIC_DRAW)
+        # the attributes are views into vertexData, they are restored from it
+        for name, _ in VERTEX_LAYOUT:
+            del state[name]
 
-        # indices (faces)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.faces, GL_STATIC_DRAW)
+        state["vao"] = state["vbo"] = state["ibo"] = None
+        state["uploadedVertices"] = 0
 
-        # normals
-        glBindBuffer(GL_ARRAY_BUFFER, self.nbo)
-        glBufferData(GL_ARRAY_BUFFER, self.normals, GL_STATIC_DRAW)
+        return state
 
-        # texture coordinates (UVs)
-        glBindBuffer(GL_ARRAY_BUFFER, self.tbo)
-        glBufferData(GL_ARRAY_BUFFER, self.uvs, GL_STATIC_DRAW)
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
 
-        # tangents
-        glBindBuffer(GL_ARRAY_BUFFER, self.tanbo)
-        glBufferData(GL_ARRAY_BUFFER, self.tangents, GL_STATIC_DRAW)
+        for name, size in VERTEX_LAYOUT:
+            offset = VERTEX_OFFSETS[name]
+            setattr(self, name, self.vertexData[:, offset:offset + size])
 
-        # bitangents
-        glBindBuffer(GL_ARRAY_BUFFER, self.bitbo)
-        glBufferData(GL_ARRAY_BUFFER, self.bitangents, GL_STATIC_DRAW)
+    def isUploaded(self):
+        """
+        :return: Whether the mesh has GPU buffers, i.e. has been drawn or initialized
+        """
+        return self.vao is not None
 
-    def draw(self):
+    def initialize(self):
         """
-        Draws the mesh using the currently bound shader
+        Initializes the mesh, i.e. uploads the data to the GPU and records the attribute layout in the vertex array object.
+        Called by the first draw, needs a current GL context
         """
-        glEnableClientState(GL_VERTEX_ARRAY)
+        if not self.isUploaded():
+            self.vao = glGenVertexArrays(1)
+            self.vbo = glGenBuffers(1)
+            self.ibo = glGenBuffers(1)
+
+        glBindVertexArray(self.vao)
+
+        # the compact format is quantized to the current bounds
+        self.decodeScale, self.decodeOffset = Mesh.PositionDecode(self.bounds) if self.compact else (np.ones(3, dtype="f"), np.zeros(3, dtype="f"))
 
-        glEnableVertexAttribArray(0)
+        # interleaved vertex data, edits are streamed into this storage by flush
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glBufferData(GL_ARRAY_BUFFER, self.gpuVertexData(0, len(self.vertexData)), GL_DYNAMIC_DRAW)
+
+        self.uploadedVertices = len(self.vertexData)
+        self.dirtyRanges = np.empty((0, 2), dtype=np.int64)
+
+        # indices (faces), 16 bit whenever the vertex count allows it to halve the index bandwidth,
+        # strips reserve the largest index for the primitive restart
+        indexDtype, self.indexType = Mesh.IndexFormat(len(self.vertexData) + (self.strip is not None))
+
+        levels = [self.faces] + self.lods
+        if self.strip is not None:
+            self.restartIndex = int(np.iinfo(indexDtype).max)
+            levels[0] = np.where(self.strip == STRIP_RESTART, self.restartIndex, self.strip)
+
+        # all levels share one index buffer, a level is drawn from its byte offset
+        counts = [faces.size for faces in levels]
+        self.indexOffsets = [int(offset) * np.dtype(indexDtype).itemsize for offset in np.cumsum([0] + counts[:-1])]
 
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, np.concatenate([np.ravel(faces) for faces in levels]).astype(indexDtype), GL_STATIC_DRAW)
+
+        if self.compact:
+            stride = COMPACT_DTYPE.itemsize
+            pointers = [
+                (ATTRIBUTE_LOCATIONS["vertices"], 4, GL_SHORT, GL_TRUE, COMPACT_DTYPE.fields["position"][1]),
+                (OCTAHEDRAL_LOCATION, 4, GL_BYTE, GL_TRUE, COMPACT_DTYPE.fields["octahedral"][1]),
+                (ATTRIBUTE_LOCATIONS["uvs"], 2, GL_HALF_FLOAT, GL_FALSE, COMPACT_DTYPE.fields["uv"][1]),
+            ]
+        else:
+            stride = VERTEX_STRIDE * 4
+            pointers = [(location, VERTEX_SIZES[name], GL_FLOAT, GL_FALSE, VERTEX_OFFSETS[name] * 4) for name, location in ATTRIBUTE_LOCATIONS.items()]
+
+        for location, size, type, normalized, offset in pointers:
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, size, type, normalized, stride, ctypes.c_void_p(offset))
+
+        # the element buffer binding is part of the vertex array object, so only unbind it afterwards
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
 
-        glEnableVertexAttribArray(1)
-        glBindBuffer(GL_ARRAY_BUFFER, self.nbo)
-        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 0, None)
+    def markDirty(self, dirty: np.ndarray = None):
+        """
+        Marks vertices edited on the CPU, so the next flush uploads them
+
+        :param dirty: Indices of the edited vertices, all vertices if None
+        """
+        if dirty is None:
+            ranges = np.array([[0, len(self.vertexData)]], dtype=np.int64)
+        else:
+            ranges = Mesh.DirtyRanges(dirty)
+
+        self.dirtyRanges = np.concatenate((self.dirtyRanges, ranges))
+
+    def flush(self):
+        """
+        Uploads the vertex ranges marked dirty into the existing buffer storage, only the edited vertices are sent
+        """
+        ranges = Mesh.MergeRanges(self.dirtyRanges)
+        self.dirtyRanges = np.empty((0, 2), dtype=np.int64)
 
-        glEnableVertexAttribArray(2)
-        glBindBuffer(GL_ARRAY_BUFFER, self.tbo)
-        glVertexAttribPointer(2, 2, GL_FLOAT, GL_FALSE, 0, None)
+        self.growBounds(ranges)
 
-        glEnableVertexAttribArray(3)
-        glBindBuffer(GL_ARRAY_BUFFER, self.tanbo)
-        glVertexAttribPointer(3, 3, GL_FLOAT, GL_FALSE, 0, None)
+        if not self.isUploaded():
+            # everything gets uploaded by the first draw
+            return
 
-        glEnableVertexAttribArray(4)
-        glBindBuffer(GL_ARRAY_BUFFER, self.bitbo)
-        glVertexAttribPointer(4, 3, GL_FLOAT, GL_FALSE, 0, None)
+        if self.uploadedVertices != len(self.vertexData):
+            # the vertex count changed, the storage has to be reallocated
+            self.updateBounds()
+            self.initialize()
+            return
 
+        if len(ranges) == 0:
+            return
 
-        glDrawElements(GL_TRIANGLES, self.faces.size, GL_UNSIGNED_INT, None)
+        if self.compact and not np.allclose(Mesh.PositionDecode(self.bounds), (self.decodeScale, self.decodeOffset)):
+            # the edit moved the bounds, every position has to be quantized again
+            self.initialize()
+            return
 
+        rowBytes = COMPACT_DTYPE.itemsize if self.compact else VERTEX_STRIDE * 4
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        for start, stop in ranges:
+            glBufferSubData(GL_ARRAY_BUFFER, int(start) * rowBytes, int(stop - start) * rowBytes, self.gpuVertexData(start, stop))
         glBindBuffer(GL_ARRAY_BUFFER, 0)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
 
-        glDisableVertexAttribArray(0)
-        glDisableVertexAttribArray(1)
-        glDisableVertexAttribArray(2)
-        glDisableVertexAttribArray(3)
-        glDisableVertexAttribArray(4)
+    def gpuVertexData(self, start: int, stop: int):
+        """
+        :param start: The first vertex
+        :param stop: The vertex after the last one
+        :return: The vertices in the format they are uploaded in
+        """
+        if not self.compact:
+            return self.vertexData[start:stop]
+
+        return Mesh.CompactVertices(self.vertices[start:stop], self.normals[start:stop], self.uvs[start:stop], self.tangents[start:stop], self.bitangents[start:stop], self.decodeScale, self.decodeOffset)
+
+    @staticmethod
+    def PositionDecode(bounds: list):
+        """
+        :param bounds: The bounding box the positions are quantized to
+        :return: The scale and offset that turn normalized int16 positions back into object space
+        """
+        low, high = np.asarray(bounds[0], dtype="f"), np.asarray(bounds[1], dtype="f")
+
+        # flat meshes have no extent along one axis, any scale works there
+        return np.maximum((high - low) / 2, 1e-6).astype("f"), ((high + low) / 2).astype("f")
+
+    @staticmethod
+    def CompactVertices(vertices: np.ndarray, normals: np.ndarray, uvs: np.ndarray, tangents: np.ndarray, bitangents: np.ndarray, decodeScale: np.ndarray, decodeOffset: np.ndarray):
+        """
+        Packs float vertex attributes into COMPACT_DTYPE
+
+        :param decodeScale: The position scale from PositionDecode
+        :param decodeOffset: The position offset from PositionDecode
+        :return: The packed vertices
+        """
+        compact = np.empty(len(vertices), dtype=COMPACT_DTYPE)
+
+        position = compact["position"]
+        position[:, :3] = np.clip(np.rint((vertices - decodeOffset) / decodeScale * 32767), -32767, 32767)
+
+        # the bitangent is rebuilt as cross(normal, tangent) * sign in the shader
+        handedness = np.einsum("ij,ij->i", np.cross(normals, tangents), bitangents)
+        position[:, 3] = np.where(handedness < 0, -32767, 32767)
+
+        compact["octahedral"][:, :2] = Mesh.OctahedralEncode(normals)
+        compact["octahedral"][:, 2:] = Mesh.OctahedralEncode(tangents)
 
+        compact["uv"] = uvs
+
+        return compact
+
+    @staticmethod
+    def OctahedralEncode(vectors: np.ndarray):
+        """
+        Maps directions onto the octahedron unfolded into a square, stored as two normalized int8 values
+
+        :param vectors: (N, 3) directions, they don't need to be unit length
+        :return: (N, 2) int8 values
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        encoded = vectors[:, :2] / np.maximum(np.abs(vectors).sum(axis=1, keepdims=True), 1e-20)
+
+        # the lower half is folded over the diagonals onto the corners of the square
+        lower = vectors[:, 2] < 0
+        folded = (1 - np.abs(encoded[lower, ::-1])) * np.where(encoded[lower] >= 0, 1, -1)
+        encoded[lower] = folded
+
+        return np.clip(np.rint(encoded * 127), -127, 127).astype(np.int8)
+
+    @staticmethod
+    def OctahedralDecode(encoded: np.ndarray):
+        """
+        Inverse of OctahedralEncode, the same math as octahedralDecode in the shaders
+
+        :param encoded: (N, 2) int8 values
+        :return: (N, 3) unit directions
+        """
+        encoded = encoded.astype(np.float64) / 127
+        vectors = np.concatenate((encoded, (1 - np.abs(encoded).sum(axis=1))[:, None]), axis=1)
+
+        fold = np.maximum(-vectors[:, 2], 0)[:, None]
+        vectors[:, :2] += np.where(vectors[:, :2] >= 0, -fold, fold)
+
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    @staticmethod
+    def DirtyRanges(dirty: np.ndarray, gap: int = DIRTY_MERGE_GAP):
+        """
+        Turns vertex indices into contiguous ranges
+
+        :param dirty: Indices of the edited vertices, in any order
+        :param gap: Ranges closer than this many vertices are joined
+        :return: The [start, stop) ranges, as an (N, 2) array
+        """
+        dirty = np.unique(np.asarray(dirty, dtype=np.int64))
+
+        if len(dirty) == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        return Mesh.MergeRanges(np.stack((dirty, dirty + 1), axis=1), gap)
+
+    @staticmethod
+    def MergeRanges(ranges: np.ndarray, gap: int = DIRTY_MERGE_GAP):
+        """
+        Joins overlapping ranges and ranges closer than the gap
+
+        :param ranges: [start, stop) ranges, as an (N, 2) array
+        :param gap: Ranges closer than this many vertices are joined
+        :return: The sorted, disjoint ranges
+        """
+        if len(ranges) == 0:
+            return ranges
+
+        ranges = ranges[np.argsort(ranges[:, 0], kind="stable")]
+        stops = np.maximum.accumulate(ranges[:, 1])
+
+        # a range starts a new group when it begins after everything before it ended, plus the gap
+        first = np.ones(len(ranges), dtype=bool)
+        first[1:] = ranges[1:, 0] > stops[:-1] + gap
+
+        groups = np.flatnonzero(first)
+        ends = np.append(groups[1:], len(ranges)) - 1
+
+        return np.stack((ranges[groups, 0], stops[ends]), axis=1)
+
+    @staticmethod
+    def IndexFormat(vertexCount: int):
+        """
+        Picks the smallest index type that can address every vertex
+
+        :param vertexCount: The number of vertices
+        :return: The numpy type and the matching OpenGL type of the indices
+        """
+        if vertexCount <= 65536:
+            return np.uint16, GL_UNSIGNED_SHORT
+
+        return np.uint32, GL_UNSIGNED_INT
+
+    def indexCount(self, lod: int = 0):
+        """
+        :param lod: The level of detail, 0 is the full mesh
+        :return: The number of indices to draw for the level of detail
+        """
+        if lod:
+            return self.lods[lod - 1].size
+
+        return (self.faces if self.strip is None else self.strip).size
+
+    def selectLOD(self, cameraPosition: np.ndarray, bias: int = 0):
+        """
+        Picks the level of detail from the distance of the camera relative to the size of the mesh
+
+        :param cameraPosition: The world position of the camera
+        :param bias: Levels to add, e.g. to draw shadow casters coarser than the visible meshes
+        :return: The level of detail, 0 is the full mesh
+        """
+        if not self.lods:
+            return 0
+
+        center, radius = self.getWorldBoundingSphere()
+
+        distance = np.linalg.norm(center - cameraPosition) / max(radius, 1e-6)
+
+        # every doubling of the distance halves the screen size, and with it the triangles needed
+        level = int(np.floor(np.log2(max(distance / LOD_DISTANCE, 1e-6)))) + 1 + bias
+
+        return min(max(level, 0), len(self.lods))
+
+    def draw(self, lod: int = 0, instances: int = None):
+        """
+        Draws the mesh using the currently bound shader
+
+        :param lod: The level of detail, 0 is the full mesh
+        :param instances: The number of instances to draw, for shaders that place the instances themselves
+        """
+        if not self.isUploaded():
+            self.initialize()
+
+        glBindVertexArray(self.vao)
+
+        # constant attributes, the shaders use them to decode the positions and to tell the formats apart
+        glVertexAttrib4f(DECODE_SCALE_LOCATION, *self.decodeScale.tolist(), float(self.compact))
+        glVertexAttrib3f(DECODE_OFFSET_LOCATION, *self.decodeOffset.tolist())
+
+        offset = ctypes.c_void_p(self.indexOffsets[lod])
+
+        strip = lod == 0 and self.strip is not None
+        mode = GL_TRIANGLE_STRIP if strip else GL_TRIANGLES
+
+        if strip:
+            glEnable(GL_PRIMITIVE_RESTART)
+            glPrimitiveRestartIndex(self.restartIndex)
+
+        if instances is None:
+            glDrawElements(mode, self.indexCount(lod), self.indexType, offset)
+        else:
+            glDrawElementsInstanced(mode, self.indexCount(lod), self.indexType, offset, instances)
+
+        if strip:
+            glDisable(GL_PRIMITIVE_RESTART)
+
+        glBindVertexArray(0)
 
     def update(self, dt: float):
         """
@@ -247,38 +762,61 @@ class Mesh:
         return mesh
 
     @staticmethod
-    def CreateQuad(divisions):
+    def GridIndices(rows: int, columns: int, strips: bool = False):
+        """
+        Triangulates a grid of rows x columns vertices, stored row by row
+
+        :param rows: The number of vertex rows
+        :param columns: The number of vertices per row
+        :param strips: Whether to return one triangle strip per row of quads instead of separate triangles
+        :return: (F, 3) triangles, two per quad, or the strips separated by STRIP_RESTART, both with the same winding
+        """
+        if strips:
+            # alternate between the next row and this row, the strip flips its winding every triangle
+            row = np.arange(rows - 1, dtype=np.uint32)[:, None] * columns
+            column = np.arange(columns, dtype=np.uint32)[None, :]
+
+            strip = np.empty((rows - 1, 2 * columns + 1), dtype=np.uint32)
+            strip[:, 0:-1:2] = row + columns + column
+            strip[:, 1:-1:2] = row + column
+            strip[:, -1] = STRIP_RESTART
+
+            return strip.ravel()[:-1]
+
+        row, column = np.meshgrid(np.arange(rows - 1, dtype=np.uint32), np.arange(columns - 1, dtype=np.uint32), indexing="ij")
+        corner = (row * columns + column).ravel()
+
+        faces = np.empty((len(corner), 2, 3), dtype=np.uint32)
+        faces[:, 0] = np.stack((corner, corner + 1, corner + columns + 1), axis=1)
+        faces[:, 1] = np.stack((corner, corner + columns + 1, corner + columns), axis=1)
+
+        return faces.reshape(-1, 3)
+
+    @staticmethod
+    def CreateQuad(divisions, strips: bool = False):
         """
         Creates a quad mesh with the given number of divisions
         
         :param divisions: The number of divisions
+        :param strips: Whether the mesh is drawn as triangle strips, one per row of quads
         :return: The quad mesh
         """
-        vertices = []
-        faces = []
-        normals = []
-        uvs = []
+        i, j = np.meshgrid(np.arange(divisions + 1), np.arange(divisions + 1), indexing="ij")
+        i = i.ravel() / divisions
+        j = j.ravel() / divisions
 
-        for i in range(divisions + 1):
-            for j in range(divisions + 1):
-                vertices.append([i / divisions, j / divisions, 0])
-                normals.append([0, 0, 1])
-                uvs.append([i / divisions, j / divisions])
+        vertices = np.stack((i, j, np.zeros_like(i)), axis=1).astype("f")
+        normals = np.tile(np.array([0, 0, 1], dtype="f"), (len(vertices), 1))
+        uvs = np.stack((i, j), axis=1).astype("f")
 
-        for i in range(divisions):
-            for j in range(divisions):
-                faces.append([i * (divisions + 1) + j, i * (divisions + 1) + j + 1, (i + 1) * (divisions + 1) + j + 1])
-                faces.append([i * (divisions + 1) + j, (i + 1) * (divisions + 1) + j + 1, (i + 1) * (divisions + 1) + j])
+        # the uvs follow x and y, so the normal map frame is the same everywhere
+        tangents = np.tile(np.array([1, 0, 0], dtype="f"), (len(vertices), 1))
+        bitangents = np.tile(np.array([0, 1, 0], dtype="f"), (len(vertices), 1))
 
-        vertices = np.array(vertices, dtype="f")
-        faces = np.array(faces, dtype="i")
-        normals = np.array(normals, dtype="f")
-        uvs = np.array(uvs, dtype="f")
+        faces = Mesh.GridIndices(divisions + 1, divisions + 1)
+        strip = Mesh.GridIndices(divisions + 1, divisions + 1, True) if strips else None
 
-        mesh = Mesh(vertices, faces, normals, uvs)
+        mesh = Mesh(vertices, faces, normals, uvs, tangents, bitangents, strip=strip)
         mesh.name = "Quad"
 
         return mesh
-
-        
-        
\ No newline at end of file
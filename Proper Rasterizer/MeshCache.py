@@ -0,0 +1,118 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from custom_logging import LOG, LogLevel
+
+class MeshCache:
+    # bump whenever the preprocessing changes, so old entries are not picked up
+    VERSION = 5
+
+    # where the preprocessed meshes are stored, relative to the working directory like every other asset
+    directory = ".cache/meshes"
+
+    # arrays stored for every mesh, one .npy file each, entries can hold extra arrays such as levels of detail
+    ARRAYS = ["vertices", "faces", "normals", "uvs", "tangents", "bitangents"]
+
+    @staticmethod
+    def key(file_name: str):
+        """
+        Hashes the contents of a source file, so the cache is invalidated when the file changes
+
+        :param file_name: The path to the source file
+        :return: The cache key of the file
+        """
+        sha = hashlib.sha1(f"v{MeshCache.VERSION}".encode())
+
+        with open(file_name, "rb") as file:
+            sha.update(file.read())
+
+        return sha.hexdigest()
+
+    @staticmethod
+    def path(file_name: str, key: str, variant: str = ""):
+        """
+        :param file_name: The path to the source file
+        :param key: The cache key of the file
+        :param variant: The import options the arrays were built with
+        :return: The directory holding the cached arrays
+        """
+        return os.path.join(MeshCache.directory, f"{MeshCache.prefix(file_name, variant)}{key}")
+
+    @staticmethod
+    def prefix(file_name: str, variant: str = ""):
+        """
+        :param file_name: The path to the source file
+        :param variant: The import options the arrays were built with
+        :return: The part of the entry name shared by every version of the file
+        """
+        return os.path.normpath(file_name).replace(os.sep, "_").replace(".", "_") + variant + "-"
+
+    @staticmethod
+    def load(file_name: str, variant: str = ""):
+        """
+        Loads the preprocessed arrays of a mesh
+
+        The arrays are read whole rather than memory mapped, Mesh copies every attribute into its interleaved
+        vertex data anyway, so a mapping would only add page faults to the same copy.
+
+        :param file_name: The path to the source file
+        :param variant: The import options the arrays were built with
+        :return: A dictionary of array name to array, or None if the file is not cached
+        """
+        entry = MeshCache.path(file_name, MeshCache.key(file_name), variant)
+
+        if not os.path.isdir(entry):
+            return None
+
+        try:
+            names = [name[:-len(".npy")] for name in os.listdir(entry) if name.endswith(".npy")]
+            arrays = {name: np.load(os.path.join(entry, f"{name}.npy")) for name in names}
+
+            missing = [name for name in MeshCache.ARRAYS if name not in arrays]
+            if missing:
+                raise ValueError(f"missing {', '.join(missing)}")
+        except (OSError, ValueError) as error:
+            LOG(f"Ignoring broken cache entry for {file_name}: {error}", LogLevel.WARNING)
+            return None
+
+        LOG(f"Loaded {file_name} from cache")
+
+        return arrays
+
+    @staticmethod
+    def save(file_name: str, arrays: dict, variant: str = ""):
+        """
+        Stores the preprocessed arrays of a mesh, replacing older versions of the same file
+
+        :param file_name: The path to the source file
+        :param arrays: A dictionary of array name to array, must contain every name in MeshCache.ARRAYS
+        :param variant: The import options the arrays were built with
+        """
+        entry = MeshCache.path(file_name, MeshCache.key(file_name), variant)
+
+        os.makedirs(MeshCache.directory, exist_ok=True)
+
+        # remove entries of previous versions of the file
+        prefix = MeshCache.prefix(file_name, variant)
+        for name in os.listdir(MeshCache.directory):
+            if name.startswith(prefix) and name != os.path.basename(entry):
+                shutil.rmtree(os.path.join(MeshCache.directory, name), ignore_errors=True)
+
+        # write into a temporary directory first so a crash never leaves a half written entry behind
+        staging = tempfile.mkdtemp(dir=MeshCache.directory)
+
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(array))
+
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            # another process cached the same file in the meantime
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        LOG(f"Cached {file_name} in {entry}")
\ No newline at end of file
@@ -0,0 +1,210 @@
+import numpy as np
+
+from custom_logging import LOG, LogLevel
+
+class MeshOptimizer:
+    # size of the post transform vertex cache the index buffers are optimized for
+    CACHE_SIZE = 16
+
+    @staticmethod
+    def ACMR(faces: np.ndarray, cache_size: int = CACHE_SIZE):
+        """
+        Average cache miss ratio, the number of vertices transformed per triangle with a FIFO vertex cache.
+
+        1.0 is very good, 3.0 means every vertex of every triangle is transformed again.
+        Every corner depends on the misses before it, so this walks the whole index buffer and is only meant for debugging.
+
+        :param faces: The triangles of the mesh
+        :param cache_size: The number of entries in the simulated cache
+        :return: The average number of cache misses per triangle
+        """
+        if len(faces) == 0:
+            return 0.0
+
+        # time at which every vertex entered the cache, a vertex is cached while fewer than cache_size vertices entered after it
+        entered = {}
+        misses = 0
+
+        for vertex in faces.ravel().tolist():
+            if misses - entered.get(vertex, -cache_size - 1) > cache_size:
+                entered[vertex] = misses
+                misses += 1
+
+        return misses / len(faces)
+
+    @staticmethod
+    def Tipsify(faces: np.ndarray, vertex_count: int, cache_size: int = CACHE_SIZE):
+        """
+        Reorders triangles for vertex cache locality.
+
+        Fans around one vertex at a time and picks the next vertex among the ones just emitted,
+        preferring vertices that are still in the cache and have few triangles left.
+        From "Fast Triangle Reordering for Vertex Locality and Reduced Overdraw" by Sander, Nehab and Barczak.
+
+        :param faces: The triangles of the mesh
+        :param vertex_count: The number of vertices of the mesh
+        :param cache_size: The number of entries in the cache to optimize for
+        :return: The reordered triangles, and the start of every cluster, i.e. wherever the fanning hit a dead end
+        """
+        if len(faces) == 0:
+            return faces, np.zeros(1, dtype=np.int64)
+
+        # triangles using every vertex, as one flat list with a start offset per vertex (CSR)
+        corners = faces.ravel()
+        valence = np.bincount(corners, minlength=vertex_count)
+        adjacency = (np.argsort(corners, kind="stable") // 3).tolist()
+        offsets = np.concatenate(([0], np.cumsum(valence))).tolist()
+
+        triangles = faces.tolist()
+
+        live = valence.tolist()
+        cache_time = [0] * vertex_count
+        emitted = [False] * len(triangles)
+
+        order = []
+        dead_end = []
+        clusters = [0]
+
+        time_stamp = cache_size + 1
+        fanning = int(corners[0])
+        cursor = 0
+
+        while fanning >= 0:
+            candidates = []
+
+            # emit every remaining triangle around the fanning vertex
+            for triangle in adjacency[offsets[fanning]:offsets[fanning + 1]]:
+                if emitted[triangle]: continue
+
+                for vertex in triangles[triangle]:
+                    dead_end.append(vertex)
+                    candidates.append(vertex)
+                    live[vertex] -= 1
+
+                    if time_stamp - cache_time[vertex] > cache_size:
+                        cache_time[vertex] = time_stamp
+                        time_stamp += 1
+
+                emitted[triangle] = True
+                order.append(triangle)
+
+            # next vertex: the one that stays in the cache the longest after its remaining triangles are emitted
+            fanning = -1
+            best_priority = -1
+
+            for vertex in candidates:
+                if live[vertex] == 0: continue
+
+                priority = 0
+                if time_stamp - cache_time[vertex] + 2 * live[vertex] <= cache_size:
+                    priority = time_stamp - cache_time[vertex]
+
+                if priority > best_priority:
+                    best_priority = priority
+                    fanning = vertex
+
+            if fanning >= 0: continue
+
+            if len(order) < len(triangles):
+                clusters.append(len(order))
+
+            # dead end, go back to a recently used vertex, or the next vertex with triangles left
+            while dead_end:
+                vertex = dead_end.pop()
+                if live[vertex] > 0:
+                    fanning = vertex
+                    break
+
+            while fanning < 0 and cursor < vertex_count:
+                if live[cursor] > 0:
+                    fanning = cursor
+                cursor += 1
+
+        return faces[np.array(order)], np.array(clusters, dtype=np.int64)
+
+    @staticmethod
+    def SortClusters(vertices: np.ndarray, faces: np.ndarray, clusters: np.ndarray):
+        """
+        Orders clusters of triangles to reduce overdraw, clusters facing away from the center of the mesh are drawn first
+        since they are the most likely to occlude the rest.
+
+        The order inside every cluster is kept, so the vertex cache locality is mostly unchanged.
+
+        :param vertices: The vertex positions of the mesh
+        :param faces: The triangles of the mesh
+        :param clusters: The start of every cluster of triangles
+        :return: The reordered triangles
+        """
+        if len(clusters) < 2:
+            return faces
+
+        corners = vertices[faces]
+
+        # area weighted normal and centroid of every cluster
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        areas = np.linalg.norm(normals, axis=1, keepdims=True)
+        centroids = corners.mean(axis=1)
+
+        cluster_normals = np.add.reduceat(normals, clusters)
+        cluster_centroids = np.add.reduceat(centroids * areas, clusters) / np.maximum(np.add.reduceat(areas, clusters), 1e-12)
+
+        center = vertices.mean(axis=0)
+        score = np.einsum("ij,ij->i", cluster_centroids - center, cluster_normals)
+
+        # the triangles of the clusters, highest score first
+        ranking = np.argsort(-score, kind="stable")
+        sizes = np.diff(np.append(clusters, len(faces)))
+
+        starts = np.repeat(clusters[ranking], sizes[ranking])
+        steps = np.arange(len(faces)) - np.repeat(np.cumsum(sizes[ranking]) - sizes[ranking], sizes[ranking])
+
+        return faces[starts + steps]
+
+    @staticmethod
+    def RemapVertices(faces: np.ndarray, vertex_count: int):
+        """
+        Orders the vertices by first use in the index buffer, so vertex fetches walk through memory linearly.
+
+        Vertices no triangle uses are moved to the end.
+
+        :param faces: The triangles of the mesh
+        :param vertex_count: The number of vertices of the mesh
+        :return: The new order of the vertices (old index per new index) and the remapped triangles
+        """
+        corners = faces.ravel()
+
+        # index of the first corner using every vertex, unused vertices come last
+        first_use = np.full(vertex_count, len(corners), dtype=np.int64)
+        np.minimum.at(first_use, corners, np.arange(len(corners)))
+
+        order = np.argsort(first_use, kind="stable")
+
+        remap = np.empty(vertex_count, dtype=faces.dtype)
+        remap[order] = np.arange(vertex_count)
+
+        return order, remap[faces]
+
+    @staticmethod
+    def Optimize(faces: np.ndarray, attributes: list, name: str = "", measure: bool = False):
+        """
+        Reorders the triangles for vertex cache locality and overdraw, and then the vertices for fetch locality.
+
+        :param faces: The triangles of the mesh
+        :param attributes: The per vertex arrays of the mesh, starting with the positions
+        :param name: The name used when logging the result
+        :param measure: Whether to log the ACMR before and after, which takes longer than the optimization itself
+        :return: The reordered triangles and attributes
+        """
+        vertex_count = len(attributes[0])
+
+        if measure:
+            before = MeshOptimizer.ACMR(faces)
+
+        faces, clusters = MeshOptimizer.Tipsify(faces, vertex_count)
+        faces = MeshOptimizer.SortClusters(attributes[0], faces, clusters)
+        order, faces = MeshOptimizer.RemapVertices(faces, vertex_count)
+
+        if measure:
+            LOG(f"Optimized {name} vertex cache, ACMR {before:.3f} -> {MeshOptimizer.ACMR(faces):.3f}", LogLevel.DEBUG)
+
+        return faces, [attribute[order] for attribute in attributes]
\ No newline at end of file
@@ -0,0 +1,210 @@
+import numpy as np
+
+from custom_logging import LOG
+
+class MeshSimplifier:
+    # how strongly open edges (mesh borders and uv seams) resist being moved, relative to the surface
+    BOUNDARY_WEIGHT = 100.0
+
+    # cosine of the largest rotation a collapse may apply to a triangle, stops triangles from folding over across passes
+    MIN_NORMAL_COSINE = 0.2
+
+    @staticmethod
+    def FaceNormals(positions: np.ndarray, faces: np.ndarray):
+        """
+        :param positions: The vertex positions
+        :param faces: The triangles
+        :return: The unnormalized face normals, their length is twice the triangle area
+        """
+        corners = positions[faces]
+        return np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+    @staticmethod
+    def Edges(faces: np.ndarray, vertex_count: int):
+        """
+        :param faces: The triangles
+        :param vertex_count: The number of vertices
+        :return: Every edge of every triangle with the smaller index first, and a key per edge that is equal for shared edges
+        """
+        edges = np.sort(np.stack((faces, np.roll(faces, -1, axis=1)), axis=2).reshape(-1, 2), axis=1).astype(np.int64)
+        return edges, edges[:, 0] * vertex_count + edges[:, 1]
+
+    @staticmethod
+    def PlaneQuadrics(normals: np.ndarray, points: np.ndarray, weights: np.ndarray):
+        """
+        Builds the error quadric of planes, the squared distance to the plane of a point p is [p, 1] K [p, 1]
+
+        :param normals: The unit normals of the planes
+        :param points: A point on every plane
+        :param weights: The weight of every plane
+        :return: The 4x4 quadric of every plane, flattened to 16 values
+        """
+        planes = np.concatenate((normals, -np.einsum("ij,ij->i", normals, points)[:, None]), axis=1)
+        return (weights[:, None, None] * planes[:, :, None] * planes[:, None, :]).reshape(-1, 16)
+
+    @staticmethod
+    def VertexQuadrics(positions: np.ndarray, faces: np.ndarray):
+        """
+        Sums the area weighted quadrics of the triangles around every vertex, plus the quadrics of planes
+        perpendicular to open edges so borders and uv seams keep their shape.
+
+        :param positions: The vertex positions
+        :param faces: The triangles
+        :return: The quadric of every vertex, flattened to 16 values
+        """
+        normals = MeshSimplifier.FaceNormals(positions, faces)
+        areas = np.linalg.norm(normals, axis=1)
+        units = normals / np.maximum(areas, 1e-12)[:, None]
+
+        face_quadrics = MeshSimplifier.PlaneQuadrics(units, positions[faces[:, 0]], areas * 0.5)
+
+        # edges used by a single triangle are open, keep them in triangle order for the border direction
+        _, keys = MeshSimplifier.Edges(faces, len(positions))
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        open_edges = counts[inverse] == 1
+
+        edge_faces = np.repeat(np.arange(len(faces)), 3)[open_edges]
+        edges = np.stack((faces, np.roll(faces, -1, axis=1)), axis=2).reshape(-1, 2)[open_edges]
+
+        direction = positions[edges[:, 1]] - positions[edges[:, 0]]
+        border_normals = np.cross(direction, units[edge_faces])
+        border_normals /= np.maximum(np.linalg.norm(border_normals, axis=1), 1e-12)[:, None]
+
+        border_quadrics = MeshSimplifier.PlaneQuadrics(border_normals, positions[edges[:, 0]], MeshSimplifier.BOUNDARY_WEIGHT * np.einsum("ij,ij->i", direction, direction))
+
+        indices = np.concatenate((faces.ravel(), edges.ravel()))
+        quadrics = np.concatenate((np.repeat(face_quadrics, 3, axis=0), np.repeat(border_quadrics, 2, axis=0)))
+
+        result = np.empty((len(positions), 16))
+        for k in range(16):
+            result[:, k] = np.bincount(indices, weights=quadrics[:, k], minlength=len(positions))
+
+        return result
+
+    @staticmethod
+    def Simplify(vertices: np.ndarray, faces: np.ndarray, targets: list):
+        """
+        Simplifies a mesh with quadric error metrics, from "Surface Simplification Using Quadric Error Metrics" by Garland and Heckbert.
+
+        Edges are collapsed into one of their two vertices (half edge collapses), so every level of detail keeps
+        indexing the original vertices and can share their vertex buffer. Every pass collapses a batch of
+        cheap edges that don't share vertices, collapses that would flip a triangle are rejected.
+
+        :param vertices: The vertex positions
+        :param faces: The triangles
+        :param targets: The triangle counts to simplify to
+        :return: The triangles of every target, in the order of the targets
+        """
+        positions = np.asarray(vertices, dtype=np.float64)
+        homogeneous = np.concatenate((positions, np.ones((len(positions), 1))), axis=1)
+
+        quadrics = MeshSimplifier.VertexQuadrics(positions, faces)
+
+        faces = np.asarray(faces, dtype=np.int64)
+        results = {}
+
+        for target in sorted(set(targets), reverse=True):
+            while len(faces) > target:
+                collapsed = MeshSimplifier.CollapsePass(positions, homogeneous, quadrics, faces, len(faces) - target)
+                if collapsed is None: break
+                faces = collapsed
+
+            results[target] = faces.astype(np.uint32)
+
+        return [results[target] for target in targets]
+
+    @staticmethod
+    def CollapsePass(positions: np.ndarray, homogeneous: np.ndarray, quadrics: np.ndarray, faces: np.ndarray, excess: int):
+        """
+        Collapses a batch of independent edges, the quadrics of the kept vertices are updated in place
+
+        :param positions: The vertex positions
+        :param homogeneous: The vertex positions with a fourth coordinate of 1
+        :param quadrics: The quadric of every vertex, flattened to 16 values
+        :param faces: The current triangles
+        :param excess: The number of triangles above the target
+        :return: The triangles after the collapses, or None if nothing could be collapsed
+        """
+        edges, keys = MeshSimplifier.Edges(faces, len(positions))
+        _, unique = np.unique(keys, return_index=True)
+        edges = edges[unique]
+        a, b = edges[:, 0], edges[:, 1]
+
+        combined = (quadrics[a] + quadrics[b]).reshape(-1, 4, 4)
+
+        # error of keeping either end of the edge
+        keep_b = np.einsum("ei,eij,ej->e", homogeneous[b], combined, homogeneous[b])
+        keep_a = np.einsum("ei,eij,ej->e", homogeneous[a], combined, homogeneous[a])
+
+        keep = np.where(keep_b <= keep_a, b, a)
+        remove = np.where(keep_b <= keep_a, a, b)
+        cost = np.minimum(keep_a, keep_b)
+
+        # an edge is collapsed when it is the cheapest edge of both of its vertices, so no vertex is in two collapses
+        rank = np.empty(len(edges), dtype=np.int64)
+        rank[np.argsort(cost, kind="stable")] = np.arange(len(edges))
+
+        cheapest = np.full(len(positions), len(edges), dtype=np.int64)
+        np.minimum.at(cheapest, a, rank)
+        np.minimum.at(cheapest, b, rank)
+
+        selected = np.flatnonzero((cheapest[a] == rank) & (cheapest[b] == rank))
+
+        # an interior collapse removes two triangles, don't overshoot the target by much
+        selected = selected[np.argsort(rank[selected])][:max(1, excess // 2)]
+
+        remap = np.arange(len(positions))
+        remap[remove[selected]] = keep[selected]
+
+        # reject collapses that flip or sharply rotate a triangle, until none of the remaining ones do
+        old_normals = MeshSimplifier.FaceNormals(positions, faces)
+        old_lengths = np.linalg.norm(old_normals, axis=1)
+
+        while True:
+            collapsed = remap[faces]
+
+            degenerate = (collapsed[:, 0] == collapsed[:, 1]) | (collapsed[:, 1] == collapsed[:, 2]) | (collapsed[:, 2] == collapsed[:, 0])
+            changed = np.flatnonzero(np.any(collapsed != faces, axis=1) & ~degenerate)
+
+            new_normals = MeshSimplifier.FaceNormals(positions, collapsed[changed])
+            cosine = np.einsum("ij,ij->i", old_normals[changed], new_normals)
+            flipped = changed[cosine <= MeshSimplifier.MIN_NORMAL_COSINE * old_lengths[changed] * np.linalg.norm(new_normals, axis=1)]
+
+            if len(flipped) == 0: break
+
+            rejected = np.unique(faces[flipped])
+            remap[rejected] = rejected
+
+        moved = np.flatnonzero(remap != np.arange(len(positions)))
+        if len(moved) == 0:
+            return None
+
+        np.add.at(quadrics, remap[moved], quadrics[moved])
+
+        return collapsed[~degenerate]
+
+    @staticmethod
+    def BuildLODs(vertices: np.ndarray, faces: np.ndarray, levels: int, ratio: float = 0.5, name: str = ""):
+        """
+        Builds a chain of levels of detail, every level has about ratio times the triangles of the previous one
+
+        :param vertices: The vertex positions
+        :param faces: The triangles of the full detail mesh
+        :param levels: The number of levels to build, not counting the full detail mesh
+        :param ratio: The fraction of triangles kept from one level to the next
+        :param name: The name used when logging the result
+        :return: The triangles of every level, levels that could not be simplified further are left out
+        """
+        targets = [max(1, int(len(faces) * ratio ** level)) for level in range(1, levels + 1)]
+
+        lods = []
+        previous = len(faces)
+
+        for lod in MeshSimplifier.Simplify(vertices, faces, targets):
+            if len(lod) >= previous: break
+            lods.append(lod)
+            previous = len(lod)
+
+        LOG(f"Built {len(lods)} LODs for {name}: {' -> '.join(f'{count:,}' for count in [len(faces)] + [len(lod) for lod in lods])} triangles")
+
+        return lods
\ No newline at end of file
@@ -2,8 +2,6 @@ from Mesh import Mesh
 
 from OpenGL.GL import *
 
-import time
-
 import numpy as np
 
 class PostProcessing:
@@ -22,12 +20,9 @@ class PostProcessing:
 
         self.shadow_map = None
         self.sun = None
-        self.camera = None
 
         self.quad = Mesh.CreateScreenQuad()
 
-        self.time_started = time.time()
-
         # initialize
         glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
 
@@ -51,46 +46,24 @@ class PostProcessing:
         glActiveTexture(GL_TEXTURE0)
         glBindTexture(GL_TEXTURE_2D, self.texture)
 
-        glActiveTexture(GL_TEXTURE1)
-        glBindTexture(GL_TEXTURE_2D, self.shadow_map)
-        
+        self.sun.useShadowMap(self.shader, self.shadow_map)
+
         # self.rbo contains the z depth buffer
         # copy rbo framebuffer depth values into the depth map texture
         glActiveTexture(GL_TEXTURE2)
         glBindTexture(GL_TEXTURE_2D, self.cameraDepthMap)
 
-        glUniform1i(self.shader.get_keyword("screenTexture"), 0)
-        glUniform1i(self.shader.get_keyword("shadowMap"), 1)
-        glUniform1i(self.shader.get_keyword("cameraDepthMap"), 2)
-        
-        glUniform3fv(self.shader.get_keyword("lightPos"), 1, self.sun.transform.position)
-
-        # normalized light direction towards origin
-        glUniform3fv(self.shader.get_keyword("lightDir"), 1, -self.sun.transform.position)
-        glUniform3fv(self.shader.get_keyword("sunColor"), 1, self.sun.color)
-
-        glUniformMatrix4fv(self.shader.get_keyword("view"), 1, GL_TRUE, self.camera.getViewMatrix())
-        glUniformMatrix4fv(self.shader.get_keyword("projection"), 1, GL_TRUE, self.camera.projectionMatrix)
-
-        glUniformMatrix4fv(self.shader.get_keyword("lightSpaceMatrix"), 1, GL_TRUE, self.sun.getLightSpaceMatrix())
-        glUniformMatrix4fv(self.shader.get_keyword("lightModel"), 1, GL_TRUE, self.sun.getLightView())
-
-        glUniform3fv(self.shader.get_keyword("camPos"), 1, -self.camera.transform.position)
-        glUniform3fv(self.shader.get_keyword("camFwd"), 1, -self.camera.forward())
-        glUniform3fv(self.shader.get_keyword("camUp"), 1, self.camera.up())
-        glUniform3fv(self.shader.get_keyword("camRight"), 1, self.camera.right())
-
-        glUniform1f(self.shader.get_keyword("time"), time.time() - self.time_started)
+        self.shader.setInt("screenTexture", 0)
+        self.shader.setInt("cameraDepthMap", 2)
 
         self.quad.draw()
 
-    def before_draw(self, shadow_map, sun, camera, cameraDepthMap):
+    def before_draw(self, shadow_map, sun, cameraDepthMap):
         """
         Draw the scene to the texture
         """
         self.shadow_map = shadow_map
         self.sun = sun
-        self.camera = camera
         self.cameraDepthMap = cameraDepthMap
 
         glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
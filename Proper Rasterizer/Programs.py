@@ -78,7 +78,9 @@ def ScaleAnimation(object, dt):
     object.transform.scale = np.array([1,1,1]) * np.sin(time.time() * 4) * 0.5 + 1.5
 
 def MoveUpDown(object, dt):
-    object.transform.position[1] = np.sin(time.time() * 4) * 0.5 + 1.5
+    position = object.transform.position
+    position[1] = np.sin(time.time() * 4) * 0.5 + 1.5
+    object.transform.position = position
 
 def LilyAnimation(object, dt):
     random.seed = object.transform.position[0] + object.transform.position[1] + object.transform.position[2]
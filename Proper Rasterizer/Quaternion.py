@@ -1,14 +1,21 @@
+import math
 import numpy as np
 import Quaternion
 
 class Quaternion:
-    def __init__(self, w: float, x: float, y: float, z: float):
+    # quaternions are created for every rotation change, slots keep them small and fast to create
+    __slots__ = ("w", "x", "y", "z", "normalized")
+
+    def __init__(self, w: float, x: float, y: float, z: float, normalized: bool = False):
+        """
+        :param normalized: whether the components are already of unit length, the normalization is skipped until needed otherwise
+        """
         self.w = w
         self.x = x
         self.y = y
         self.z = z
 
-        self.Normalize()
+        self.normalized = normalized
 
     def __mul__(self, other: Quaternion):
         """
@@ -24,7 +31,27 @@ class Quaternion:
         y = lhs.w * rhs.y - lhs.x * rhs.z + lhs.y * rhs.w + lhs.z * rhs.x
         z = lhs.w * rhs.z + lhs.x * rhs.y - lhs.y * rhs.x + lhs.z * rhs.w
 
-        return Quaternion(w, x, y, z)
+        # the product of two unit quaternions is a unit quaternion
+        return Quaternion(w, x, y, z, lhs.normalized and rhs.normalized)
+
+    def __imul__(self, other: Quaternion):
+        """
+        In place quaternion multiplication, q *= other stores the product in q instead of creating a new quaternion
+        :param other: the other quaternion
+        :return: this quaternion
+        """
+        lhs = self
+        rhs = other
+
+        w = lhs.w * rhs.w - lhs.x * rhs.x - lhs.y * rhs.y - lhs.z * rhs.z
+        x = lhs.w * rhs.x + lhs.x * rhs.w + lhs.y * rhs.z - lhs.z * rhs.y
+        y = lhs.w * rhs.y - lhs.x * rhs.z + lhs.y * rhs.w + lhs.z * rhs.x
+        z = lhs.w * rhs.z + lhs.x * rhs.y - lhs.y * rhs.x + lhs.z * rhs.w
+
+        self.w, self.x, self.y, self.z = w, x, y, z
+        self.normalized = lhs.normalized and rhs.normalized
+
+        return self
 
     def Inverse(self):
         """
@@ -33,36 +60,46 @@ class Quaternion:
         """
         # such that q * q.Inverse() = 1
         # conjugate
-        return Quaternion(self.w, -self.x, -self.y, -self.z)
+        return Quaternion(self.w, -self.x, -self.y, -self.z, self.normalized)
 
     def Normalize(self):
         """
         Normalize the quaternion
-        Needed because the quaternion is not normalized after multiplication
-        Every operation needs to return a normalized quaternion
+        Only does the work if the quaternion isn't known to be of unit length
         """
-        length = np.sqrt(self.w * self.w + self.x * self.x + self.y * self.y + self.z * self.z)
+        if self.normalized:
+            return
+
+        length = math.sqrt(self.w * self.w + self.x * self.x + self.y * self.y + self.z * self.z)
         self.w /= length
         self.x /= length
         self.y /= length
         self.z /= length
 
+        self.normalized = True
+
     def ToMatrix(self):
         """
         Convert the quaternion to a rotation matrix
-        :return: the 3x3 rotation matrix
-        """
-        matrix = np.identity(4)
-        matrix[0][0] = 1 - 2 * self.y ** 2 - 2 * self.z ** 2
-        matrix[0][1] = 2 * self.x * self.y - 2 * self.z * self.w
-        matrix[0][2] = 2 * self.x * self.z + 2 * self.y * self.w
-        matrix[1][0] = 2 * self.x * self.y + 2 * self.z * self.w
-        matrix[1][1] = 1 - 2 * self.x ** 2 - 2 * self.z ** 2
-        matrix[1][2] = 2 * self.y * self.z - 2 * self.x * self.w
-        matrix[2][0] = 2 * self.x * self.z - 2 * self.y * self.w
-        matrix[2][1] = 2 * self.y * self.z + 2 * self.x * self.w
-        matrix[2][2] = 1 - 2 * self.x ** 2 - 2 * self.y ** 2
-        return matrix
+        :return: the 4x4 rotation matrix
+        """
+        w, x, y, z = self.w, self.x, self.y, self.z
+
+        # dividing by the squared length normalizes the quaternion
+        s = 2 / (w * w + x * x + y * y + z * z)
+
+        return np.array([
+            [1 - s * (y * y + z * z), s * (x * y - z * w), s * (x * z + y * w), 0],
+            [s * (x * y + z * w), 1 - s * (x * x + z * z), s * (y * z - x * w), 0],
+            [s * (x * z - y * w), s * (y * z + x * w), 1 - s * (x * x + y * y), 0],
+            [0, 0, 0, 1]
+        ])
+
+    def ToArray(self):
+        """
+        :return: the wxyz components as an array, the layout the batched functions work on
+        """
+        return np.array([self.w, self.x, self.y, self.z])
 
     def ToEuler(self):
         """
@@ -72,6 +109,8 @@ class Quaternion:
 
         :return: the Euler angles in degrees
         """
+        self.Normalize()
+
         x = np.arctan2(2 * (self.w * self.x + self.y * self.z), 1 - 2 * (self.x ** 2 + self.y ** 2))
         y = np.arcsin(2 * (self.w * self.y - self.z * self.x))
         z = np.arctan2(2 * (self.w * self.z + self.x * self.y), 1 - 2 * (self.y ** 2 + self.z ** 2))
@@ -88,7 +127,7 @@ class Quaternion:
         Quaternion that represents no rotation
         :return: the identity quaternion
         """
-        return Quaternion(1, 0, 0, 0)
+        return Quaternion(1, 0, 0, 0, True)
 
     @staticmethod
     def MultiplyVector(q: Quaternion, v: np.ndarray):
@@ -99,6 +138,8 @@ class Quaternion:
         :param v: the vector to rotate
         """
         # q * Quaternion(0, v[0], v[1], v[2]) * q.Inverse()
+        q.Normalize()
+
         
         x = q.w * v[0] + q.y * v[2] - q.z * v[1]
         y = q.w * v[1] + q.z * v[0] - q.x * v[2]
@@ -106,9 +147,9 @@ class Quaternion:
         w = -q.x * v[0] - q.y * v[1] - q.z * v[2]
 
         return np.array(
-            [w * q.x + x * q.w - y * q.z + z * q.y,
-             w * q.y + y * q.w - z * q.x + x * q.z,
-             w * q.z + z * q.w - x * q.y + y * q.x],"f")
+            [-w * q.x + x * q.w - y * q.z + z * q.y,
+             -w * q.y + y * q.w - z * q.x + x * q.z,
+             -w * q.z + z * q.w - x * q.y + y * q.x],"f")
 
 
     @staticmethod
@@ -121,19 +162,19 @@ class Quaternion:
         :return: the quaternion
         """
 
-        t0 = np.cos(np.radians(z) * 0.5)
-        t1 = np.sin(np.radians(z) * 0.5)
-        t2 = np.cos(np.radians(x) * 0.5)
-        t3 = np.sin(np.radians(x) * 0.5)
-        t4 = np.cos(np.radians(y) * 0.5)
-        t5 = np.sin(np.radians(y) * 0.5)
+        t0 = math.cos(math.radians(z) * 0.5)
+        t1 = math.sin(math.radians(z) * 0.5)
+        t2 = math.cos(math.radians(x) * 0.5)
+        t3 = math.sin(math.radians(x) * 0.5)
+        t4 = math.cos(math.radians(y) * 0.5)
+        t5 = math.sin(math.radians(y) * 0.5)
 
         w = t0 * t2 * t4 + t1 * t3 * t5
         x = t0 * t3 * t4 - t1 * t2 * t5
         y = t0 * t2 * t5 + t1 * t3 * t4
         z = t1 * t2 * t4 - t0 * t3 * t5
 
-        return Quaternion(w, x, y, z)
+        return Quaternion(w, x, y, z, True)
 
     @staticmethod
     def FromAxisAngle(axis: np.ndarray, angle: float):
@@ -142,10 +183,9 @@ class Quaternion:
         :param axis: the axis of rotation
         :param angle: the angle of rotation in degrees
         """
-        axis = axis / np.linalg.norm(axis)
-        angle = np.radians(angle)
-        s = np.sin(angle / 2)
-        return Quaternion(np.cos(angle / 2), axis[0] * s, axis[1] * s, axis[2] * s)
+        angle = math.radians(angle)
+        x, y, z = (np.asarray(axis, dtype=np.float64) * (math.sin(angle / 2) / np.linalg.norm(axis))).tolist()
+        return Quaternion(math.cos(angle / 2), x, y, z, True)
 
     @staticmethod
     def FromMatrix(matrix: np.ndarray):
@@ -201,6 +241,93 @@ class Quaternion:
 
         return Quaternion.FromMatrix(m)
 
+    @staticmethod
+    def BatchMultiply(lhs: np.ndarray, rhs: np.ndarray):
+        """
+        Multiplies many quaternions at once, the batched version of lhs * rhs
+        :param lhs: the Nx4 (wxyz) quaternions on the left, or a single one for all
+        :param rhs: the Nx4 (wxyz) quaternions on the right, or a single one for all
+        :return: the Nx4 products
+        """
+        lw, lx, ly, lz = np.moveaxis(lhs, -1, 0)
+        rw, rx, ry, rz = np.moveaxis(rhs, -1, 0)
+
+        return np.stack([
+            lw * rw - lx * rx - ly * ry - lz * rz,
+            lw * rx + lx * rw + ly * rz - lz * ry,
+            lw * ry - lx * rz + ly * rw + lz * rx,
+            lw * rz + lx * ry - ly * rx + lz * rw
+        ], axis=-1)
+
+    @staticmethod
+    def BatchSlerp(start: np.ndarray, end: np.ndarray, t):
+        """
+        Spherical linear interpolation between many pairs of unit quaternions at once, along the shorter arc
+        :param start: the Nx4 (wxyz) quaternions at t = 0
+        :param end: the Nx4 (wxyz) quaternions at t = 1
+        :param t: the interpolation factor, one for all or one per pair
+        :return: the Nx4 interpolated unit quaternions
+        """
+        t = np.asarray(t, dtype=np.result_type(start, end))[..., None]
+
+        cosine = np.sum(start * end, axis=-1, keepdims=True)
+
+        # q and -q are the same rotation, flipping the end keeps the interpolation on the shorter arc
+        end = np.where(cosine < 0, -end, end)
+        cosine = np.abs(cosine)
+
+        angle = np.arccos(np.minimum(cosine, 1))
+        sine = np.sin(angle)
+
+        # nearly parallel quaternions divide by a vanishing sine, they are interpolated linearly instead
+        near = sine < 1e-4
+        sine = np.where(near, 1, sine)
+        startWeight = np.where(near, 1 - t, np.sin((1 - t) * angle) / sine)
+        endWeight = np.where(near, t, np.sin(t * angle) / sine)
+
+        result = startWeight * start + endWeight * end
+        return result / np.linalg.norm(result, axis=-1, keepdims=True)
+
+    @staticmethod
+    def BatchToMatrix(quaternions: np.ndarray):
+        """
+        Converts many quaternions to rotation matrices at once, the batched version of ToMatrix
+        :param quaternions: the Nx4 (wxyz) quaternions, they don't need to be normalized
+        :return: the Nx3x3 rotation matrices
+        """
+        w, x, y, z = quaternions.T
+
+        # dividing by the squared length normalizes the quaternion
+        s = 2 / np.einsum("ij,ij->i", quaternions, quaternions)
+
+        matrices = np.empty((len(quaternions), 3, 3), quaternions.dtype)
+        matrices[:, 0, 0] = 1 - s * (y * y + z * z)
+        matrices[:, 0, 1] = s * (x * y - z * w)
+        matrices[:, 0, 2] = s * (x * z + y * w)
+        matrices[:, 1, 0] = s * (x * y + z * w)
+        matrices[:, 1, 1] = 1 - s * (x * x + z * z)
+        matrices[:, 1, 2] = s * (y * z - x * w)
+        matrices[:, 2, 0] = s * (x * z - y * w)
+        matrices[:, 2, 1] = s * (y * z + x * w)
+        matrices[:, 2, 2] = 1 - s * (x * x + y * y)
+
+        return matrices
+
+    @staticmethod
+    def BatchMultiplyVector(quaternions: np.ndarray, vectors: np.ndarray):
+        """
+        Rotates many vectors at once, the batched version of MultiplyVector
+        :param quaternions: the Nx4 (wxyz) unit quaternions, or a single one for all vectors
+        :param vectors: the Nx3 vectors to rotate
+        :return: the Nx3 rotated vectors
+        """
+        w = quaternions[..., :1]
+        axis = quaternions[..., 1:]
+
+        # q v q^-1 expanded for unit quaternions: v + w t + axis x t, with t = 2 axis x v
+        t = 2 * np.cross(axis, vectors)
+        return vectors + w * t + np.cross(axis, t)
+
     def __str__(self):
         euler = self.ToEuler()
         # 3 decimal places, align each column to center using ^, and use a space as a fill character
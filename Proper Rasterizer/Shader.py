@@ -1,20 +1,91 @@
+import os
+import re
+
 from OpenGL.GL import *
 
 from OpenGL.GL.shaders import compileShader, compileProgram
 
+import numpy as np
+
+# include "file" directive, the path is relative to the including file
+INCLUDE_PATTERN = re.compile(r'^[ \t]*#include[ \t]+"([^"]+)"[ \t]*$', re.MULTILINE)
+
+# the #version line, which has to stay first, the DEFINES go right after it
+VERSION_PATTERN = re.compile(r'^[ \t]*#version[^\n]*\n', re.MULTILINE)
+
+# number of cascades of the sun's shadow map, see Light.updateCascades
+CASCADE_COUNT = 4
+
+# defined at the top of every shader by Shader.Load, so the shaders and the python side share one value
+DEFINES = {"CASCADE_COUNT": CASCADE_COUNT}
+
+# uniform block of shaders/common/frame.glsl and the binding point of its buffer, see FrameUniforms
+FRAME_BLOCK = "Frame"
+FRAME_BINDING = 0
+
+# std140 layout of the Frame block, array elements and vec3s take up 16 bytes, so they are stored as 4 floats
+FRAME_DTYPE = np.dtype([
+    ("view", "f4", (4, 4)),
+    ("projection", "f4", (4, 4)),
+    ("inverseView", "f4", (4, 4)),
+    ("inverseProjection", "f4", (4, 4)),
+    ("lightSpaceMatrices", "f4", (CASCADE_COUNT, 4, 4)),
+    ("cascadeSplits", "f4", (CASCADE_COUNT, 4)),
+    ("camPos", "f4", 3),
+    ("time", "f4"),
+    ("camFwd", "f4", 4),
+    ("camUp", "f4", 4),
+    ("camRight", "f4", 4),
+    ("lightPos", "f4", 4),
+    ("lightDir", "f4", 4),
+    ("sunColor", "f4", 4),
+])
+
+# the glUniform function and the number of components of each uniform type the shaders use,
+# samplers and bools are set as ints
+INT_SETTERS = {
+    GL_INT: (glUniform1iv, 1), GL_BOOL: (glUniform1iv, 1),
+    GL_SAMPLER_2D: (glUniform1iv, 1), GL_SAMPLER_2D_ARRAY: (glUniform1iv, 1), GL_SAMPLER_CUBE: (glUniform1iv, 1),
+}
+FLOAT_SETTERS = {
+    GL_FLOAT: (glUniform1fv, 1), GL_FLOAT_VEC2: (glUniform2fv, 2), GL_FLOAT_VEC3: (glUniform3fv, 3), GL_FLOAT_VEC4: (glUniform4fv, 4),
+}
+MATRIX_SETTERS = {
+    GL_FLOAT_MAT3: (glUniformMatrix3fv, 9), GL_FLOAT_MAT4: (glUniformMatrix4fv, 16),
+}
+
 class Shader:
     def __init__(self, vertex_path: str, fragment_path: str):
         
-        with open(vertex_path, "r") as file:
-            vertex_src = file.read()
-
-        with open(fragment_path, "r") as file:
-            fragment_src = file.read()
+        vertex_src = Shader.Load(vertex_path)
+        fragment_src = Shader.Load(fragment_path)
             
         vertex_shader = compileShader(vertex_src, GL_VERTEX_SHADER)
         fragment_shader = compileShader(fragment_src, GL_FRAGMENT_SHADER)
 
         self.program = compileProgram(vertex_shader, fragment_shader)
+
+        # GLSL 330 can't set the binding in the shader
+        frameBlock = glGetUniformBlockIndex(self.program, FRAME_BLOCK)
+        if frameBlock != GL_INVALID_INDEX:
+            glUniformBlockBinding(self.program, frameBlock, FRAME_BINDING)
+
+            size = np.zeros(1, np.int32)
+            glGetActiveUniformBlockiv(self.program, frameBlock, GL_UNIFORM_BLOCK_DATA_SIZE, size)
+            Shader.CheckFrameBlock(int(size[0]), f"{vertex_path} and {fragment_path}")
+
+        # name -> (location, type) of every active uniform, the members of uniform blocks have no location
+        self.uniforms = {}
+        for index in range(glGetProgramiv(self.program, GL_ACTIVE_UNIFORMS)):
+            name, size, uniformType = glGetActiveUniform(self.program, index)
+            name = name.decode().removesuffix("[0]")
+
+            location = glGetUniformLocation(self.program, name)
+            if location != -1:
+                self.uniforms[name] = (location, uniformType)
+
+        # the bytes last uploaded to each int and float uniform, to skip uploading the same value again
+        self.values = {}
         
     def use(self):
         """
@@ -24,6 +95,106 @@ class Shader:
 
     def get_keyword(self, keyword):
         """
-        Get the location of a keyword in the shader
+        Get the location of a keyword in the shader, -1 if the shader doesn't use it
+        """
+        return self.uniforms.get(keyword, (-1, None))[0]
+
+    def setInt(self, name: str, value):
         """
-        return glGetUniformLocation(self.program, keyword)
\ No newline at end of file
+        Sets an int, bool or sampler uniform, or an array of them. The shader has to be in use.
+
+        :param name: The name of the uniform
+        :param value: The value, for a sampler the texture unit
+        """
+        self.upload(name, np.asarray(value, np.int32), INT_SETTERS)
+
+    def setFloat(self, name: str, value):
+        """
+        Sets a float or vector uniform, or an array of them. The shader has to be in use.
+
+        :param name: The name of the uniform
+        :param value: The value
+        """
+        self.upload(name, np.asarray(value, np.float32), FLOAT_SETTERS)
+
+    def setMatrix(self, name: str, value: np.ndarray):
+        """
+        Sets a mat3 or mat4 uniform, or an array of them. The shader has to be in use.
+
+        :param name: The name of the uniform
+        :param value: The matrix, stored row by row like all matrices on the CPU
+        """
+        self.upload(name, np.asarray(value, np.float32), MATRIX_SETTERS)
+
+    def upload(self, name: str, value: np.ndarray, setters: dict):
+        """
+        Uploads a value with the glUniform function of the uniform's type, unless the uniform already holds it.
+        Matrices are always uploaded.
+        Uniforms the shader doesn't use are skipped, like glUniform does for a location of -1.
+
+        :param name: The name of the uniform
+        :param value: The value, already converted to the type of the setter
+        :param setters: The glUniform functions of the types the value can be uploaded to
+        """
+        if name not in self.uniforms:
+            return
+
+        location, uniformType = self.uniforms[name]
+        if uniformType not in setters:
+            raise TypeError(f"Uniform {name} has type {uniformType!r}, it can't be set with {', '.join(map(repr, setters))}")
+
+        setter, components = setters[uniformType]
+
+        # model matrices change with nearly every draw, comparing them would cost more than the upload
+        if setters is MATRIX_SETTERS:
+            setter(location, value.size // components, GL_TRUE, value)
+            return
+
+        data = value.tobytes()
+        if self.values.get(name) == data:
+            return
+
+        self.values[name] = data
+
+        setter(location, value.size // components, value)
+
+    @staticmethod
+    def CheckFrameBlock(size: int, name: str):
+        """
+        Checks that the Frame buffer is large enough for the block a program declares, a buffer smaller than the block
+        reads garbage instead of failing. Drivers may leave out the padding at the end of the block, so smaller is fine.
+
+        :param size: The size of the block in bytes, as reported by the driver
+        :param name: The shaders of the program, for the error message
+        """
+        if size > FRAME_DTYPE.itemsize:
+            raise ValueError(f"The {FRAME_BLOCK} block of {name} takes {size} bytes, FRAME_DTYPE only {FRAME_DTYPE.itemsize}")
+
+    @staticmethod
+    def Load(path: str, included: tuple = ()):
+        """
+        Reads a shader source file and replaces its #include "file" lines with the contents of the file,
+        the DEFINES are added after the #version line
+
+        :param path: The path to the shader source
+        :param included: The files including this one, to catch include cycles
+        :return: The source code
+        """
+        if path in included:
+            raise ValueError(f"Shader include cycle: {' -> '.join(included + (path,))}")
+
+        with open(path, "r") as file:
+            source = file.read()
+
+        directory = os.path.dirname(path)
+
+        source = INCLUDE_PATTERN.sub(lambda match: Shader.Load(os.path.normpath(os.path.join(directory, match.group(1))), included + (path,)), source)
+
+        if included:
+            return source
+
+        version = VERSION_PATTERN.search(source)
+        start = version.end() if version else 0
+        defines = "".join(f"#define {name} {value}\n" for name, value in DEFINES.items())
+
+        return source[:start] + defines + source[start:]
@@ -4,9 +4,7 @@ import blender
 
 import pygame
 
-from Camera import Camera
 from Shader import Shader
-from Light import Light
 
 import numpy as np
 
@@ -41,25 +39,11 @@ class Skybox:
         glActiveTexture(GL_TEXTURE1)
         glBindTexture(GL_TEXTURE_CUBE_MAP, self.cubeMap)
 
-        self.vao = glGenVertexArrays(1)
-        glBindVertexArray(self.vao)
-
-        self.vbo = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-
-        glBufferData(GL_ARRAY_BUFFER, self.skyboxMesh.vertices, GL_STATIC_DRAW)
-
-        self.ibo = glGenBuffers(1)
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.skyboxMesh.faces, GL_STATIC_DRAW)
-
-    def draw(self, shader: Shader, camera: Camera, sun: Light):
+    def draw(self, shader: Shader):
         """
-        Draws the skybox
+        Draws the skybox, the camera and the sun color are part of the frame uniforms
         
         :param shader: The shader to use, must be a skybox shader
-        :param camera: The camera to use, to get the view and projection matrices
         """
 
         glDepthMask(GL_FALSE)
@@ -69,32 +53,13 @@ class Skybox:
         glDepthFunc(GL_LEQUAL)
         shader.use()
 
-        proj = camera.getProjectionMatrix()
-        view = camera.getViewMatrix()
-        view[0][3] = 0
-        view[1][3] = 0
-        view[2][3] = 0
+        shader.setInt("skybox", 1)
 
-        glUniformMatrix4fv(shader.get_keyword("view"), 1, GL_TRUE, view)
-        glUniformMatrix4fv(shader.get_keyword("projection"), 1, GL_TRUE, proj)
-        glUniform1i(shader.get_keyword("skybox"), 1)
-
-        glUniform3fv(shader.get_keyword("sunColor"), 1, sun.color)
-        
-        glBindVertexArray(self.vao)
         glActiveTexture(GL_TEXTURE1)
         glBindTexture(GL_TEXTURE_CUBE_MAP, self.cubeMap)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
 
-        glEnableVertexAttribArray(0)
-        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
-        
-        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-        
-        glDrawElements(GL_TRIANGLES, 36, GL_UNSIGNED_INT, None)
-        
-        glDisableVertexAttribArray(0)
-        glBindVertexArray(0)
+        # only the positions are read, they double as the cube map direction
+        self.skyboxMesh.draw()
 
         glDepthFunc(GL_LESS)
         glDepthMask(GL_TRUE)
@@ -0,0 +1,168 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+import blender
+
+def write_obj(source: str):
+    """
+    Writes the obj source to a temporary file and returns its path
+    """
+    handle, path = tempfile.mkstemp(suffix=".obj")
+    with os.fdopen(handle, "w") as file:
+        file.write(source)
+    return path
+
+class BlenderTests(unittest.TestCase):
+    def load(self, source: str, chunk_size: int = blender.CHUNK_SIZE):
+        path = write_obj(source)
+        try:
+            return blender.load_obj_file(path, chunk_size)
+        finally:
+            os.remove(path)
+
+    def test_load_obj_file_Triangles(self):
+        vertices, faces, normals, texcoords = self.load(
+            "# comment\n"
+            "o Plane\n"
+            "v 0.0 0.0 0.0\n"
+            "v 1.0 0.0 0.0\n"
+            "v 1.0 1.0 0.0\n"
+            "v 0.0 1.0 0.0\n"
+            "vt 0.0 0.0\n"
+            "vt 1.0 0.0\n"
+            "vt 1.0 1.0\n"
+            "vt 0.0 1.0\n"
+            "vn 0.0 0.0 1.0\n"
+            "s 0\n"
+            "f 1/1/1 2/2/1 3/3/1\n"
+            "f 1/1/1 3/3/1 4/4/1\n"
+        )
+        self.assertEqual(vertices.dtype, np.float32)
+        self.assertEqual(faces.dtype, np.uint32)
+        self.assertTrue(np.allclose(vertices[2], [1.0, 1.0, 0.0]))
+        self.assertTrue(np.array_equal(faces, [[0, 1, 2], [0, 2, 3]]))
+        self.assertEqual(normals.shape, (4, 3))
+        self.assertEqual(texcoords.shape, (4, 2))
+        self.assertTrue(np.allclose(texcoords[2], [1.0, 1.0]))
+
+    def test_load_obj_file_Welding(self):
+        # two triangles share an edge, but the shared corners use different texture coordinates in the second one
+        vertices, faces, normals, texcoords = self.load(
+            "v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\n"
+            "vt 0 0\nvt 1 0\nvt 0 1\nvt 1 1\nvt 0.5 0.5\n"
+            "vn 0 0 1\n"
+            "f 1/1/1 2/2/1 3/3/1\n"
+            "f 2/2/1 4/4/1 3/5/1\n"
+        )
+        self.assertEqual(len(vertices), 5)
+        self.assertTrue(np.array_equal(faces, [[0, 1, 2], [1, 3, 4]]))
+        self.assertTrue(np.allclose(vertices[faces[1]], [[1, 0, 0], [1, 1, 0], [0, 1, 0]]))
+        self.assertTrue(np.allclose(texcoords[faces[1]], [[1, 0], [1, 1], [0.5, 0.5]]))
+        self.assertTrue(np.allclose(normals, [0, 0, 1]))
+
+    def test_load_obj_file_CornerFormats(self):
+        source = "v 0 0 0\nv 1 0 0\nv 0 1 0\nvn 0 0 1\n"
+        for face in ["f 1 2 3\n", "f 1//1 2//1 3//1\n", "f -3 -2 -1\n"]:
+            _, faces, _, _ = self.load(source + face)
+            self.assertTrue(np.array_equal(faces, [[0, 1, 2]]))
+
+    def test_load_obj_file_Whitespace(self):
+        # indented records and tabs between the values, as some exporters write them
+        vertices, faces, normals, _ = self.load("v 0 0 0\n  v\t1 0 0\n\tv 0\t1 0\r\nvn 0 0 1\nf\t1//1 2//1\t3//1\n")
+
+        self.assertTrue(np.allclose(vertices, [[0, 0, 0], [1, 0, 0], [0, 1, 0]]))
+        self.assertTrue(np.array_equal(faces, [[0, 1, 2]]))
+        self.assertTrue(np.allclose(normals, [0, 0, 1]))
+
+    def test_load_obj_file_InvalidValues(self):
+        # parsing would silently stop at the first value that isn't a number
+        with self.assertRaises(ValueError):
+            self.load("v 0 0 0\nv 1 x 0\nv 0 1 0\nf 1 2 3\n")
+
+        with self.assertRaises(ValueError):
+            self.load("v 0 0 0\nv 1 0\nv 0 1 0\nf 1 2 3\n")
+
+    def test_load_obj_file_NoTexcoords(self):
+        vertices, _, _, texcoords = self.load("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+        self.assertEqual(texcoords.shape, (len(vertices), 2))
+
+    def test_load_obj_file_Polygons(self):
+        # a quad, a triangle and a pentagon, fan triangulated in file order
+        vertices, faces, _, _ = self.load(
+            "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nv 0.5 1.5 0\n"
+            "f 1 2 3 4\n"
+            "f 1 2 3\n"
+            "f 1 2 3 5 4\n"
+        )
+        self.assertEqual(faces.shape, (6, 3))
+        self.assertTrue(np.array_equal(faces, [[0, 1, 2], [0, 2, 3], [0, 1, 2], [0, 1, 2], [0, 2, 4], [0, 4, 3]]))
+
+    def test_load_obj_file_Chunked(self):
+        with open(os.path.join("..", "models", "jungle", "fern.obj")) as file:
+            source = file.read()
+
+        whole = self.load(source)
+        # small chunks split records and runs of records across chunk boundaries
+        chunked = self.load(source, 1000)
+
+        for expected, actual in zip(whole, chunked):
+            self.assertTrue(np.array_equal(expected, actual))
+
+    def test_load_obj_file_RelativeIndices(self):
+        source = "v 0 0 0\nv 1 0 0\nv 0 1 0\nf -3 -2 -1\nv 1 1 0\nf -3 -1 -2\n"
+        for chunk_size in [blender.CHUNK_SIZE, 8]:
+            vertices, faces, _, _ = self.load(source, chunk_size)
+            self.assertTrue(np.allclose(vertices[faces[1]], [[1, 0, 0], [1, 1, 0], [0, 1, 0]]))
+
+    def test_load_mesh_MissingNormals(self):
+        # files without vn records get smooth normals from their faces before they are cached
+        path = write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 1\nf 1 2 3\nf 2 4 3\n")
+        try:
+            mesh = blender.load_mesh(path, use_cache=False)
+        finally:
+            os.remove(path)
+
+        self.assertTrue(np.allclose(np.linalg.norm(mesh.normals, axis=1), 1))
+
+        # the origin only touches the first triangle, which lies in the xy plane
+        origin = np.flatnonzero(~mesh.vertices.any(axis=1))
+        self.assertTrue(np.allclose(mesh.normals[origin], [0, 0, 1]))
+
+    def test_load_mesh_MeasureACMR(self):
+        path = write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nv 1 1 0\nf 1 2 3\nf 2 4 3\n")
+        try:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                blender.load_mesh(path, use_cache=False, measure=True)
+        finally:
+            os.remove(path)
+
+        self.assertIn("ACMR 2.000 -> 2.000", output.getvalue())
+
+    def test_load_meshes(self):
+        paths = [write_obj("v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 0 1\nf 1/1 2/2 3/3\n"), write_obj("v 0 0 0\nv 2 0 0\nv 0 2 0\nv 2 2 0\nf 1 2 3\nf 2 4 3\n")]
+        try:
+            # meshes built in worker processes come back without GPU buffers, with their attributes still interleaved
+            meshes = blender.load_meshes([(path, 0) for path in paths], processes=2)
+        finally:
+            for path in paths:
+                os.remove(path)
+
+        self.assertEqual([len(mesh.faces) for mesh in meshes], [1, 2])
+        self.assertTrue(np.allclose(meshes[1].vertices[:, 0].max(), 2))
+
+        for mesh in meshes:
+            self.assertFalse(mesh.isUploaded())
+            self.assertTrue(np.shares_memory(mesh.vertices, mesh.vertexData))
+
+if __name__ == '__main__':
+    unittest.main()
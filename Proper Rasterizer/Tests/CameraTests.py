@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from Camera import Camera
+from Transform import Transform
+
+def posed():
+    camera = Camera(80, 16 / 9, 0.1, 500)
+    camera.transform.position = [10, -5, 3]
+    camera.rotate_local(20, 35)
+    return camera
+
+class CameraTests(unittest.TestCase):
+    def test_ViewMatrix(self):
+        camera = posed()
+
+        expected = Transform.RotationMatrixX(camera.rotX) @ Transform.RotationMatrixY(camera.rotY) @ camera.transform.getTranslationMatrix()
+
+        self.assertTrue(np.allclose(camera.getViewMatrix(), expected, atol=1e-5))
+        self.assertTrue(np.allclose(camera.getViewProjectionMatrix(), camera.getProjectionMatrix() @ expected, atol=1e-4))
+
+    def test_Inverses(self):
+        camera = posed()
+
+        for matrix, inverse in ((camera.getViewMatrix(), camera.getInverseViewMatrix()),
+                                (camera.getProjectionMatrix(), camera.getInverseProjectionMatrix()),
+                                (camera.getViewProjectionMatrix(), camera.getInverseViewProjectionMatrix())):
+            self.assertEqual(matrix.dtype, np.float32)
+            self.assertTrue(matrix.flags["C_CONTIGUOUS"])
+            self.assertTrue(np.allclose(inverse @ matrix, np.identity(4), atol=1e-4))
+
+    def test_Cached(self):
+        camera = posed()
+        view = camera.getViewMatrix()
+        key = camera.viewKey
+
+        self.assertIs(camera.getViewMatrix(), view)
+        self.assertEqual(camera.viewKey, key)
+
+        # the same array is updated when the camera moves
+        camera.transform.position += np.array([1, 0, 0])
+        self.assertIs(camera.getViewMatrix(), view)
+        self.assertNotEqual(camera.viewKey, key)
+        self.assertTrue(np.allclose(camera.getInverseViewMatrix()[:3, 3], [-11, 5, -3]))
+
+    def test_LensChange(self):
+        camera = posed()
+        projection = camera.getProjectionMatrix().copy()
+
+        camera.fov = 60
+
+        self.assertFalse(np.allclose(camera.getProjectionMatrix(), projection))
+        self.assertTrue(np.allclose(camera.getProjectionMatrix(), camera.calculateProjectionMatrix()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from FrameUniforms import FrameUniforms, FRAME_DTYPE
+from Camera import Camera
+from Light import Light
+
+class FrameUniformsTests(unittest.TestCase):
+    def test_Std140Layout(self):
+        # offsets of the Frame block in shaders/common/frame.glsl under the std140 rules
+        offsets = {"view": 0, "projection": 64, "inverseView": 128, "inverseProjection": 192,
+                   "lightSpaceMatrices": 256, "cascadeSplits": 512,
+                   "camPos": 576, "time": 588, "camFwd": 592, "camUp": 608, "camRight": 624,
+                   "lightPos": 640, "lightDir": 656, "sunColor": 672}
+
+        self.assertEqual({name: FRAME_DTYPE.fields[name][1] for name in offsets}, offsets)
+        self.assertEqual(FRAME_DTYPE.itemsize, 688)
+
+    def test_Pack(self):
+        camera = Camera(80, 16 / 9, 0.1, 500)
+        camera.transform.position = [10, -5, 3]
+        camera.rotate_local(20, 35)
+
+        sun = Light(np.array([1, 0.5, 0.25], "f"), 1)
+        sun.transform.position = [-60, 80, 0]
+        sun.updateCascades(camera, 1024)
+
+        data = np.zeros((), FRAME_DTYPE)
+        FrameUniforms.Pack(data, camera, sun, 2.5)
+
+        self.assertTrue(np.allclose(data["view"], camera.getViewMatrix()))
+        self.assertTrue(np.allclose(data["lightSpaceMatrices"], sun.cascadeMatrices))
+        self.assertTrue(np.allclose(data["cascadeSplits"][:, 0], sun.cascadeSplits))
+
+        # the world position of the camera
+        self.assertTrue(np.allclose(data["camPos"], camera.getInverseViewMatrix()[:3, 3], atol=1e-5))
+        # the water shader negates it back to the transform position it was tuned with
+        self.assertTrue(np.allclose(-data["camPos"], camera.transform.position))
+        self.assertEqual(data["time"], 2.5)
+        self.assertTrue(np.allclose(data["lightDir"], [0.6, -0.8, 0, 0]))
+        self.assertTrue(np.allclose(data["sunColor"], [1, 0.5, 0.25, 0]))
+
+if __name__ == '__main__':
+    unittest.main()
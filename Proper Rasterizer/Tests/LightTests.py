@@ -0,0 +1,74 @@
+import os
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from Light import Light
+from Camera import Camera
+from Shader import Shader, CASCADE_COUNT, FRAME_DTYPE
+
+def posed():
+    camera = Camera(80, 16 / 9, 0.1, 500)
+    camera.transform.position = [150, -36, -34]
+    camera.rotate_local(15, 40)
+
+    sun = Light(np.array([1, 1, 1], "f"), 1)
+    sun.transform.position = [-150, 150, -100]
+
+    return camera, sun
+
+class LightTests(unittest.TestCase):
+    def test_CascadeSplits(self):
+        splits = Light.CascadeSplits(0.1, 250, 4, 0.9)
+
+        self.assertEqual(len(splits), 4)
+        self.assertTrue(np.all(np.diff(splits) > 0))
+        self.assertAlmostEqual(splits[-1], 250)
+
+        self.assertTrue(np.allclose(Light.CascadeSplits(20, 100, 4, 0), [40, 60, 80, 100]))
+
+    def test_CascadeCount(self):
+        # the count comes from Shader, which defines it in every shader and sizes the Frame block with it
+        sun = Light(np.array([1, 1, 1], "f"), 1)
+
+        self.assertEqual(sun.cascadeMatrices.shape, (CASCADE_COUNT, 4, 4))
+        self.assertEqual(FRAME_DTYPE["cascadeSplits"].shape[0], CASCADE_COUNT)
+        self.assertIn(f"#define CASCADE_COUNT {CASCADE_COUNT}\n", Shader.Load(os.path.join("..", "shaders", "basic", "fragment.glsl")))
+
+    def test_CascadesContainSlices(self):
+        camera, sun = posed()
+        sun.updateCascades(camera, 1024)
+
+        self.assertAlmostEqual(sun.cascadeSplits[-1], sun.shadowDistance, places=3)
+
+        tan = np.tan(np.deg2rad(camera.fov) * 0.5)
+        near = camera.near
+        for matrix, split in zip(sun.cascadeMatrices, sun.cascadeSplits):
+            # corners of the slice, pulled in slightly so they are strictly inside
+            for depth in (near, split):
+                for x in (-1, 1):
+                    for y in (-1, 1):
+                        point = np.array([x * tan * camera.aspect * depth, y * tan * depth, -depth, 1]) * [0.99, 0.99, 1, 1]
+                        world = camera.getInverseViewMatrix() @ point
+                        clip = matrix @ world
+
+                        self.assertTrue(np.all(np.abs(clip[:3] / clip[3]) <= 1), (depth, x, y))
+            near = split
+
+    def test_CascadeSnapsToTexels(self):
+        camera, sun = posed()
+        sun.updateCascades(camera, 1024)
+        before = sun.cascadeMatrices.copy()
+
+        # a tiny move keeps the cascades on the same texels
+        camera.transform.position += np.array([0, 0, 1e-4])
+        sun.updateCascades(camera, 1024)
+
+        self.assertTrue(np.allclose(sun.cascadeMatrices[:, :2, 3], before[:, :2, 3]))
+
+if __name__ == '__main__':
+    unittest.main()
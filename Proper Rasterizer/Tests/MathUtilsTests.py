@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from MathUtils import MathUtils
+from Camera import Camera
+
+class FrustumTests(unittest.TestCase):
+    def test_PerspectiveFrustum(self):
+        # the camera looks down -z from the origin
+        camera = Camera(90, 1, 0.1, 100)
+        planes = MathUtils.FrustumPlanes(camera.getViewProjectionMatrix())
+
+        centers = np.array([
+            [0, 0, -10],    # in front
+            [0, 0, 10],     # behind
+            [0, 0, -200],   # beyond the far plane
+            [50, 0, -10],   # far to the right
+            [11, 0, -10],   # straddles the right plane
+        ], dtype=np.float64)
+
+        visible = MathUtils.BoxesInFrustum(planes, centers - 1.5, centers + 1.5)
+
+        self.assertEqual(visible.tolist(), [True, False, False, False, True])
+
+    def test_OrthographicFrustum(self):
+        planes = MathUtils.FrustumPlanes(Camera.getOrthographicMatrix(-10, 10, -10, 10, 1, 50))
+
+        centers = np.array([[0, 0, -20], [0, 0, 0], [0, 15, -20], [0, 0, -60]], dtype=np.float64)
+        visible = MathUtils.BoxesInFrustum(planes, centers - 0.5, centers + 0.5)
+
+        self.assertEqual(visible.tolist(), [True, False, False, False])
+
+    def test_PlanesNormalized(self):
+        camera = Camera(80, 16 / 9, 0.1, 500)
+        camera.transform.position = [3, 4, 5]
+        planes = MathUtils.FrustumPlanes(camera.getViewProjectionMatrix())
+
+        self.assertEqual(planes.shape, (6, 4))
+        self.assertTrue(np.allclose(np.linalg.norm(planes[:, :3], axis=1), 1))
+
+if __name__ == '__main__':
+    unittest.main()
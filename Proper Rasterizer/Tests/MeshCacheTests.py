@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from MeshCache import MeshCache
+
+class MeshCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.previous_directory = MeshCache.directory
+        MeshCache.directory = os.path.join(self.directory, "cache")
+
+        self.source = os.path.join(self.directory, "mesh.obj")
+        with open(self.source, "w") as file:
+            file.write("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+
+        self.arrays = {name: np.arange(9, dtype="f").reshape(3, 3) for name in MeshCache.ARRAYS}
+
+    def tearDown(self):
+        MeshCache.directory = self.previous_directory
+        shutil.rmtree(self.directory)
+
+    def test_MeshCache_RoundTrip(self):
+        self.assertIsNone(MeshCache.load(self.source))
+
+        MeshCache.save(self.source, self.arrays)
+        arrays = MeshCache.load(self.source)
+
+        for name in MeshCache.ARRAYS:
+            self.assertTrue(np.array_equal(arrays[name], self.arrays[name]))
+
+        # editing the loaded mesh must not touch the cache
+        arrays["vertices"][0, 0] = 100
+        self.assertEqual(MeshCache.load(self.source)["vertices"][0, 0], 0)
+
+    def test_MeshCache_InvalidatedBySourceChange(self):
+        MeshCache.save(self.source, self.arrays)
+
+        with open(self.source, "a") as file:
+            file.write("v 0 0 1\n")
+
+        self.assertIsNone(MeshCache.load(self.source))
+
+        # saving the new version replaces the old entry
+        MeshCache.save(self.source, self.arrays)
+        self.assertEqual(len(os.listdir(MeshCache.directory)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from MeshOptimizer import MeshOptimizer
+
+def grid(size: int):
+    """
+    Triangles of a size x size grid of quads, in a random order
+    """
+    rows, columns = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+    corner = (rows * (size + 1) + columns).ravel()
+
+    faces = np.concatenate((
+        np.stack((corner, corner + 1, corner + size + 2), axis=1),
+        np.stack((corner, corner + size + 2, corner + size + 1), axis=1)
+    )).astype(np.uint32)
+
+    return faces[np.random.default_rng(0).permutation(len(faces))]
+
+class MeshOptimizerTests(unittest.TestCase):
+    def test_MeshOptimizer_ACMR(self):
+        # every vertex of every triangle is a miss when nothing is shared
+        faces = np.arange(30, dtype=np.uint32).reshape(10, 3)
+        self.assertEqual(MeshOptimizer.ACMR(faces), 3.0)
+
+        # the second triangle reuses two cached vertices
+        faces = np.array([[0, 1, 2], [2, 1, 3]], dtype=np.uint32)
+        self.assertEqual(MeshOptimizer.ACMR(faces), 2.0)
+
+    def test_MeshOptimizer_Optimize(self):
+        faces = grid(32)
+        vertex_count = 33 * 33
+        vertices = np.arange(vertex_count * 3, dtype="f").reshape(vertex_count, 3)
+
+        optimized, (optimized_vertices,) = MeshOptimizer.Optimize(faces, [vertices])
+
+        self.assertLess(MeshOptimizer.ACMR(optimized), MeshOptimizer.ACMR(faces) * 0.5)
+
+        # same triangles, only in a different order and with different indices
+        expected = np.sort(np.sort(vertices[faces][:, :, 0], axis=1), axis=0)
+        actual = np.sort(np.sort(optimized_vertices[optimized][:, :, 0], axis=1), axis=0)
+        self.assertTrue(np.array_equal(expected, actual))
+
+        # vertices are ordered by first use
+        _, first = np.unique(optimized.ravel(), return_index=True)
+        self.assertTrue(np.all(np.diff(first) > 0))
+
+if __name__ == '__main__':
+    unittest.main()
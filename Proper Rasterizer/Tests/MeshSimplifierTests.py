@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from MeshSimplifier import MeshSimplifier
+
+def sphere(rings: int, segments: int):
+    """
+    Vertices and triangles of a closed uv sphere
+    """
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    theta, phi = np.meshgrid(theta, phi, indexing="ij")
+
+    vertices = np.stack((np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)), axis=-1).reshape(-1, 3)
+    vertices = np.concatenate(([[0, 1, 0]], vertices, [[0, -1, 0]])).astype("f")
+
+    faces = []
+    bottom = len(vertices) - 1
+    for j in range(segments):
+        k = (j + 1) % segments
+        faces.append([0, 1 + k, 1 + j])
+        faces.append([bottom, 1 + (rings - 2) * segments + j, 1 + (rings - 2) * segments + k])
+        for i in range(rings - 2):
+            a, b = 1 + i * segments + j, 1 + i * segments + k
+            faces.append([a, b, b + segments])
+            faces.append([a, b + segments, a + segments])
+
+    return vertices, np.array(faces, dtype=np.uint32)
+
+class MeshSimplifierTests(unittest.TestCase):
+    def test_MeshSimplifier_BuildLODs(self):
+        vertices, faces = sphere(24, 48)
+
+        lods = MeshSimplifier.BuildLODs(vertices, faces, 3)
+
+        self.assertEqual(len(lods), 3)
+
+        previous = faces
+        for lod in lods:
+            # every level roughly halves the triangles and only references the original vertices
+            self.assertLess(len(lod), len(previous) * 0.75)
+            self.assertLess(lod.max(), len(vertices))
+            self.assertEqual(lod.dtype, np.uint32)
+
+            # no degenerate triangles
+            self.assertTrue(np.all(lod[:, 0] != lod[:, 1]) and np.all(lod[:, 1] != lod[:, 2]) and np.all(lod[:, 0] != lod[:, 2]))
+
+            # no triangle flipped inside out, all normals still point away from the center
+            a, b, c = vertices[lod[:, 0]], vertices[lod[:, 1]], vertices[lod[:, 2]]
+            normals = np.cross(b - a, c - a)
+            self.assertTrue(np.all(np.einsum("ij,ij->i", normals, a + b + c) > 0))
+
+            previous = lod
+
+    def test_MeshSimplifier_Boundary(self):
+        # a flat open grid keeps its outline
+        size = 16
+        rows, columns = np.meshgrid(np.arange(size + 1), np.arange(size + 1), indexing="ij")
+        vertices = np.stack((rows.ravel(), columns.ravel(), np.zeros(rows.size)), axis=1).astype("f")
+
+        rows, columns = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+        corner = (rows * (size + 1) + columns).ravel()
+        faces = np.concatenate((
+            np.stack((corner, corner + size + 2, corner + 1), axis=1),
+            np.stack((corner, corner + size + 1, corner + size + 2), axis=1)
+        )).astype(np.uint32)
+
+        lod, = MeshSimplifier.Simplify(vertices, faces, [len(faces) // 4])
+
+        used = vertices[np.unique(lod)]
+        self.assertEqual(used[:, 0].min(), 0)
+        self.assertEqual(used[:, 0].max(), size)
+        self.assertEqual(used[:, 1].min(), 0)
+        self.assertEqual(used[:, 1].max(), size)
+
+        # the area stays covered
+        a, b, c = vertices[lod[:, 0]], vertices[lod[:, 1]], vertices[lod[:, 2]]
+        area = np.linalg.norm(np.cross(b - a, c - a), axis=1).sum() / 2
+        self.assertAlmostEqual(area, size * size, places=3)
+
+if __name__ == '__main__':
+    unittest.main()
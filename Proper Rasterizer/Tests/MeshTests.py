@@ -0,0 +1,276 @@
+import pickle
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from Mesh import Mesh, STRIP_RESTART
+from Transform import Transform
+from Quaternion import Quaternion
+
+def geometry(vertices, faces, uvs, normals=None):
+    """
+    A mesh holding only the arrays Mesh works on, without the GPU buffers a fully constructed Mesh needs
+    """
+    vertices = np.array(vertices, dtype="f")
+    normals = np.tile(np.array([0, 0, 1], dtype="f"), (len(vertices), 1)) if normals is None else np.array(normals, dtype="f")
+
+    mesh = Mesh.__new__(Mesh)
+    mesh.vertices = vertices
+    mesh.faces = np.array(faces, dtype=np.uint32)
+    mesh.normals = normals
+    mesh.uvs = np.array(uvs, dtype="f")
+    mesh.tangents = np.zeros_like(vertices)
+    mesh.bitangents = np.zeros_like(vertices)
+    mesh.transform = Transform()
+
+    return mesh
+
+class MeshTests(unittest.TestCase):
+    def test_Mesh_calculateNormalMap(self):
+        # uvs follow x and y, so the tangent is x and the bitangent is y
+        mesh = geometry([[0, 0, 0], [2, 0, 0], [2, 2, 0], [0, 2, 0]], [[0, 1, 2], [0, 2, 3]], [[0, 0], [1, 0], [1, 1], [0, 1]])
+
+        mesh.calculateNormalMap()
+
+        np.testing.assert_allclose(mesh.tangents, np.tile([1, 0, 0], (4, 1)), atol=1e-6)
+        np.testing.assert_allclose(mesh.bitangents, np.tile([0, 1, 0], (4, 1)), atol=1e-6)
+
+    def test_Mesh_calculateNormalMap_DegenerateUVs(self):
+        # the second triangle has all its uvs in one point
+        mesh = geometry([[0, 0, 0], [1, 0, 0], [0, 1, 0], [5, 0, 0], [6, 0, 0], [5, 1, 0]], [[0, 1, 2], [3, 4, 5]], [[0, 0], [1, 0], [0, 1], [0, 0], [0, 0], [0, 0]])
+
+        mesh.calculateNormalMap()
+
+        self.assertFalse(np.any(np.isnan(mesh.tangents)) or np.any(np.isnan(mesh.bitangents)))
+
+        np.testing.assert_allclose(mesh.tangents[:3], np.tile([1, 0, 0], (3, 1)), atol=1e-6)
+
+        # the fallback frame is unit length and perpendicular to the normal
+        np.testing.assert_allclose(np.linalg.norm(mesh.tangents[3:], axis=1), 1, atol=1e-6)
+        np.testing.assert_allclose(np.einsum("ij,ij->i", mesh.tangents[3:], mesh.normals[3:]), 0, atol=1e-6)
+        np.testing.assert_allclose(np.einsum("ij,ij->i", mesh.bitangents[3:], mesh.normals[3:]), 0, atol=1e-6)
+
+    def test_Mesh_VertexNormals(self):
+        # a tent, the ridge vertices get the average of both slopes
+        vertices = np.array([[0, 0, 0], [1, 1, 0], [2, 0, 0], [0, 0, 1], [1, 1, 1], [2, 0, 1]], dtype="f")
+        faces = np.array([[0, 4, 1], [0, 3, 4], [1, 4, 2], [4, 5, 2]], dtype=np.uint32)
+
+        normals = Mesh.VertexNormals(vertices, faces)
+
+        np.testing.assert_allclose(normals[1], [0, 1, 0], atol=1e-6)
+        np.testing.assert_allclose(normals[0], [-np.sqrt(0.5), np.sqrt(0.5), 0], atol=1e-6)
+
+    def test_Mesh_VertexNormals_Angle(self):
+        # corner of a cube where one side is split into two triangles and the others into one,
+        # area weighting leans towards the sides with more area at the corner, angle weighting doesn't
+        vertices = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 1, 0]], dtype="f")
+        faces = np.array([[0, 2, 4], [0, 4, 1], [0, 3, 2], [0, 1, 3]], dtype=np.uint32)
+
+        normal = Mesh.VertexNormals(vertices, faces, "angle")[0]
+        np.testing.assert_allclose(normal, -np.ones(3) / np.sqrt(3), atol=1e-6)
+
+        normal = Mesh.VertexNormals(vertices, faces, "area")[0]
+        self.assertGreater(abs(normal[2]), abs(normal[0]))
+
+        with self.assertRaises(ValueError):
+            Mesh.VertexNormals(vertices, faces, "uniform")
+
+    def test_Mesh_VertexNormals_Dirty(self):
+        rng = np.random.default_rng(0)
+        size = 16
+        rows, columns = np.meshgrid(np.arange(size + 1), np.arange(size + 1), indexing="ij")
+        vertices = np.stack((rows.ravel(), rng.random(rows.size), columns.ravel()), axis=1).astype("f")
+
+        rows, columns = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+        corner = (rows * (size + 1) + columns).ravel()
+        faces = np.concatenate((
+            np.stack((corner, corner + 1, corner + size + 2), axis=1),
+            np.stack((corner, corner + size + 2, corner + size + 1), axis=1)
+        )).astype(np.uint32)
+
+        dirty = np.array([40, 3, 100, 288])
+        for weighting in ("area", "angle"):
+            everything = Mesh.VertexNormals(vertices, faces, weighting)
+            np.testing.assert_allclose(Mesh.VertexNormals(vertices, faces, weighting, dirty), everything[dirty], atol=1e-6)
+
+    def test_Mesh_Bounds(self):
+        # the box doesn't contain the origin
+        mesh = geometry([[1, 2, 3], [2, 4, 5], [1.5, 3, 7]], [[0, 1, 2]], [[0, 0], [1, 0], [0, 1]])
+        mesh.updateBounds()
+
+        np.testing.assert_allclose(mesh.bounds[0], [1, 2, 3])
+        np.testing.assert_allclose(mesh.bounds[1], [2, 4, 7])
+
+        center, radius = mesh.boundingSphere
+        self.assertTrue(np.all(np.linalg.norm(mesh.vertices - center, axis=1) <= radius + 1e-6))
+
+    def test_Mesh_GrowBounds(self):
+        vertices = np.array([[x, y, 0] for x in range(4) for y in range(4)], dtype="f")
+        faces = np.array([[0, 1, 4], [1, 5, 4]], dtype=np.uint32)
+        mesh = Mesh(vertices, faces, np.array([]), np.zeros((16, 2), dtype="f"))
+
+        # flushing an edit only extends the bounds over the edited vertices
+        mesh.vertices[5] = [1, 1, 8]
+        mesh.markDirty(np.array([5]))
+        mesh.flush()
+
+        np.testing.assert_allclose(mesh.bounds[1], [3, 3, 8])
+        center, radius = mesh.boundingSphere
+        self.assertTrue(np.all(np.linalg.norm(mesh.vertices - center, axis=1) <= radius + 1e-6))
+
+        # moving it back leaves the bounds too large, until as many vertices were edited as the mesh has
+        mesh.vertices[5] = [1, 1, 0]
+        mesh.markDirty(np.array([5]))
+        mesh.flush()
+        np.testing.assert_allclose(mesh.bounds[1], [3, 3, 8])
+
+        mesh.markDirty(np.arange(14))
+        mesh.flush()
+        np.testing.assert_allclose(mesh.bounds[1], [3, 3, 0])
+
+    def test_Mesh_WorldBounds(self):
+        mesh = geometry([[0, 0, 0], [1, 0, 0], [0, 2, 0], [0, 0, 3]], [[0, 1, 2], [0, 2, 3]], [[0, 0], [1, 0], [0, 1], [1, 1]])
+        mesh.updateBounds()
+
+        mesh.transform.position = np.array([10, 0, 0], "f")
+        mesh.transform.scale = np.array([2, 2, 2])
+        mesh.transform.rotation = Quaternion.FromAxisAngle([0, 1, 0], 90)
+
+        low, high = mesh.getWorldBoundingBox()
+
+        # the box of the transformed corners
+        corners = np.array([[x, y, z, 1] for x in (0, 1) for y in (0, 2) for z in (0, 3)])
+        world = (mesh.transform.getTRSMatrix() @ corners.T).T[:, :3]
+        np.testing.assert_allclose(low, world.min(axis=0), atol=1e-5)
+        np.testing.assert_allclose(high, world.max(axis=0), atol=1e-5)
+
+        center, radius = mesh.getWorldBoundingSphere()
+        self.assertTrue(np.all(np.linalg.norm(world - center, axis=1) <= radius + 1e-5))
+
+        # cached while the transform stays the same, updated once it moves
+        self.assertIs(mesh.getWorldBoundingBox(), mesh.getWorldBoundingBox())
+
+        mesh.transform.position += np.array([0, 5, 0], "f")
+        low, _ = mesh.getWorldBoundingBox()
+        self.assertAlmostEqual(low[1], world.min(axis=0)[1] + 5, places=5)
+
+    def test_Mesh_DirtyRanges(self):
+        ranges = Mesh.DirtyRanges(np.array([7, 3, 4, 5, 200, 3, 260]), gap=16)
+        np.testing.assert_array_equal(ranges, [[3, 8], [200, 201], [260, 261]])
+
+        # close ranges are joined, the gap is uploaded with them
+        ranges = Mesh.DirtyRanges(np.array([7, 3, 4, 5, 200, 3, 260]), gap=64)
+        np.testing.assert_array_equal(ranges, [[3, 8], [200, 261]])
+
+        self.assertEqual(len(Mesh.DirtyRanges(np.array([], dtype=int))), 0)
+
+    def test_Mesh_MergeRanges(self):
+        ranges = np.array([[50, 60], [0, 10], [5, 40], [10, 12], [100, 101]])
+        np.testing.assert_array_equal(Mesh.MergeRanges(ranges, gap=0), [[0, 40], [50, 60], [100, 101]])
+        np.testing.assert_array_equal(Mesh.MergeRanges(ranges, gap=10), [[0, 60], [100, 101]])
+
+    def test_Mesh_Headless(self):
+        # constructing and editing a mesh needs no GL context, the upload waits for the first draw
+        mesh = Mesh(np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype="f"), np.array([[0, 1, 2]], dtype=np.uint32), np.array([]), np.array([[0, 0], [1, 0], [0, 1]], dtype="f"))
+
+        self.assertFalse(mesh.isUploaded())
+
+        mesh.vertices[2] = [0, 2, 0]
+        mesh.recalculate_normals()
+
+        np.testing.assert_allclose(mesh.normals, np.tile([0, 0, 1], (3, 1)), atol=1e-6)
+        np.testing.assert_allclose(mesh.bounds[1], [1, 2, 0])
+
+        copy = pickle.loads(pickle.dumps(mesh))
+
+        np.testing.assert_array_equal(copy.vertexData, mesh.vertexData)
+        self.assertTrue(np.shares_memory(copy.normals, copy.vertexData))
+        self.assertFalse(copy.isUploaded())
+
+    def test_Mesh_GridIndices(self):
+        # same triangles, in the same order, as the quad loops they replace
+        rows, columns = 4, 6
+        expected = []
+        for y in range(rows - 1):
+            for x in range(columns - 1):
+                expected.append([x + y * columns, x + 1 + y * columns, x + 1 + (y + 1) * columns])
+                expected.append([x + y * columns, x + 1 + (y + 1) * columns, x + (y + 1) * columns])
+
+        np.testing.assert_array_equal(Mesh.GridIndices(rows, columns), expected)
+
+    def test_Mesh_GridIndices_Strips(self):
+        rows, columns = 5, 7
+        faces = Mesh.GridIndices(rows, columns)
+        strip = Mesh.GridIndices(rows, columns, True)
+
+        # unroll the strips, every odd triangle of a strip has its first two corners swapped
+        triangles = []
+        for run in np.split(strip, np.flatnonzero(strip == STRIP_RESTART)):
+            run = run[run != STRIP_RESTART]
+            for k in range(len(run) - 2):
+                a, b, c = run[k:k + 3]
+                triangles.append([a, b, c] if k % 2 == 0 else [b, a, c])
+
+        def canonical(triangles):
+            # rotate every triangle to start at its smallest index, which keeps the winding
+            triangles = np.asarray(triangles)
+            first = np.argmin(triangles, axis=1)
+            rotated = np.stack([np.roll(triangle, -shift) for triangle, shift in zip(triangles, first)])
+            return sorted(map(tuple, rotated))
+
+        self.assertEqual(len(triangles), len(faces))
+        self.assertEqual(canonical(triangles), canonical(faces))
+
+    def test_Mesh_CreateQuad(self):
+        mesh = Mesh.CreateQuad(4)
+
+        self.assertEqual(len(mesh.vertices), 25)
+        self.assertEqual(len(mesh.faces), 32)
+        np.testing.assert_allclose(mesh.vertices[6], [0.25, 0.25, 0])
+        np.testing.assert_allclose(mesh.uvs[7], [0.25, 0.5])
+        self.assertIsNone(mesh.strip)
+
+        self.assertEqual(np.count_nonzero(Mesh.CreateQuad(4, True).strip == STRIP_RESTART), 3)
+
+    def test_Mesh_Octahedral(self):
+        rng = np.random.default_rng(0)
+        vectors = np.concatenate((rng.normal(size=(1000, 3)), np.eye(3), -np.eye(3)))
+
+        encoded = Mesh.OctahedralEncode(vectors)
+        self.assertEqual(encoded.dtype, np.int8)
+
+        decoded = Mesh.OctahedralDecode(encoded)
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        # 8 bits per component keep directions within about a degree
+        self.assertGreater(np.einsum("ij,ij->i", decoded, unit).min(), np.cos(np.radians(1.5)))
+
+    def test_Mesh_CompactVertices(self):
+        rng = np.random.default_rng(1)
+        vertices = rng.uniform(-5, 20, size=(100, 3)).astype("f")
+        normals = rng.normal(size=(100, 3)).astype("f")
+        tangents = np.cross(normals, rng.normal(size=(100, 3))).astype("f")
+        bitangents = np.cross(normals, tangents) * rng.choice([-1, 1], size=(100, 1))
+        uvs = rng.uniform(0, 4, size=(100, 2)).astype("f")
+
+        scale, offset = Mesh.PositionDecode([vertices.min(axis=0), vertices.max(axis=0)])
+        compact = Mesh.CompactVertices(vertices, normals, uvs, tangents, bitangents, scale, offset)
+
+        self.assertEqual(compact.itemsize, 16)
+
+        # decoded the way the shaders do it
+        positions = compact["position"][:, :3] / 32767 * scale + offset
+        np.testing.assert_allclose(positions, vertices, atol=25 / 32767)
+
+        sign = compact["position"][:, 3] / 32767
+        rebuilt = np.cross(Mesh.OctahedralDecode(compact["octahedral"][:, :2]), Mesh.OctahedralDecode(compact["octahedral"][:, 2:])) * sign[:, None]
+        self.assertTrue(np.all(np.einsum("ij,ij->i", rebuilt, bitangents) > 0))
+
+        np.testing.assert_allclose(compact["uv"].astype("f"), uvs, atol=4e-3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import glob
+import os
+import time
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+import blender
+
+def legacy_load_obj_file(file_name: str):
+    """
+    The original line by line parser, kept as the baseline for the benchmark
+    """
+    vertices = []
+    normals = []
+    texcoords = []
+    faces = []
+
+    with open(file_name) as objfile:
+        for line in objfile:
+            label = line.strip().split()
+            if not label or label[0] == '#': continue
+
+            if label[0] == 'v':
+                vertices.append([float(x) for x in label[1:]])
+            elif label[0] == 'vn':
+                normals.append([float(x) for x in label[1:]])
+            elif label[0] == 'vt':
+                texcoords.append([float(x) for x in label[1:]])
+            elif label[0] == 'f':
+                faces.append([int(v.split('/')[0]) - 1 for v in label[1:]])
+
+    return np.array(vertices, dtype='f'), np.array(faces, dtype=np.uint32), np.array(normals, dtype='f'), np.array(texcoords, dtype='f')
+
+def best_of(function, file_name: str, repeats: int):
+    """
+    Returns the fastest of a few runs, in seconds
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(file_name)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == '__main__':
+    models = sorted(glob.glob(os.path.join("..", "models", "**", "*.obj"), recursive=True))
+
+    results = []
+    for model in models:
+        name = os.path.relpath(model, os.path.join("..", "models"))
+        try:
+            legacy = best_of(legacy_load_obj_file, model, 3)
+            bulk = best_of(blender.load_obj_file, model, 3)
+        except ValueError as error:
+            # e.g. files mixing quads and triangles, which neither loader can turn into one face array
+            results.append((name, None, str(error)))
+            continue
+        results.append((name, legacy, bulk))
+
+    print(f"{'model':<32} {'legacy':>10} {'bulk':>10} {'speedup':>8}")
+    for name, legacy, bulk in results:
+        if legacy is None:
+            print(f"{name:<32} skipped: {bulk}")
+            continue
+        print(f"{name:<32} {legacy * 1000:>8.2f}ms {bulk * 1000:>8.2f}ms {legacy / bulk:>7.1f}x")
@@ -61,5 +61,74 @@ class QuaternionTests(unittest.TestCase):
         self.assertTrue(np.allclose(q.y, expected.y))
         self.assertTrue(np.allclose(q.z, expected.z))
 
+    def test_Quaternion_LazyNormalize(self):
+        q = Quaternion(2, 0, 0, 0)
+        self.assertFalse(q.normalized)
+        self.assertEqual(q.w, 2)
+        self.assertTrue(np.allclose(q.ToMatrix(), np.identity(4)))
+
+        q.Normalize()
+        self.assertTrue(q.normalized)
+        self.assertEqual(q.w, 1)
+
+        with self.assertRaises(AttributeError):
+            q.scale = 1
+
+    def test_Quaternion_InPlaceMultiply(self):
+        q1 = Quaternion.FromEuler(10, 20, 30)
+        q2 = Quaternion.FromAxisAngle(np.array([1, 2, 3]), 40)
+        product = q1 * q2
+
+        q = q1
+        q *= q2
+
+        self.assertIs(q, q1)
+        self.assertTrue(np.allclose(q.ToArray(), product.ToArray()))
+
+class QuaternionBatchTests(unittest.TestCase):
+    def quaternions(self, count, seed):
+        rng = np.random.default_rng(seed)
+        return [Quaternion.FromEuler(*angles) for angles in rng.uniform(-180, 180, (count, 3))]
+
+    def test_BatchMultiply(self):
+        lhs, rhs = self.quaternions(8, 0), self.quaternions(8, 1)
+        products = Quaternion.BatchMultiply(np.array([q.ToArray() for q in lhs]), np.array([q.ToArray() for q in rhs]))
+
+        for product, l, r in zip(products, lhs, rhs):
+            self.assertTrue(np.allclose(product, (l * r).ToArray()))
+
+    def test_BatchToMatrix(self):
+        quaternions = self.quaternions(8, 2)
+        matrices = Quaternion.BatchToMatrix(np.array([q.ToArray() for q in quaternions]))
+
+        for matrix, q in zip(matrices, quaternions):
+            self.assertTrue(np.allclose(matrix, q.ToMatrix()[:3, :3]))
+
+    def test_BatchMultiplyVector(self):
+        quaternions = self.quaternions(8, 3)
+        vectors = np.random.default_rng(4).uniform(-1, 1, (8, 3))
+        rotated = Quaternion.BatchMultiplyVector(np.array([q.ToArray() for q in quaternions]), vectors)
+
+        for result, q, v in zip(rotated, quaternions, vectors):
+            self.assertTrue(np.allclose(result, Quaternion.MultiplyVector(q, v), atol=1e-6))
+
+    def test_BatchSlerp(self):
+        start = np.array([Quaternion.identity().ToArray()] * 3)
+        end = np.array([
+            Quaternion.FromAxisAngle(np.array([0, 1, 0]), 90).ToArray(),
+            -Quaternion.FromAxisAngle(np.array([0, 1, 0]), 90).ToArray(),
+            Quaternion.identity().ToArray()
+        ])
+
+        halfway = Quaternion.BatchSlerp(start, end, 0.5)
+        expected = Quaternion.FromAxisAngle(np.array([0, 1, 0]), 45).ToArray()
+
+        # the negated end is the same rotation, both take the short way
+        self.assertTrue(np.allclose(halfway[0], expected))
+        self.assertTrue(np.allclose(halfway[1], expected))
+        self.assertTrue(np.allclose(halfway[2], start[2]))
+
+        self.assertTrue(np.allclose(Quaternion.BatchSlerp(start, end, [0, 1, 1])[:2], [start[0], end[0]]))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
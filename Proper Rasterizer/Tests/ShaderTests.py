@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from Shader import Shader, FRAME_DTYPE
+
+class ShaderTests(unittest.TestCase):
+    def test_Shader_Load_Include(self):
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, "common"))
+
+            with open(os.path.join(directory, "common", "shared.glsl"), "w") as file:
+                file.write("float shared(){ return 1.0; }\n")
+            with open(os.path.join(directory, "vertex.glsl"), "w") as file:
+                file.write('#version 330 core\n#include "common/shared.glsl"\nvoid main(){}\n')
+
+            source = Shader.Load(os.path.join(directory, "vertex.glsl"))
+
+        self.assertEqual(source, "#version 330 core\n#define CASCADE_COUNT 4\nfloat shared(){ return 1.0; }\n\nvoid main(){}\n")
+
+    def test_Shader_Load_IncludeCycle(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "a.glsl"), "w") as file:
+                file.write('#include "b.glsl"\n')
+            with open(os.path.join(directory, "b.glsl"), "w") as file:
+                file.write('#include "a.glsl"\n')
+
+            with self.assertRaises(ValueError):
+                Shader.Load(os.path.join(directory, "a.glsl"))
+
+    def test_Shader_Load_VertexFormat(self):
+        # every mesh vertex shader shares the attribute declarations
+        source = Shader.Load(os.path.join("..", "shaders", "basic", "vertex.glsl"))
+
+        self.assertNotIn("#include", source)
+        self.assertIn("vec3 meshPosition()", source)
+
+    def test_Shader_CheckFrameBlock(self):
+        # drivers may report the block without the padding at its end
+        Shader.CheckFrameBlock(FRAME_DTYPE.itemsize - 4, "unpadded")
+        Shader.CheckFrameBlock(FRAME_DTYPE.itemsize, "padded")
+
+        with self.assertRaises(ValueError):
+            Shader.CheckFrameBlock(FRAME_DTYPE.itemsize + 16, "larger")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+import pickle
+import unittest
+
+import numpy as np
+
+#import from parent directory
+import sys
+sys.path.insert(1, '..')
+
+from Transform import Transform, TransformArray
+from Quaternion import Quaternion
+
+def posed():
+    transform = Transform()
+    transform.position = [1, -2, 3]
+    transform.rotation = Quaternion.FromEuler(30, 45, 60)
+    transform.scale = [2, 0.5, 3]
+    return transform
+
+class TransformTests(unittest.TestCase):
+    def test_TRSMatrix(self):
+        transform = posed()
+
+        T = transform.getTranslationMatrix()
+        R = transform.rotation.ToMatrix()
+        S = transform.getScaleMatrix()
+
+        self.assertTrue(np.allclose(transform.getTRSMatrix(), T @ R @ S, atol=1e-6))
+
+    def test_InverseAndNormalMatrix(self):
+        transform = posed()
+        model = transform.getTRSMatrix().astype(np.float64)
+
+        self.assertTrue(np.allclose(transform.getInverseTRSMatrix(), np.linalg.inv(model), atol=1e-5))
+        self.assertTrue(np.allclose(transform.getNormalMatrix(), np.linalg.inv(model[:3, :3]).T, atol=1e-5))
+
+    def test_MatrixCached(self):
+        transform = posed()
+        matrix = transform.getTRSMatrix()
+        version = transform.version
+
+        self.assertIs(transform.getTRSMatrix(), matrix)
+        self.assertFalse(transform.dirty)
+        self.assertEqual(transform.version, version)
+
+    def test_SettersMarkDirty(self):
+        transform = posed()
+        transform.getTRSMatrix()
+
+        transform.position += np.array([1, 1, 1])
+        self.assertTrue(transform.dirty)
+        self.assertTrue(np.allclose(transform.getTRSMatrix()[:3, 3], [2, -1, 4]))
+
+        transform.scale *= 2
+        self.assertTrue(transform.dirty)
+        self.assertTrue(np.allclose(np.linalg.norm(transform.getTRSMatrix()[:3, :3], axis=0), [4, 1, 6], atol=1e-5))
+
+        transform.rotateAxis(np.array([0, 1, 0]), 90)
+        self.assertTrue(transform.dirty)
+        self.assertTrue(np.allclose(transform.getTRSMatrix()[:3, :3], transform.rotation.ToMatrix()[:3, :3] * [4, 1, 6], atol=1e-5))
+
+    def test_SetterCopies(self):
+        source = posed()
+        transform = Transform()
+        transform.position = source.position
+
+        source.position = [0, 0, 0]
+
+        self.assertTrue(np.allclose(transform.position, [1, -2, 3]))
+
+    def test_GetterCopies(self):
+        transform = posed()
+        transform.getTRSMatrix()
+
+        # writing into the returned arrays would bypass markDirty, so it must not touch the transform
+        transform.position[1] = 10
+        transform.scale[0] = 10
+
+        self.assertFalse(transform.dirty)
+        self.assertTrue(np.allclose(transform.position, [1, -2, 3]))
+        self.assertTrue(np.allclose(transform.getTRSMatrix()[:3, 3], [1, -2, 3]))
+
+    def test_Pickle(self):
+        transform = pickle.loads(pickle.dumps(posed()))
+
+        self.assertTrue(np.allclose(transform.getTRSMatrix(), posed().getTRSMatrix()))
+        self.assertIs(transform.array, TransformArray.Default())
+
+    def test_SharedArray(self):
+        first, second = Transform(), Transform()
+
+        self.assertIs(first.array, second.array)
+        self.assertNotEqual(first.index, second.index)
+
+        first.position = [1, 2, 3]
+        self.assertTrue(np.allclose(second.position, [0, 0, 0]))
+
+class TransformArrayTests(unittest.TestCase):
+    def test_BatchedMatchesTransform(self):
+        array = TransformArray(4)
+        rng = np.random.default_rng(0)
+        transforms = [array.add() for i in range(10)]
+
+        for transform in transforms:
+            transform.position = rng.uniform(-5, 5, 3)
+            transform.rotation = Quaternion.FromEuler(*rng.uniform(-180, 180, 3))
+            transform.scale = rng.uniform(0.5, 2, 3)
+
+        matrices = array.getTRSMatrices()
+
+        self.assertEqual(matrices.shape, (10, 4, 4))
+        self.assertTrue(matrices.flags["C_CONTIGUOUS"])
+
+        for transform, matrix in zip(transforms, matrices):
+            self.assertFalse(transform.dirty)
+
+            expected = transform.getTranslationMatrix() @ transform.rotation.ToMatrix() @ transform.getScaleMatrix()
+            self.assertTrue(np.allclose(matrix, expected, atol=1e-5))
+            self.assertTrue(np.allclose(transform.getInverseTRSMatrix() @ matrix, np.identity(4), atol=1e-5))
+
+    def test_GrowKeepsViews(self):
+        array = TransformArray(1)
+        first = array.add()
+        first.position = [1, 2, 3]
+
+        for i in range(8):
+            array.add()
+
+        first.position += np.array([1, 1, 1])
+
+        self.assertTrue(np.allclose(array.positions[0], [2, 3, 4]))
+        self.assertTrue(np.allclose(array.getTRSMatrices()[0, :3, 3], [2, 3, 4]))
+
+    def test_UpdatesOnlyDirtyRows(self):
+        array = TransformArray()
+        moved, still = array.add(), array.add()
+        moved.position = [1, 0, 0]
+        array.updateMatrices()
+
+        still.matrix[0, 0] = 5
+        moved.position = [2, 0, 0]
+        array.updateMatrices()
+
+        self.assertEqual(still.getTRSMatrix()[0, 0], 5)
+        self.assertEqual(moved.getTRSMatrix()[0, 3], 2)
+
+    def test_CompactsUnusedRows(self):
+        array = TransformArray(4)
+        kept = [array.add() for i in range(2)]
+        for i in range(2):
+            array.add()
+
+        kept[0].position = [1, 2, 3]
+        kept[1].parent = kept[0]
+
+        # the two dropped transforms free their rows instead of the array growing
+        array.add()
+
+        self.assertEqual(len(array), 3)
+        self.assertEqual(len(array.positions), 4)
+        self.assertEqual([transform.index for transform in kept], [0, 1])
+        self.assertTrue(np.allclose(kept[1].getWorldMatrix()[:3, 3], [1, 2, 3]))
+
+class HierarchyTests(unittest.TestCase):
+    def chain(self):
+        array = TransformArray()
+        root, child, grandchild, other = array.add(), array.add(), array.add(), array.add()
+
+        for transform, (x, angle) in zip((root, child, grandchild, other), ((1, 30), (2, 45), (3, 60), (4, 90))):
+            transform.position = [x, 0, 0]
+            transform.rotation = Quaternion.FromAxisAngle(np.array([0, 1, 0]), angle)
+            transform.scale = [x, 1, 2]
+
+        # added before its parent, the rows are sorted by depth
+        grandchild.parent = child
+        child.parent = root
+
+        return array, root, child, grandchild, other
+
+    def test_WorldMatrices(self):
+        array, root, child, grandchild, other = self.chain()
+
+        expected = root.getTRSMatrix() @ child.getTRSMatrix() @ grandchild.getTRSMatrix()
+        world = grandchild.getWorldMatrix()
+
+        self.assertTrue(np.allclose(world, expected, atol=1e-4))
+        self.assertTrue(np.allclose(grandchild.getWorldInverseMatrix() @ world, np.identity(4), atol=1e-4))
+        self.assertTrue(np.allclose(grandchild.getWorldNormalMatrix(), np.linalg.inv(expected[:3, :3]).T, atol=1e-4))
+        self.assertTrue(np.allclose(other.getWorldMatrix(), other.getTRSMatrix()))
+
+    def test_OnlyMovedSubtreeUpdates(self):
+        array, root, child, grandchild, other = self.chain()
+        array.updateWorldMatrices()
+        versions = [transform.worldVersion for transform in (root, child, grandchild, other)]
+
+        child.position += np.array([0, 1, 0])
+        array.updateWorldMatrices()
+
+        self.assertEqual([transform.worldVersion for transform in (root, child, grandchild, other)],
+                         [versions[0], versions[1] + 1, versions[2] + 1, versions[3]])
+        self.assertTrue(np.allclose(grandchild.getWorldMatrix(), root.getTRSMatrix() @ child.getTRSMatrix() @ grandchild.getTRSMatrix(), atol=1e-4))
+
+    def test_Unparent(self):
+        array, root, child, grandchild, other = self.chain()
+        child.parent = None
+
+        self.assertTrue(np.allclose(grandchild.getWorldMatrix(), child.getTRSMatrix() @ grandchild.getTRSMatrix(), atol=1e-4))
+
+    def test_InvalidParents(self):
+        array, root, child, grandchild, other = self.chain()
+
+        with self.assertRaises(ValueError):
+            root.parent = grandchild
+
+    def test_ParentInOtherArray(self):
+        array, root, child, grandchild, other = self.chain()
+        expected = grandchild.getWorldMatrix().copy()
+
+        parent = Transform()
+        parent.position = [0, 5, 0]
+        root.parent = parent
+
+        # the whole subtree joins the parent's array, the old rows are left behind
+        for transform in (root, child, grandchild):
+            self.assertIs(transform.array, parent.array)
+        self.assertIs(other.array, array)
+        self.assertIs(grandchild.parent, child)
+
+        expected[1, 3] += 5
+        self.assertTrue(np.allclose(grandchild.getWorldMatrix(), expected, atol=1e-4))
+
+        array.compact()
+        self.assertEqual(len(array), 1)
+        self.assertEqual(other.index, 0)
+
+if __name__ == '__main__':
+    unittest.main()
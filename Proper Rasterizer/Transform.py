@@ -1,13 +1,154 @@
 import math
+import weakref
 import numpy as np
 
 from Quaternion import Quaternion
 
 class Transform:
     def __init__(self):
-        self.position = np.array([0., 0., 0.],"f")
-        self.rotation = Quaternion.identity()
-        self.scale = np.array([1., 1., 1.])
+        # transforms created on their own share one array, the scene adds its transforms to its own
+        TransformArray.Default().add(self)
+
+    def bind(self, array: "TransformArray", index: int):
+        """
+        Makes the transform a view of one row of the given array
+
+        :param array: the array that stores the transform
+        :param index: the row of the transform in the array
+        """
+        self.array = array
+        self.index = index
+
+        self._position = array.positions[index]
+        self._rotation = array.rotations[index]
+        self._scale = array.scales[index]
+
+        # the matrices are rebuilt lazily, only after one of the setters marked the transform dirty
+        self.matrix = array.matrices[index]
+        self.inverseMatrix = array.inverseMatrices[index]
+        self.normalMatrix = array.normalMatrices[index]
+
+        # the same matrices with the parents applied, rebuilt when the transform or one of its parents moved
+        self.worldMatrix = array.worldMatrices[index]
+        self.worldInverseMatrix = array.worldInverseMatrices[index]
+        self.worldNormalMatrix = array.worldNormalMatrices[index]
+
+    def __getstate__(self):
+        """
+        Pickles the local pose only, the transform is restored on its own instead of with the whole array and its parent
+        """
+        return {"position": self._position.copy(), "rotation": self._rotation.copy(), "scale": self._scale.copy()}
+
+    def __setstate__(self, state: dict):
+        TransformArray.Default().add(self)
+
+        self._position[:] = state["position"]
+        self._rotation[:] = state["rotation"]
+        self._scale[:] = state["scale"]
+        self.markDirty()
+
+    @property
+    def position(self):
+        """
+        The position of the transform, a copy of the stored one, so writing into it can't leave the cached matrices outdated.
+        Write through the setter (or +=)
+        """
+        return self._position.copy()
+
+    @position.setter
+    def position(self, position: np.ndarray):
+        # copy into the row of the array, so a transform never aliases another transform's position
+        self._position[:] = position
+        self.markDirty()
+
+    @property
+    def rotation(self):
+        """
+        The rotation of the transform, a copy of the stored one. Write through the setter (or *=) so the cached matrices are updated
+        """
+        w, x, y, z = self._rotation.tolist()
+        return Quaternion(w, x, y, z, True)
+
+    @rotation.setter
+    def rotation(self, rotation: Quaternion):
+        # the stored rotations are always of unit length
+        rotation.Normalize()
+        self._rotation[:] = (rotation.w, rotation.x, rotation.y, rotation.z)
+        self.markDirty()
+
+    @property
+    def scale(self):
+        """
+        The scale of the transform, a copy of the stored one like the position. Write through the setter (or *=)
+        """
+        return self._scale.copy()
+
+    @scale.setter
+    def scale(self, scale: np.ndarray):
+        self._scale[:] = scale
+        self.markDirty()
+
+    @property
+    def parent(self):
+        """
+        The parent transform, its world matrix is applied on top of this transform's TRS matrix
+        """
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent: "Transform"):
+        if parent is not None:
+            ancestor = parent
+            while ancestor is not None:
+                if ancestor is self:
+                    raise ValueError("A transform can't be its own ancestor")
+                ancestor = ancestor.parent
+
+            # the hierarchy is resolved within one array, so the transform and its children join the parent's array
+            if parent.array is not self.array:
+                parent.array.adopt(self)
+
+        self._parent = parent
+        self.array.parents[self.index] = -1 if parent is None else parent.index
+        self.array.hierarchyDirty = True
+        self.markDirty()
+
+    @property
+    def dirty(self):
+        """
+        Whether the cached matrices are outdated
+        """
+        return bool(self.array.dirty[self.index])
+
+    @property
+    def version(self):
+        """
+        Counts the changes to the transform, so dependent caches can tell whether they are outdated
+        """
+        return int(self.array.versions[self.index])
+
+    @property
+    def worldVersion(self):
+        """
+        Counts the changes to the world matrix, including the ones caused by the parents moving
+        """
+        self.array.updateWorldMatrices()
+        return int(self.array.worldVersions[self.index])
+
+    def markDirty(self):
+        """
+        Marks the cached matrices as outdated, needed after writing into the rows of the array directly
+        """
+        self.array.dirty[self.index] = True
+        self.array.moved[self.index] = True
+        self.array.versions[self.index] += 1
+
+    def updateMatrices(self):
+        """
+        Rebuilds the TRS, inverse and normal matrices if the transform changed since they were last built
+        """
+        if self.array.dirty[self.index]:
+            self.array.updateMatrices(np.array([self.index]))
 
     def translate(self, x: float, y: float, z: float):
         """
@@ -42,6 +183,7 @@ class Transform:
     def getTRSMatrix(self):
         '''
         Returns a combined TRS matrix for the pose of a model.
+        The matrix is cached and shared, it must not be modified by the caller.
         :return: the 4x4 TRS matrix
         '''
 
@@ -49,11 +191,59 @@ class Transform:
 
         # M=TRS
 
-        T = self.getTranslationMatrix()
-        R = self.rotation.ToMatrix()
-        S = self.getScaleMatrix()
-        
-        return np.matmul(T, np.matmul(R, S))
+        self.updateMatrices()
+        return self.matrix
+
+    def getInverseTRSMatrix(self):
+        '''
+        Returns the inverse of the TRS matrix, mapping world space into the local space of the model.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 4x4 inverse TRS matrix
+        '''
+        self.updateMatrices()
+        return self.inverseMatrix
+
+    def getNormalMatrix(self):
+        '''
+        Returns the matrix that transforms normals into world space, the inverse transpose of the TRS matrix.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 3x3 normal matrix
+        '''
+        self.updateMatrices()
+        return self.normalMatrix
+
+    def getWorldMatrix(self):
+        '''
+        Returns the TRS matrix with the parents applied, mapping the local space of the model into world space.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 4x4 world matrix
+        '''
+        self.array.updateWorldMatrices()
+        return self.worldMatrix
+
+    def getWorldInverseMatrix(self):
+        '''
+        Returns the inverse of the world matrix.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 4x4 inverse world matrix
+        '''
+        self.array.updateWorldMatrices()
+        return self.worldInverseMatrix
+
+    def getWorldNormalMatrix(self):
+        '''
+        Returns the matrix that transforms normals into world space, the inverse transpose of the world matrix.
+        The matrix is cached and shared, it must not be modified by the caller.
+        :return: the 3x3 world normal matrix
+        '''
+        self.array.updateWorldMatrices()
+        return self.worldNormalMatrix
+
+    def getWorldPosition(self):
+        """
+        :return: the position of the transform in world space
+        """
+        return self.getWorldMatrix()[:3, 3]
 
     def forward(self):
         """
@@ -79,9 +269,9 @@ class Transform:
         :return: the 4x4 translation matrix
         """
         return np.array([
-            [1, 0, 0, self.position[0]],
-            [0, 1, 0, self.position[1]],
-            [0, 0, 1, self.position[2]],
+            [1, 0, 0, self._position[0]],
+            [0, 1, 0, self._position[1]],
+            [0, 0, 1, self._position[2]],
             [0, 0, 0, 1]
         ],"f")
 
@@ -90,9 +280,9 @@ class Transform:
         :return: the 4x4 scale matrix
         """
         return np.array([
-            [self.scale[0], 0, 0, 0],
-            [0, self.scale[1], 0, 0],
-            [0, 0, self.scale[2], 0],
+            [self._scale[0], 0, 0, 0],
+            [0, self._scale[1], 0, 0],
+            [0, 0, self._scale[2], 0],
             [0, 0, 0, 1]
         ],"f")
 
@@ -108,11 +298,12 @@ class Transform:
     def lookAtSelf(self, target: np.ndarray, up: np.ndarray):
         """
         Sets the rotation of the transform to look at the given target, with the given up vector.
+        The rotation is local, so the parents of the transform must not be rotated.
         
         :param target: the target look at point
         :param up: the up vector (usually [0,1,0])"""
         
-        position = self.position
+        position = self.getWorldPosition()
         
         zaxis = np.subtract(target, position)
         zaxis = zaxis / np.linalg.norm(zaxis)
@@ -189,4 +380,278 @@ class Transform:
         """
         print("Position: ", self.position)
         print("Rotation: ", self.rotation)
-        print("Scale: ", self.scale)
\ No newline at end of file
+        print("Scale: ", self.scale)
+
+
+class TransformArray:
+    # the array the transforms created on their own are added to
+    default = None
+
+    def __init__(self, capacity: int = 16):
+        self.count = 0
+        # a weak reference to the transform of each row, rows whose transform is gone or moved are compacted away
+        self.transforms = []
+
+        # rows grouped by their depth in the hierarchy, so parents are always updated before their children
+        self.levels = []
+        self.hierarchyDirty = True
+
+        self.allocate(max(capacity, 1))
+
+    @staticmethod
+    def Default():
+        """
+        :return: the array shared by all transforms that weren't added to a specific array
+        """
+        if TransformArray.default is None:
+            TransformArray.default = TransformArray()
+        return TransformArray.default
+
+    @staticmethod
+    def BlankRows(capacity: int):
+        """
+        Creates the per row arrays, every row at the identity pose without a parent
+
+        :param capacity: the number of rows
+        :return: the arrays by their attribute name
+        """
+        rows = {
+            "positions": np.zeros((capacity, 3), "f"),
+            # rotations are stored as wxyz
+            "rotations": np.tile(np.array([1, 0, 0, 0], "f"), (capacity, 1)),
+            "scales": np.ones((capacity, 3), "f"),
+            "matrices": np.tile(np.identity(4, "f"), (capacity, 1, 1)),
+            "inverseMatrices": np.tile(np.identity(4, "f"), (capacity, 1, 1)),
+            "normalMatrices": np.tile(np.identity(3, "f"), (capacity, 1, 1)),
+            "worldMatrices": np.tile(np.identity(4, "f"), (capacity, 1, 1)),
+            "worldInverseMatrices": np.tile(np.identity(4, "f"), (capacity, 1, 1)),
+            "worldNormalMatrices": np.tile(np.identity(3, "f"), (capacity, 1, 1)),
+            "parents": np.full(capacity, -1, np.int32),
+            "dirty": np.zeros(capacity, bool),
+            "moved": np.zeros(capacity, bool),
+            "versions": np.zeros(capacity, np.int64),
+            "worldVersions": np.zeros(capacity, np.int64),
+        }
+        return rows
+
+    def allocate(self, capacity: int):
+        """
+        Allocates the arrays for the given number of transforms, keeping the existing rows
+
+        :param capacity: the number of transforms the arrays can hold
+        """
+        for name, rows in TransformArray.BlankRows(capacity).items():
+            if self.count > 0:
+                rows[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, rows)
+
+        # the transforms view the old arrays, point them at the new ones
+        for row in range(self.count):
+            transform = self.owner(row)
+            if transform is not None:
+                transform.bind(self, row)
+
+    def __len__(self):
+        return self.count
+
+    def owner(self, row: int):
+        """
+        :param row: the row of the array
+        :return: the transform viewing the row, None if it was garbage collected or moved to another array
+        """
+        transform = self.transforms[row]()
+        if transform is None or transform.array is not self or transform.index != row:
+            return None
+        return transform
+
+    def add(self, transform: Transform = None):
+        """
+        Adds a transform at the identity pose to the array
+
+        :param transform: the transform to turn into a view of the new row, a new one is created if not given
+        :return: the transform viewing the new row
+        """
+        if self.count == len(self.positions):
+            # reuse the rows of the transforms that are gone before growing
+            self.compact()
+
+            if self.count == len(self.positions):
+                self.allocate(len(self.positions) * 2)
+
+        for name, rows in TransformArray.BlankRows(1).items():
+            getattr(self, name)[self.count] = rows[0]
+
+        if transform is None:
+            transform = Transform.__new__(Transform)
+
+        transform.bind(self, self.count)
+        transform._parent = None
+        self.transforms.append(weakref.ref(transform))
+        self.count += 1
+        self.hierarchyDirty = True
+
+        return transform
+
+    def adopt(self, transform: Transform):
+        """
+        Moves a transform of another array and everything below it in the hierarchy into this array, keeping their poses.
+        The transform is detached from its parent.
+
+        :param transform: the transform to move
+        """
+        source = transform.array
+
+        # the subtree in breadth first order, so every parent is moved before its children
+        subtree = [transform]
+        for parent in subtree:
+            for row in np.flatnonzero(source.parents[:source.count] == parent.index):
+                child = source.owner(row)
+                if child is not None:
+                    subtree.append(child)
+
+        rows = [child.index for child in subtree]
+        names = TransformArray.BlankRows(0).keys()
+
+        for child, row in zip(subtree, rows):
+            parent = child._parent if child is not transform else None
+
+            self.add(child)
+            for name in names:
+                getattr(self, name)[child.index] = getattr(source, name)[row]
+
+            child._parent = parent
+            self.parents[child.index] = -1 if parent is None else parent.index
+            self.moved[child.index] = True
+
+        # the old rows no longer have an owner, they are compacted away when the source array fills up
+        source.hierarchyDirty = True
+
+    def compact(self):
+        """
+        Removes the rows whose transform was garbage collected or moved to another array, keeping the order of the others
+        """
+        transforms = [self.owner(row) for row in range(self.count)]
+        rows = np.array([row for row, transform in enumerate(transforms) if transform is not None], np.int64)
+
+        if len(rows) == self.count:
+            return
+
+        # a transform keeps its parent alive, so the parents of the remaining rows remain as well
+        remap = np.full(self.count, -1, np.int32)
+        remap[rows] = np.arange(len(rows))
+
+        for name in TransformArray.BlankRows(0):
+            array = getattr(self, name)
+            array[:len(rows)] = array[rows]
+
+        parents = self.parents[:len(rows)]
+        parents[parents >= 0] = remap[parents[parents >= 0]]
+
+        self.count = len(rows)
+        self.transforms = [self.transforms[row] for row in rows]
+        for row in range(self.count):
+            transforms[rows[row]].bind(self, row)
+
+        self.hierarchyDirty = True
+
+    def updateMatrices(self, indices: np.ndarray = None):
+        """
+        Rebuilds the TRS, inverse and normal matrices of all dirty transforms in one batched pass
+
+        :param indices: the rows to rebuild, all dirty rows if not given
+        """
+        if indices is None:
+            indices = np.flatnonzero(self.dirty[:self.count])
+
+            if len(indices) == 0:
+                return
+
+        rotation = Quaternion.BatchToMatrix(self.rotations[indices])
+        position = self.positions[indices]
+        scale = self.scales[indices]
+
+        # M = TRS, so the inverse is S^-1 R^T T^-1 and the normal matrix (M^-1)^T is R S^-1
+        self.matrices[indices, :3, :3] = rotation * scale[:, None, :]
+        self.matrices[indices, :3, 3] = position
+
+        inverse = rotation.transpose(0, 2, 1) / scale[:, :, None]
+        self.inverseMatrices[indices, :3, :3] = inverse
+        self.inverseMatrices[indices, :3, 3] = -np.einsum("nij,nj->ni", inverse, position)
+
+        self.normalMatrices[indices] = rotation / scale[:, None, :]
+
+        self.dirty[indices] = False
+
+    def updateHierarchy(self):
+        """
+        Sorts the rows by their depth in the hierarchy, the roots first
+        """
+        parents = self.parents[:self.count]
+
+        # walk all rows up to their roots at once, one parent per step
+        depth = np.zeros(self.count, np.int32)
+        ancestors = parents.copy()
+        while True:
+            inside = ancestors >= 0
+            if not inside.any():
+                break
+            depth[inside] += 1
+            ancestors[inside] = parents[ancestors[inside]]
+
+        order = np.argsort(depth, kind="stable")
+        self.levels = np.split(order, np.flatnonzero(np.diff(depth[order])) + 1) if self.count > 0 else []
+        self.hierarchyDirty = False
+
+    def updateWorldMatrices(self):
+        """
+        Rebuilds the world matrices of the transforms that moved and of everything below them in the hierarchy.
+        The levels of the hierarchy are processed in order, each one in a single batched pass.
+        """
+        if self.hierarchyDirty:
+            self.updateHierarchy()
+
+        moved = self.moved[:self.count]
+
+        if not moved.any():
+            return
+
+        self.updateMatrices()
+
+        for depth, rows in enumerate(self.levels):
+            if depth == 0:
+                rows = rows[moved[rows]]
+
+                self.worldMatrices[rows] = self.matrices[rows]
+                self.worldInverseMatrices[rows] = self.inverseMatrices[rows]
+                self.worldNormalMatrices[rows] = self.normalMatrices[rows]
+                continue
+
+            # a child moves with its parent, the rows of the previous levels are final at this point
+            moved[rows] |= moved[self.parents[rows]]
+            rows = rows[moved[rows]]
+            parents = self.parents[rows]
+
+            self.worldMatrices[rows] = self.worldMatrices[parents] @ self.matrices[rows]
+            self.worldInverseMatrices[rows] = self.inverseMatrices[rows] @ self.worldInverseMatrices[parents]
+            self.worldNormalMatrices[rows] = self.worldNormalMatrices[parents] @ self.normalMatrices[rows]
+
+        self.worldVersions[:self.count][moved] += 1
+        moved[:] = False
+
+    def getTRSMatrices(self):
+        """
+        Returns the local TRS matrices of all transforms, contiguous and row major, ready to be uploaded
+
+        :return: the Nx4x4 TRS matrices
+        """
+        self.updateMatrices()
+        return self.matrices[:self.count]
+
+    def getWorldMatrices(self):
+        """
+        Returns the world matrices of all transforms, contiguous and row major, ready to be uploaded
+
+        :return: the Nx4x4 world matrices
+        """
+        self.updateWorldMatrices()
+        return self.worldMatrices[:self.count]
@@ -1,84 +1,439 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from custom_logging import LOG, LogLevel
 
 import Mesh
+from MeshCache import MeshCache
+from MeshOptimizer import MeshOptimizer
+from MeshSimplifier import MeshSimplifier
+
+# number of bytes read and parsed at a time, bounds the memory used for text while importing
+CHUNK_SIZE = 16 * 1024 * 1024
+
+# record labels that are parsed, anything else (comments, objects, groups, materials...) is skipped
+RECORD_LABELS = {
+	"v": b"v",
+	"vt": b"vt",
+	"vn": b"vn",
+	"f": b"f",
+}
+
+# the values of a record are separated by spaces or tabs, tabs are turned into spaces before parsing
+SEPARATORS = b" \t"
+TABS_TO_SPACES = bytes.maketrans(b"\t", b" ")
+
+def _split_records(data: bytes):
+	"""
+	Splits the raw file into one text block per record type
+
+	Lines are classified with array operations on the raw bytes, consecutive lines of the same type are then
+	sliced out of the buffer in one go, so the cost in Python is per run of records rather than per line.
+
+	:param data: The contents of the obj file, or a chunk of whole lines of it
+	:return: A dictionary of label to (block, record count), the labels are removed from the block,
+		and an array with the number of faces in every run of faces plus the number of v, vt and vn records before it
+	"""
+	buffer = np.frombuffer(data, dtype=np.uint8)
+
+	# start of every non empty line
+	starts = np.flatnonzero(buffer == ord('\n')) + 1
+	starts = np.concatenate(([0], starts[starts < len(buffer)]))
+	ends = np.append(starts[1:], len(buffer))
+
+	# padded so the bytes after a label at the very end of the buffer can still be looked at
+	padded = np.concatenate((buffer, np.zeros(3, dtype=np.uint8)))
+	separators = np.frombuffer(SEPARATORS, dtype=np.uint8)
+
+	# lines can be indented, the label starts at the first character of the line that isn't a separator,
+	# only the indented lines are stepped through, one level of indentation at a time
+	label_starts = starts.copy()
+	indented = np.flatnonzero(np.isin(padded[label_starts], separators))
+	while len(indented):
+		label_starts[indented] += 1
+		indented = indented[np.isin(padded[label_starts[indented]], separators)]
+
+	codes = np.zeros(len(starts), dtype=np.int8)
+	for code, label in enumerate(RECORD_LABELS.values(), 1):
+		# a label has to be followed by a separator, so "vt" isn't read as "v"
+		match = np.isin(padded[label_starts + len(label)], separators)
+		for offset, character in enumerate(label):
+			match &= padded[label_starts + offset] == character
+		codes[match] = code
+
+	# runs of consecutive lines with the same type
+	changes = np.flatnonzero(np.diff(codes)) + 1
+	run_starts = np.concatenate(([0], changes))
+	run_ends = np.append(changes, len(codes))
+
+	chunks = {label: [] for label in RECORD_LABELS}
+	counts = {label: 0 for label in RECORD_LABELS}
+	labels = list(RECORD_LABELS)
+
+	face_runs = []
+
+	for run_start, run_end in zip(run_starts, run_ends):
+		code = codes[run_start]
+		if code == 0: continue
+
+		label = labels[code - 1]
+		chunks[label].append(data[starts[run_start]:ends[run_end - 1]])
+
+		# needed to resolve relative indices, which count back from the records defined so far
+		if label == "f":
+			face_runs.append((run_end - run_start, counts["v"], counts["vt"], counts["vn"]))
+
+		counts[label] += run_end - run_start
+
+	blocks = {label: (b" ".join(chunks[label]).translate(TABS_TO_SPACES).replace(RECORD_LABELS[label] + b" ", b" "), counts[label]) for label in RECORD_LABELS}
+
+	return blocks, np.array(face_runs, dtype=np.int64).reshape(-1, 4)
+
+def _parse_records(block: bytes, count: int, columns: int, dtype):
+	"""
+	Parses a block of whitespace separated numeric records in a single call
+
+	:param block: The records, without their labels
+	:param count: The number of records in the block
+	:param columns: The number of columns to keep from each record
+	:param dtype: The numpy type to parse into
+	:return: A 2D array with one row per record
+	"""
+	if count == 0:
+		return np.zeros((0, columns), dtype=dtype)
+
+	data = np.fromstring(block, dtype=dtype, sep=" ")
+	widths = _count_tokens(block, count)
+
+	# fromstring stops at the first value it can't parse instead of failing
+	if data.size != widths.sum():
+		raise ValueError(f"Records contain a value that isn't a number, only {data.size:,} of {widths.sum():,} values were parsed")
+
+	# every record has to have the same amount of values to be reshaped
+	if (widths != widths[0]).any() or widths[0] < columns:
+		raise ValueError(f"Records have an inconsistent number of values ({widths.min()} to {widths.max()} per record, at least {columns} needed)")
+
+	return data.reshape(count, -1)[:, :columns]
+
+def _count_tokens(block: bytes, count: int):
+	"""
+	Counts the whitespace separated tokens on every line of the block, i.e. the values of every record
+	or the corners of every face
+
+	:param block: The records, without their labels
+	:param count: The number of records in the block
+	:return: The number of tokens of every record
+	"""
+	buffer = np.frombuffer(block, dtype=np.uint8)
+
+	# a token starts wherever a printable character follows whitespace (or the start of the block)
+	blank = buffer <= ord(' ')
+	starts = ~blank
+	starts[1:] &= blank[:-1]
+
+	# the line of every token is the number of line breaks before it
+	lines = np.searchsorted(np.flatnonzero(buffer == ord('\n')), np.flatnonzero(starts))
+
+	return np.bincount(lines, minlength=count)[:count]
+
+def _triangulate(arity: np.ndarray):
+	"""
+	Fan triangulates polygons, (0, 1, 2), (0, 2, 3), ... for every face
+
+	:param arity: The number of corners of every face
+	:return: The corner indices of every triangle, indexing the corners of all faces in order
+	"""
+	triangles = np.maximum(arity - 2, 0)
+
+	first_corner = np.cumsum(arity) - arity
+	first_triangle = np.cumsum(triangles) - triangles
+
+	# which face every triangle belongs to, and its position in that face's fan
+	face = np.repeat(np.arange(len(arity)), triangles)
+	fan = np.arange(triangles.sum()) - first_triangle[face] + 1
+
+	base = first_corner[face]
+
+	return np.stack((base, base + fan, base + fan + 1), axis=1)
+
+def _parse_faces(block: bytes, count: int, face_runs: np.ndarray, offsets: np.ndarray):
+	"""
+	Parses a block of face records into triangles of (v, vt, vn) index triples
+
+	Corners can be written as v, v/vt, v//vn or v/vt/vn, the first corner decides the format for the block.
+	Faces can have any number of corners, polygons are fan triangulated.
+
+	:param block: The face records, without their labels
+	:param count: The number of faces in the block
+	:param face_runs: The runs of faces in the block, as returned by _split_records
+	:param offsets: The number of v, vt and vn records read before the block
+	:return: A 3D array of zero based indices with shape (triangles, 3, 3), missing indices are -1
+	"""
+	if count == 0:
+		return np.zeros((0, 3, 3), dtype=np.int32)
+
+	first = block.split(b"\n", 1)[0].split()
+	components = first[0].count(b"/") + 1
+
+	arity = _count_tokens(block, count)
+
+	# missing texture coordinates ("v//vn") become a zero index so every corner has the same width
+	block = block.replace(b"//", b"/0/").replace(b"/", b" ")
+	data = np.fromstring(block, dtype=np.int64, sep=" ")
+
+	if data.size != arity.sum() * components:
+		raise ValueError(f"Face corners must all be written as {first[0].decode()}")
+
+	data = data.reshape(-1, components)
+
+	# number of elements defined before every corner, only needed for relative indices
+	defined = None
+	if (data < 0).any():
+		defined = np.repeat(face_runs[:, 1:] + offsets, face_runs[:, 0], axis=0)
+		defined = np.repeat(defined, arity, axis=0)
+
+	corners = np.full((len(data), 3), -1, dtype=np.int32)
+	for component in range(components):
+		indices = data[:, component]
+		# obj indices are 1 based, 0 marks a missing index, negative indices count back from the last element
+		if defined is not None:
+			indices = np.where(indices < 0, indices + 1 + defined[:, component], indices)
+		corners[:, component] = indices - 1
+
+	return corners[_triangulate(arity)]
+
+def _weld(corners: np.ndarray):
+	"""
+	Merges face corners that share the same (v, vt, vn) triple into one vertex
+
+	:param corners: The (v, vt, vn) triple of every corner, with shape (corners, 3)
+	:return: The triple of every unique vertex, in order of first use, and the vertex index of every corner
+	"""
+	if len(corners) == 0:
+		return corners, np.zeros(0, dtype=np.int64)
+
+	# pack each triple into a single integer, unless the index ranges are too big to fit
+	ranges = corners.max(axis=0).astype(np.int64) + 2
+	if np.prod(ranges.astype(float)) < 2 ** 62:
+		keys = corners[:, 0].astype(np.int64) * ranges[1] + corners[:, 1] + 1
+		keys = keys * ranges[2] + corners[:, 2] + 1
+		_, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+	else:
+		_, first, inverse = np.unique(corners, axis=0, return_index=True, return_inverse=True)
+
+	# renumber the vertices in order of first use, which keeps them close to the faces that use them
+	order = np.argsort(first)
+	rank = np.empty_like(order)
+	rank[order] = np.arange(len(order))
+
+	return corners[first[order]], rank[inverse.reshape(-1)]
+
+def _gather(values: np.ndarray, indices: np.ndarray, columns: int):
+	"""
+	:param values: The parsed attribute values
+	:param indices: The attribute index of every vertex, -1 where the vertex has none
+	:param columns: The number of columns of the attribute
+	:return: The attribute of every vertex, zero where it is missing
+	"""
+	result = np.zeros((len(indices), columns), dtype=np.float32)
+	valid = indices >= 0
+	result[valid] = values[indices[valid]]
+	return result
+
+class GrowableArray:
+	"""
+	A typed 2D array that rows can be appended to
+
+	The storage grows geometrically in place, so appending is amortised constant time
+	and the finished array is trimmed to its size without a copy.
+	"""
+	def __init__(self, columns: int, dtype, capacity: int = 1024):
+		self.data = np.empty((capacity, columns), dtype=dtype)
+		self.size = 0
+
+	def __len__(self):
+		return self.size
+
+	def extend(self, rows: np.ndarray):
+		"""
+		Appends rows to the array
 
-def load_obj_file(file_name: str):
+		:param rows: The rows to append, must have the same number of columns
+		"""
+		required = self.size + len(rows)
+
+		if required > len(self.data):
+			capacity = max(required, len(self.data) + len(self.data) // 2)
+			self.data.resize((capacity, self.data.shape[1]), refcheck=False)
+
+		self.data[self.size:required] = rows
+		self.size = required
+
+	def array(self):
+		"""
+		Trims the storage to the appended rows, the GrowableArray should not be used afterwards
+
+		:return: The appended rows
+		"""
+		self.data.resize((self.size, self.data.shape[1]), refcheck=False)
+		return self.data
+
+def read_chunks(file_name: str, chunk_size: int = CHUNK_SIZE):
+	"""
+	Reads a file in chunks of whole lines
+
+	:param file_name: The path to the file
+	:param chunk_size: The number of bytes to read at a time
+	:return: A generator of (chunk, bytes read so far)
+	"""
+	with open(file_name, "rb") as file:
+		remainder = b""
+
+		while True:
+			data = file.read(chunk_size)
+			if not data: break
+
+			data = remainder + data
+
+			# keep the unfinished last line for the next chunk
+			cut = data.rfind(b"\n") + 1
+			remainder = data[cut:]
+
+			if cut > 0:
+				yield data[:cut], file.tell() - len(remainder)
+
+		if remainder:
+			yield remainder, file.tell()
+
+def load_obj_file(file_name: str, chunk_size: int = CHUNK_SIZE):
 	"""
 	Loads an obj file and returns the vertices, faces, normals and texture coordinates
 
+	The file is streamed in chunks of whole lines, every chunk is split by record type and each block is converted
+	with a single numpy call, then appended to growable typed arrays. Only one chunk of text is held at a time.
+	Polygons are fan triangulated, so the faces are always triangles.
+	Corners sharing the same position, texture coordinate and normal are welded into one vertex, so all
+	returned attributes are indexed by the faces.
+
 	:param file_name: The path to the obj file
+	:param chunk_size: The number of bytes to read at a time
 	:return: A tuple of vertices, faces, normals and texture coordinates
 	"""
 	
 	LOG(f"Attemping to load {file_name}")
-	
-	vertices = []
-	normals = []
-	texcoords = []
-	faces = []
-
-	with open(file_name) as objfile:
-		# loop over all lines in the file
-
-		for line in objfile:
-			line = line.strip()
-			# skip empty lines
-			if not line: continue
-
-			# split the line into labels
-			label = line.split()
-
-			# skip comments
-			if label[0] == '#': continue
-			
-			# vertex
-			if label[0] == 'v':
-				vertices.append([float(x) for x in label[1:]])
-			
-			# vertex normal
-			elif label[0] == 'vn':
-				normals.append([float(x) for x in label[1:]])
-
-			# texture coordinate
-			elif label[0] == 'vt':
-				texcoords.append([float(x) for x in label[1:]])
-
-			# face
-			elif label[0] == 'f':
-				# parse the face
-				face = []
-				for v in label[1:]:
-					# split the vertex into its components
-					v = v.split('/')
-					# the first component is the vertex index
-					face.append(int(v[0]) - 1)
-				# add the face to the list of faces
-				faces.append(face)
+
+	file_size = max(os.path.getsize(file_name), 1)
+
+	positions = GrowableArray(3, np.float32)
+	texcoords = GrowableArray(2, np.float32)
+	normals = GrowableArray(3, np.float32)
+	corners = GrowableArray(3, np.int32)
+
+	for chunk, bytes_read in read_chunks(file_name, chunk_size):
+		records, face_runs = _split_records(chunk)
+
+		offsets = np.array([len(positions), len(texcoords), len(normals)], dtype=np.int64)
 
 		# convert to numpy arrays
-		vertices = np.array(vertices, dtype='f')
-		normals = np.array(normals, dtype='f')
+		positions.extend(_parse_records(*records["v"], 3, np.float32))
+		texcoords.extend(_parse_records(*records["vt"], 2, np.float32))
+		normals.extend(_parse_records(*records["vn"], 3, np.float32))
+
+		triangles = _parse_faces(*records["f"], face_runs, offsets)
+		corners.extend(triangles.reshape(-1, 3))
+
+		if bytes_read < file_size:
+			LOG(f"Loading {file_name}... {bytes_read / file_size * 100:.0f}%", LogLevel.DEBUG, True)
+
+	positions = positions.array()
+	texcoords = texcoords.array()
+	normals = normals.array()
+	corners = corners.array()
 
-		if len(texcoords) == 0:
-			texcoords = np.zeros((len(vertices), 2))
-			LOG("No texture coordinates found, using default texture coordinates", LogLevel.WARNING)
-		else:
-			texcoords = np.array(texcoords, dtype='f')
-		
-		faces = np.array(faces, dtype=np.uint32)
+	vertices, faces = _weld(corners)
+	del corners
 
-		LOG(f"Loaded {file_name} with {len(vertices):,} vertices, {len(normals):,} normals, {len(texcoords):,} texcoords, and {len(faces):,} faces")
+	faces = faces.reshape(-1, 3).astype(np.uint32)
 
-		return vertices, faces, normals, texcoords
+	if len(texcoords) == 0 or (vertices[:, 1] < 0).any():
+		LOG("No texture coordinates found, using default texture coordinates", LogLevel.WARNING)
 
-def load_mesh(file_name: str):
+	if len(normals) == 0 or (vertices[:, 2] < 0).any():
+		LOG("Missing normals, they are calculated from the faces", LogLevel.WARNING)
+
+	texcoords = _gather(texcoords, vertices[:, 1], 2)
+	normals = _gather(normals, vertices[:, 2], 3)
+	vertices = _gather(positions, vertices[:, 0], 3)
+
+	LOG(f"Loaded {file_name} with {len(positions):,} positions welded into {len(vertices):,} vertices and {len(faces):,} faces")
+
+	return vertices, faces, normals, texcoords
+
+def load_mesh(file_name: str, use_cache: bool = True, lods: int = 0, optimize: bool = True, measure: bool = False):
 	"""
 	Loads a mesh from an obj file
 
+	Parsed meshes are reordered for the vertex cache and stored in the mesh cache together with their tangents,
+	so later runs skip the parsing, the optimization and the normal map calculation until the obj file changes.
+
 	:param file_name: The path to the obj file
+	:param use_cache: Whether to read from and write to the mesh cache
+	:param lods: The number of simplified levels of detail to build, each with half the triangles of the previous one
+	:param optimize: Whether to reorder the triangles and vertices for the vertex cache, see MeshOptimizer.Optimize
+	:param measure: Whether to log the ACMR before and after the optimization, only done when the mesh isn't cached
 	:return: A Mesh object
 	"""
+	variant = (f"_lods{lods}" if lods else "") + ("" if optimize else "_unoptimized")
+
+	if use_cache:
+		arrays = MeshCache.load(file_name, variant)
+		if arrays is not None:
+			levels = [arrays.pop(f"lod{level}") for level in range(1, lods + 1) if f"lod{level}" in arrays]
+			return Mesh.Mesh(**arrays, lods=levels)
+
 	vertices, faces, normals, texcoords = load_obj_file(file_name)
 
-	return Mesh.Mesh(vertices, faces, normals, texcoords)
\ No newline at end of file
+	if optimize:
+		faces, (vertices, normals, texcoords) = MeshOptimizer.Optimize(faces, [vertices, normals, texcoords], file_name, measure)
+
+	# vertices the obj file has no normal for are zero, they get smooth normals before the mesh is cached
+	missing = ~normals.any(axis=1)
+	if missing.any():
+		normals[missing] = Mesh.Mesh.VertexNormals(vertices, faces, dirty=np.flatnonzero(missing))
+		LOG(f"Calculated {np.count_nonzero(missing):,} missing normals of {file_name}")
+
+	levels = MeshSimplifier.BuildLODs(vertices, faces, lods, name=file_name) if lods else []
+
+	mesh = Mesh.Mesh(vertices, faces, normals, texcoords, lods=levels)
+
+	if use_cache:
+		arrays = {name: getattr(mesh, name) for name in MeshCache.ARRAYS}
+		arrays.update({f"lod{level}": faces for level, faces in enumerate(mesh.lods, 1)})
+		MeshCache.save(file_name, arrays, variant)
+
+	return mesh
+
+
+def _load_mesh_job(job: tuple):
+	file_name, lods = job
+	return load_mesh(file_name, lods=lods)
+
+
+def load_meshes(jobs: list, processes: int = None):
+	"""
+	Loads several meshes in parallel worker processes
+
+	Meshes don't touch OpenGL until they are drawn, so parsing, optimizing, simplifying and the tangent calculation
+	all run in the workers and the meshes are uploaded later on the render thread.
+	Entry scripts have to guard their setup with if __name__ == "__main__", as workers may import them.
+
+	:param jobs: A list of (file_name, lods) tuples, see load_mesh
+	:param processes: The number of worker processes, one per cpu core if None
+	:return: A list of Mesh objects in the order of the jobs
+	"""
+	if processes == 1 or len(jobs) <= 1:
+		return [_load_mesh_job(job) for job in jobs]
+
+	with ProcessPoolExecutor(max_workers=processes) as pool:
+		return list(pool.map(_load_mesh_job, jobs))
@@ -12,13 +12,18 @@ import numpy as np
 
 import time
 
+import multiprocessing
+import itertools
+
 import blender
 import Shader
 from Material import Material, FaceTypes
 from Texture import Texture
 from Camera import Camera
 from Quaternion import Quaternion
-from Light import *
+from Transform import TransformArray
+from Light import Light
+from FrameUniforms import FrameUniforms
 from Mesh import Mesh
 from Skybox import Skybox
 from PostProcessing import PostProcessing
@@ -39,8 +44,6 @@ from PIL import Image
 
 start_time = time.time()
 
-pygame.init()
-
 initialized = False
 
 class Scene:
@@ -56,6 +59,12 @@ class Scene:
 
         self.meshes = []
 
+        # drawn and culled mesh counts of the last draw_scene call of each pass, for profiling
+        self.cullingStats = {}
+
+        # the transforms of the meshes and the sun are rows of one hierarchy, their matrices are rebuilt in one batched pass
+        self.transforms = TransformArray()
+
         aspect = self.width / self.height
 
         self.camera = Camera(80, aspect, 0.1, 500)
@@ -68,9 +77,11 @@ class Scene:
         self.cameraDepthMapFBO = glGenFramebuffers(1)
         self.cameraDepthMap = glGenTextures(1)
 
-        self.shadow_map_size = 4096
+        # each cascade only covers a slice of the view, so a smaller map per cascade is sharper than one map over the whole scene
+        self.shadow_map_size = 1024
 
         self.sun = Light(np.array([1,1,1],"f"),1)
+        self.sun.transform = self.transforms.add()
         #self.sun.transform.position = np.array([-150, 150, -150], "f")
 
         self.timeOfDay = 8
@@ -79,6 +90,9 @@ class Scene:
 
         self.skybox = Skybox()
 
+        # camera, sun and time are uploaded once per frame and shared by all shaders
+        self.frameUniforms = FrameUniforms()
+
         glEnable(GL_DEPTH_TEST)
         glEnable(GL_CULL_FACE)
         
@@ -101,15 +115,16 @@ class Scene:
         """
         Initializes the shadow map texture and framebuffer.
         """
-        glBindTexture(GL_TEXTURE_2D, self.depthMap)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_DEPTH_COMPONENT, self.shadow_map_size, self.shadow_map_size, 0, GL_DEPTH_COMPONENT, GL_FLOAT, None)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
-
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.depthMap)
+        glTexImage3D(GL_TEXTURE_2D_ARRAY, 0, GL_DEPTH_COMPONENT, self.shadow_map_size, self.shadow_map_size, len(self.sun.cascadeSplits), 0, GL_DEPTH_COMPONENT, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+        # the layers are attached one cascade at a time in shadow_map
         glBindFramebuffer(GL_FRAMEBUFFER, self.depthMapFBO)
-        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_TEXTURE_2D, self.depthMap, 0)
+        glFramebufferTextureLayer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, self.depthMap, 0, 0)
         glDrawBuffer(GL_NONE)
         glReadBuffer(GL_NONE)
         glBindFramebuffer(GL_FRAMEBUFFER, 0)
@@ -140,53 +155,67 @@ class Scene:
         """
         self.meshes.append(mesh)
 
-    def draw_scene(self, shader: Shader):
+    def draw_scene(self, shader: Shader, lodBias: int = 0, cullMatrix: np.ndarray = None, passName: str = "main"):
         """
         Draws the scene using the given shader.
         Shader needs to have a model, view and projection matrix uniform.
 
         This is used for the shadow map pass and the main draw pass, so shader is flexible.
+        Meshes outside the frustum of the pass are skipped, the counts are kept in cullingStats.
         
         :param shader: Override shader to use for drawing
+        :param lodBias: Levels of detail to add on top of the distance based level
+        :param cullMatrix: The matrix into clip space of the pass, the camera's view projection if not given
+        :param passName: The name the drawn and culled counts of the pass are stored under
         """
         if shader is not None:
             shader.use()
 
-        for mesh in self.meshes:
+        cameraPosition = -self.camera.transform.position
+
+        if cullMatrix is None:
+            cullMatrix = self.camera.getViewProjectionMatrix()
+
+        # the world bounds are cached on each mesh, the frustum test runs on all of them at once
+        bounds = np.array([mesh.getWorldBoundingBox() for mesh in self.meshes]).reshape(-1, 2, 3)
+        visible = MathUtils.BoxesInFrustum(MathUtils.FrustumPlanes(cullMatrix), bounds[:, 0], bounds[:, 1])
+
+        drawn = int(np.count_nonzero(visible))
+        self.cullingStats[passName] = {"drawn": drawn, "culled": len(self.meshes) - drawn}
+
+        for mesh in itertools.compress(self.meshes, visible):
             self.set_matrices(mesh, shader)
             if shader == None:
                 mesh.shader.use()
-            mesh.draw()
+            mesh.draw(mesh.selectLOD(cameraPosition, lodBias))
 
     def shadow_map(self):
         global initialized
         """
-        Renders the scene from the light's perspective to a depth map.
+        Renders the scene from the light's perspective to a depth map, one layer per cascade.
         
         This is used to determine which fragments are in shadow.
         """
         #glCullFace(GL_FRONT)
 
-        glBindTexture(GL_TEXTURE_2D, self.depthMap)
+        glViewport(0, 0, self.shadow_map_size, self.shadow_map_size)
         glBindFramebuffer(GL_FRAMEBUFFER, self.depthMapFBO)
 
-        lightProjection = self.sun.getLightProjection()
-        lightView = self.sun.getLightView()
-
-        lightSpaceMatrix = np.matmul(lightProjection, lightView)
+        for cascade, lightSpaceMatrix in enumerate(self.sun.cascadeMatrices):
+            glFramebufferTextureLayer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, self.depthMap, 0, cascade)
+            glClear(GL_DEPTH_BUFFER_BIT)
 
-        shadow_map_shader.use()
-        glUniformMatrix4fv(shadow_map_shader.get_keyword("lightSpaceMatrix"), 1, GL_TRUE, lightSpaceMatrix)
+            shadow_map_shader.use()
+            shadow_map_shader.setMatrix("lightSpaceMatrix", lightSpaceMatrix)
 
-        glViewport(0, 0, self.shadow_map_size, self.shadow_map_size)
-        glBindFramebuffer(GL_FRAMEBUFFER, self.depthMapFBO)
-        glClear(GL_DEPTH_BUFFER_BIT)
-        
-        self.draw_scene(shadow_map_shader)
-        tree_field.draw(shadow_map_trees_shader, current_time(), True, 0)
+            # shadow casters only need their silhouette, so they are drawn one level coarser,
+            # only the casters inside the cascade are drawn
+            self.draw_scene(shadow_map_shader, 1, lightSpaceMatrix, f"shadow{cascade}")
+            tree_field.draw(shadow_map_trees_shader, True, 0, cascade)
 
-        # save depthMap to file
+        # save the nearest cascade of depthMap to file
         if not initialized:
+            glFramebufferTextureLayer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, self.depthMap, 0, 0)
             data = glReadPixels(0, 0, self.shadow_map_size, self.shadow_map_size, GL_DEPTH_COMPONENT, GL_FLOAT)
             data = np.flip(data, 0)
             data = np.flip(data, 1)
@@ -210,15 +239,11 @@ class Scene:
         glBindTexture(GL_TEXTURE_2D, self.cameraDepthMap)
         glBindFramebuffer(GL_FRAMEBUFFER, self.cameraDepthMapFBO)
 
-        camera_depth_shader.use()
-        glUniformMatrix4fv(camera_depth_shader.get_keyword("view"), 1, GL_TRUE, self.camera.transform.getTRSMatrix())
-        glUniformMatrix4fv(camera_depth_shader.get_keyword("projection"), 1, GL_TRUE, self.camera.projectionMatrix)
-
         glViewport(0, 0, self.width, self.height)
         glBindFramebuffer(GL_FRAMEBUFFER, self.cameraDepthMapFBO)
         glClear(GL_DEPTH_BUFFER_BIT)
 
-        self.draw_scene(camera_depth_shader)
+        self.draw_scene(camera_depth_shader, passName="depth")
 
         glBindFramebuffer(GL_FRAMEBUFFER, 0)
 
@@ -226,51 +251,30 @@ class Scene:
     # method that supplies model, view and projection matrices to the shader
     def set_matrices(self, mesh: Mesh, shader: Shader):
         """
-        Sets the model, view and projection matrices for the given shader.
+        Sets the model matrices and textures for the given shader, the camera and the sun are part of the frame uniforms.
         
         :param mesh: The mesh to get the model matrix from
         :param shader: The shader to set the matrices for
         """
         shader.use()
 
-        model_matrix = mesh.transform.getTRSMatrix()
-        view_matrix = self.camera.getViewMatrix()
-        projection_matrix = self.camera.projectionMatrix
-
-        glUniformMatrix4fv(shader.get_keyword("model"), 1, GL_TRUE, model_matrix)
-        glUniformMatrix4fv(shader.get_keyword("view"), 1, GL_TRUE, view_matrix)
-        glUniformMatrix4fv(shader.get_keyword("projection"), 1, GL_TRUE, projection_matrix)
+        model_matrix = mesh.transform.getWorldMatrix()
 
-        # light uniforms
-        normalizedLightDir = -self.sun.transform.position / np.linalg.norm(self.sun.transform.position)
-        glUniform3fv(shader.get_keyword("lightPos"), 1, self.sun.transform.position)
-        glUniform3fv(shader.get_keyword("lightDir"), 1, normalizedLightDir)
-        glUniform3fv(shader.get_keyword("sunColor"), 1, self.sun.color)
+        shader.setMatrix("model", model_matrix)
+        shader.setMatrix("normalMatrix", mesh.transform.getWorldNormalMatrix())
 
-        # light space matrix
-        lightSpaceMatrix = self.sun.getLightSpaceMatrix()
-        glUniformMatrix4fv(shader.get_keyword("lightSpaceMatrix"), 1, GL_TRUE, lightSpaceMatrix)
-
-        # shadow map (index 0)
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.depthMap)
-        glUniform1i(shader.get_keyword("shadowMap"), 0)
+        # cascaded shadow map
+        self.sun.useShadowMap(shader, self.depthMap)
 
         glActiveTexture(GL_TEXTURE10)
         glBindTexture(GL_TEXTURE_CUBE_MAP, self.skybox.cubeMap)
-        glUniform1i(shader.get_keyword("_Skybox"), 10)
+        shader.setInt("_Skybox", 10)
 
         glActiveTexture(GL_TEXTURE11)
         glBindTexture(GL_TEXTURE_2D, self.cameraDepthMap)
-        glUniform1i(shader.get_keyword("cameraDepthMap"), 11)
-
-        # camera
-        glUniform3fv(shader.get_keyword("camPos"), 1, -self.camera.transform.position)
-        glUniform3fv(shader.get_keyword("camFwd"), 1, -self.camera.forward())
+        shader.setInt("cameraDepthMap", 11)
 
         mesh.material.use(shader)
-
-        glUniform1f(shader.get_keyword("time"), current_time())
     
     def set_face_culling(self, cull_face_type: int):
         """
@@ -310,7 +314,7 @@ class Scene:
 
             mesh.update(dt)
 
-        self.get_mesh("sunIcon").transform.position = self.sun.transform.position
+        self.transforms.updateWorldMatrices()
 
         #self.meshes[0].transform.position = self.sun.transform.position
 
@@ -421,28 +425,33 @@ class Scene:
 
             ms = dt * 1000.0
 
-            pygame.display.set_caption(f"FPS: {fps:.2f} / {ms:.1f}ms")
+            stats = self.cullingStats.get("main", {"drawn": 0, "culled": 0})
+            pygame.display.set_caption(f"FPS: {fps:.2f} / {ms:.1f}ms / drawn {stats['drawn']} culled {stats['culled']}")
 
             self.cameraMovement(dt)
             self.update(dt)
 
+            # the data every pass shares, the cascades follow the camera
+            self.sun.updateCascades(self.camera, self.shadow_map_size)
+            self.frameUniforms.update(self.camera, self.sun, current_time())
+
             # MAIN DRAW LOOP
             self.shadow_map()
             self.camera_depth()
 
             # draw scene with post processing
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-            self.postprocessing.before_draw(self.depthMap, self.sun, self.camera, self.cameraDepthMap)
+            self.postprocessing.before_draw(self.depthMap, self.sun, self.cameraDepthMap)
             glViewport(0, 0, self.width, self.height)
 
             self.draw_scene(lit_shader)
 
-            grass_field.draw(grass_shader, current_time(), False, self.debugview)
-            tree_field.draw(grass_shader, current_time(), False, self.debugview)
-            fern_field.draw(grass_shader, current_time(), False, self.debugview)
-            water.draw(water_shader, self.camera, current_time(), self.sun)
+            grass_field.draw(grass_shader, False, self.debugview)
+            tree_field.draw(grass_shader, False, self.debugview)
+            fern_field.draw(grass_shader, False, self.debugview)
+            water.draw(water_shader)
 
-            self.skybox.draw(skybox_shader, self.camera, self.sun)
+            self.skybox.draw(skybox_shader)
             self.postprocessing.after_draw()
 
             # refreshing
@@ -542,12 +551,13 @@ class Scene:
             for mesh_name in scene_data["Meshes"]:
                 mesh_data = scene_data["Meshes"][mesh_name]
                 
-                mesh = blender.load_mesh(mesh_data["path"])
+                mesh = blender.load_mesh(mesh_data["path"], lods=mesh_data.get("lods", 0), optimize=mesh_data.get("optimize", True), measure=mesh_data.get("measureACMR", False))
                 mesh.name = mesh_name
                 
                 mat_name = mesh_data["material"]
                 mesh.set_material(materials[mat_name])
 
+                mesh.transform = self.transforms.add()
                 mesh.transform.position = mesh_data["position"]
 
                 rotX, rotY, rotZ = mesh_data["rotation"]
@@ -576,6 +586,18 @@ class Scene:
                         program(mesh)
 
                 self.meshes.append(mesh)
+
+            # parents are assigned once all meshes exist, so the order of the meshes in the file doesn't matter,
+            # a parent is the name of another mesh or "sun" for the sun
+            for mesh_name, mesh_data in scene_data["Meshes"].items():
+                if "parent" in mesh_data:
+                    parent_name = mesh_data["parent"]
+                    parent = self.sun if parent_name == "sun" else self.get_mesh(parent_name)
+
+                    if parent is None:
+                        raise ValueError(f"Parent {parent_name} of {mesh_name} not found in the scene")
+
+                    self.get_mesh(mesh_name).transform.parent = parent.transform
                 
 
 def current_time():
@@ -588,61 +610,78 @@ def current_time():
     return time.time() - start_time
 
 
-scene = Scene()
-
-# initialize basic shaders
-shadow_map_shader = Shader.Shader("shaders/shadow_map/shadow_vertex.glsl", "shaders/shadow_map/shadow_fragment.glsl")
-lit_shader = Shader.Shader("shaders/basic/vertex.glsl", "shaders/basic/fragment.glsl")
-skybox_shader = Shader.Shader("shaders/skybox/vertex.glsl", "shaders/skybox/fragment.glsl")
-postprocess_shader = Shader.Shader("shaders/postprocess/vertex.glsl", "shaders/postprocess/fragment.glsl")
-camera_depth_shader = Shader.Shader("shaders/camera/camera_depth_vertex.glsl", "shaders/camera/camera_depth_fragment.glsl")
-grass_shader = Shader.Shader("shaders/grass/vertex.glsl", "shaders/grass/fragment.glsl")
-shadow_map_trees_shader = Shader.Shader("shaders/grass/vertex.glsl", "shaders/shadow_map/shadow_fragment.glsl")
-water_shader = Shader.Shader("shaders/water/vertex.glsl", "shaders/water/fragment.glsl")
-
-scene.postprocessing = PostProcessing(postprocess_shader, scene.width, scene.height)
-
-scene.load_scene("scene.yaml")
-
-# calculated manually inside perlin noise generator for a given seed.
-worldYBounds = np.array([-40.0, 22.067507434821415])
-
-grass_field = InstancedField()
-grass_field.setup(scene.camera, 
-                  scene.sun,
-                  worldYBounds,
-                  blender.load_mesh("models/jungle/grass_high.obj"),
-                  Texture.Load("textures/grass/color.jpg"),
-                  Texture.Load("textures/grass/opacity.jpg"),
-                  Texture.Load("textures/grass/normal.png"),
-                  500_000, 0.5)
-
-grass_field.shadowMap = scene.depthMap
-
-tree_field = InstancedField()
-tree_field.setup(scene.camera,
-                    scene.sun,
-                    worldYBounds,
-                    blender.load_mesh("models/jungle/tree_low.obj"),
-                    Texture.Load("textures/tree/tree_albedo.png"),
-                    None,
-                    Texture.Load("textures/tree/tree_normal.png"),
-                    25, 0.5)
-
-tree_field.shadowMap = scene.depthMap
-
-fern_field = InstancedField()
-fern_field.setup(scene.camera,
-                    scene.sun,
-                    worldYBounds,
-                    blender.load_mesh("models/jungle/fern.obj"),
-                    Texture.Load("textures/Fern/color.jpg"),
-                    Texture.Load("textures/Fern/opacity.jpg"),
-                    Texture.Load("textures/Fern/normal.png"),
-                    1_000, 0.5)
-
-fern_field.shadowMap = scene.depthMap
-
-water = Water(np.array([0, -2, 0]), np.array([200,200,200]), scene.skybox)
-
-scene.run()
\ No newline at end of file
+# worker processes of blender.load_meshes import this file, only the main process runs the application
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    pygame.init()
+
+    # meshes are loaded in worker processes before the window exists, they are uploaded when first drawn
+    grass_mesh, tree_mesh, fern_mesh = blender.load_meshes([
+        ("models/jungle/grass_high.obj", 0),
+        ("models/jungle/tree_low.obj", 3),
+        ("models/jungle/fern.obj", 0),
+    ])
+
+    # the instanced vegetation is drawn hundreds of thousands of times, its vertices are fetched in the 16 byte format
+    for mesh in (grass_mesh, tree_mesh, fern_mesh):
+        mesh.compact = True
+
+    scene = Scene()
+
+    # initialize basic shaders
+    shadow_map_shader = Shader.Shader("shaders/shadow_map/shadow_vertex.glsl", "shaders/shadow_map/shadow_fragment.glsl")
+    lit_shader = Shader.Shader("shaders/basic/vertex.glsl", "shaders/basic/fragment.glsl")
+    skybox_shader = Shader.Shader("shaders/skybox/vertex.glsl", "shaders/skybox/fragment.glsl")
+    postprocess_shader = Shader.Shader("shaders/postprocess/vertex.glsl", "shaders/postprocess/fragment.glsl")
+    camera_depth_shader = Shader.Shader("shaders/camera/camera_depth_vertex.glsl", "shaders/camera/camera_depth_fragment.glsl")
+    grass_shader = Shader.Shader("shaders/grass/vertex.glsl", "shaders/grass/fragment.glsl")
+    shadow_map_trees_shader = Shader.Shader("shaders/grass/vertex.glsl", "shaders/shadow_map/shadow_fragment.glsl")
+    water_shader = Shader.Shader("shaders/water/vertex.glsl", "shaders/water/fragment.glsl")
+
+    scene.postprocessing = PostProcessing(postprocess_shader, scene.width, scene.height)
+
+    scene.load_scene("scene.yaml")
+
+    # calculated manually inside perlin noise generator for a given seed.
+    worldYBounds = np.array([-40.0, 22.067507434821415])
+
+    grass_field = InstancedField()
+    grass_field.setup(scene.camera, 
+                      scene.sun,
+                      worldYBounds,
+                      grass_mesh,
+                      Texture.Load("textures/grass/color.jpg"),
+                      Texture.Load("textures/grass/opacity.jpg"),
+                      Texture.Load("textures/grass/normal.png"),
+                      500_000, 0.5)
+
+    grass_field.shadowMap = scene.depthMap
+
+    tree_field = InstancedField()
+    tree_field.setup(scene.camera,
+                        scene.sun,
+                        worldYBounds,
+                        tree_mesh,
+                        Texture.Load("textures/tree/tree_albedo.png"),
+                        None,
+                        Texture.Load("textures/tree/tree_normal.png"),
+                        25, 0.5)
+
+    tree_field.shadowMap = scene.depthMap
+
+    fern_field = InstancedField()
+    fern_field.setup(scene.camera,
+                        scene.sun,
+                        worldYBounds,
+                        fern_mesh,
+                        Texture.Load("textures/Fern/color.jpg"),
+                        Texture.Load("textures/Fern/opacity.jpg"),
+                        Texture.Load("textures/Fern/normal.png"),
+                        1_000, 0.5)
+
+    fern_field.shadowMap = scene.depthMap
+
+    water = Water(np.array([0, -2, 0]), np.array([200,200,200]), scene.skybox)
+
+    scene.run()
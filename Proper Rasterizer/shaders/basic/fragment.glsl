@@ -4,32 +4,21 @@ in vec3 FragPos;
 in vec3 Normal;
 in vec2 TexCoords;
 
-in vec4 FragPosLightSpace;
-
 out vec4 FragColor;
 
 in mat3 TBN;
 
-uniform float time;
-
 uniform sampler2D _MainTex;
 uniform sampler2D _RoughnessMap;
 uniform sampler2D _NormalMap;
 
 uniform samplerCube _Skybox;
 
-uniform sampler2D shadowMap;
+#include "../common/shadows.glsl"
 
 uniform vec2 tiling = vec2(1.0, 1.0);
 uniform vec2 tiling_speed = vec2(0.0, 0.0);
 
-uniform vec3 lightPos;
-uniform vec3 lightDir;
-uniform vec3 sunColor;
-
-uniform vec3 camPos;
-uniform vec3 camFwd;
-
 // material properties
 uniform float Ka; // ambient
 uniform float Kd; // diffuse
@@ -39,8 +28,6 @@ uniform float Ns; // shininess (specular exponent)
 uniform float metallic; // refraction index
 
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
 
 in vec3 fragWorldPos;
 
@@ -52,23 +39,24 @@ float random21(vec2 p){
     return fract(sin(dot(p, vec2(12.9898, 78.233))) * 43758.5453);
 }
 
-float shadowCalc(float dotLightNormal, vec2 offset){
+float shadowCalc(vec4 pos, float dotLightNormal, vec2 offset){
     float bias = max(0.05 * (1.0 - dotLightNormal), 0.005);
-    vec3 pos = FragPosLightSpace.xyz * 0.5 + 0.5;
+    if (pos.w < 0.0) return 1.0;
     if (pos.z > 1.0) return SHADOW_ALPHA;
-    float depth = texture(shadowMap, pos.xy + offset).r;
+    float depth = texture(shadowMap, vec3(pos.xy + offset, pos.w)).r;
     return depth + bias < pos.z ? SHADOW_ALPHA : 1.0;
 }
 
 float softShadows(float dotLightNormal){
-    vec2 texelSize = 1.0 / textureSize(shadowMap, 0);
+    vec4 pos = shadowCoordinates(fragWorldPos, -(view * vec4(fragWorldPos, 1.0)).z);
+    vec2 texelSize = 1.0 / textureSize(shadowMap, 0).xy;
     float shadow = 0.0;
     
     int size = 2;
     for (int x = -size; x <= size; ++x){
         for (int y = -size; y <= size; ++y){
             vec2 offset = vec2(x, y) * texelSize;
-            shadow += shadowCalc(dotLightNormal, offset);
+            shadow += shadowCalc(pos, dotLightNormal, offset);
         }
     }
     shadow /= (float(size) * 2.0 + 1.0) * (float(size) * 2.0 + 1.0);
@@ -1,34 +1,32 @@
 #version 330 core
 
-layout (location=0) in vec3 vPos;
-layout (location=1) in vec3 vNormal;
-layout (location=2) in vec2 vTexCoords;
-layout (location=3) in vec3 tangent;
-layout (location=4) in vec3 bitangent;
-
-uniform float time;
+#include "../common/vertex_format.glsl"
+#include "../common/frame.glsl"
 
 out vec3 FragPos;
 out vec2 TexCoords;
 out vec3 Normal;
-out vec4 FragPosLightSpace;
 
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
-uniform mat4 lightSpaceMatrix; // world space -> light space
+uniform mat3 normalMatrix; // transpose(inverse(mat3(model))), cached on the CPU
 
 out vec3 fragWorldPos;
 
 out mat3 TBN;
 
 void main(){
+    vec3 vPos = meshPosition();
+    vec3 vNormal = meshNormal();
+    vec2 vTexCoords = vertexUV;
+    vec3 tangent = meshTangent();
+    vec3 bitangent = meshBitangent();
+
     fragWorldPos = vec3(model * vec4(vPos, 1.0));
 
     FragPos = vec3(model * vec4(vPos, 1.0));
     TexCoords = vTexCoords;
 
-    mat3 modelVector = transpose(inverse(mat3(model)));
+    mat3 modelVector = normalMatrix;
 
     vec3 T = normalize(modelVector * tangent);
     vec3 B = normalize(modelVector * bitangent);
@@ -38,6 +36,5 @@ void main(){
 
     Normal = N;
 
-    FragPosLightSpace = lightSpaceMatrix * vec4(FragPos, 1.0);
     gl_Position = projection * view * model * vec4(vPos, 1.0);
 }
\ No newline at end of file
@@ -1,12 +1,11 @@
 #version 330 core
 
-layout (location = 0) in vec3 aPos;
+#include "../common/vertex_format.glsl"
+#include "../common/frame.glsl"
 
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
 
 void main(){
     // calculate camera depth
-    gl_Position = projection * view * model * vec4(aPos, 1.0);
+    gl_Position = projection * view * model * vec4(meshPosition(), 1.0);
 }
\ No newline at end of file
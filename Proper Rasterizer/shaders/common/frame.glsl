@@ -0,0 +1,28 @@
+#ifndef FRAME_GLSL
+#define FRAME_GLSL
+
+// data shared by every draw of a frame, uploaded once per frame by FrameUniforms
+// the layout has to match FRAME_DTYPE in Shader.py, CASCADE_COUNT is defined by Shader.Load
+
+// the matrices are uploaded straight from numpy, which stores them row by row
+layout (std140, row_major) uniform Frame {
+    mat4 view;
+    mat4 projection;
+    mat4 inverseView;
+    mat4 inverseProjection;
+
+    mat4 lightSpaceMatrices[CASCADE_COUNT]; // world space -> light space of each cascade
+    float cascadeSplits[CASCADE_COUNT]; // the view distance each cascade reaches to
+
+    vec3 camPos;
+    float time;
+    vec3 camFwd;
+    vec3 camUp;
+    vec3 camRight;
+
+    vec3 lightPos;
+    vec3 lightDir; // normalized, from the sun towards the origin
+    vec3 sunColor;
+};
+
+#endif
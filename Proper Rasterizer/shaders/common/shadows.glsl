@@ -0,0 +1,17 @@
+// cascaded shadow map of the sun, see Light.updateCascades
+// the cascades are part of the frame uniforms
+
+#include "frame.glsl"
+
+uniform sampler2DArray shadowMap; // one layer per cascade
+
+// xy = shadow map uv, z = depth in light space, w = layer of the cascade, or -1 past the last cascade
+vec4 shadowCoordinates(vec3 worldPos, float viewDepth){
+    int cascade = 0;
+    while (cascade < CASCADE_COUNT && viewDepth > cascadeSplits[cascade]) cascade++;
+
+    if (cascade == CASCADE_COUNT) return vec4(0.0, 0.0, 0.0, -1.0);
+
+    vec4 lightSpacePos = lightSpaceMatrices[cascade] * vec4(worldPos, 1.0);
+    return vec4(lightSpacePos.xyz / lightSpacePos.w * 0.5 + 0.5, float(cascade));
+}
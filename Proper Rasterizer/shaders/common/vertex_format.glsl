@@ -0,0 +1,40 @@
+// vertex attributes of Mesh, see ATTRIBUTE_LOCATIONS and COMPACT_DTYPE in Mesh.py
+// float meshes fill locations 0-4, compact meshes fill 0, 2 and 5, Mesh.draw sets the constant locations 6 and 7
+
+layout (location = 0) in vec4 vertexPosition; // w is the bitangent sign in the compact format
+layout (location = 1) in vec3 vertexNormal;
+layout (location = 2) in vec2 vertexUV;
+layout (location = 3) in vec3 vertexTangent;
+layout (location = 4) in vec3 vertexBitangent;
+layout (location = 5) in vec4 vertexOctahedral; // octahedral normal in xy, tangent in zw
+
+layout (location = 6) in vec4 vertexDecodeScale; // w is 1 for compact meshes
+layout (location = 7) in vec3 vertexDecodeOffset;
+
+vec3 octahedralDecode(vec2 encoded){
+    vec3 v = vec3(encoded, 1.0 - abs(encoded.x) - abs(encoded.y));
+    float fold = max(-v.z, 0.0);
+    v.x += v.x >= 0.0 ? -fold : fold;
+    v.y += v.y >= 0.0 ? -fold : fold;
+    return normalize(v);
+}
+
+bool meshIsCompact(){
+    return vertexDecodeScale.w > 0.5;
+}
+
+vec3 meshPosition(){
+    return vertexPosition.xyz * vertexDecodeScale.xyz + vertexDecodeOffset;
+}
+
+vec3 meshNormal(){
+    return meshIsCompact() ? octahedralDecode(vertexOctahedral.xy) : vertexNormal;
+}
+
+vec3 meshTangent(){
+    return meshIsCompact() ? octahedralDecode(vertexOctahedral.zw) : vertexTangent;
+}
+
+vec3 meshBitangent(){
+    return meshIsCompact() ? cross(meshNormal(), meshTangent()) * vertexPosition.w : vertexBitangent;
+}
@@ -2,18 +2,15 @@
 
 out vec4 FragColor;
 
-uniform vec3 sunPosition;
-uniform vec3 sunDirection;
-uniform vec3 sunColor;
-
 uniform sampler2D albedoMap;
 uniform sampler2D opacityMap;
 uniform sampler2D heightMap;
-uniform sampler2D shadowMap;
 uniform sampler2D normalMap;
 
 uniform bool useOpacityMap;
 
+#include "../common/shadows.glsl"
+
 // 0 = default
 // 1 = normal view
 // 2 = shadow view
@@ -29,8 +26,6 @@ flat in int m_ID;
 
 in mat3 TBN;
 
-in vec3 lightFragPos;
-
 in float mapHeight;
 
 #define PHI 1.6180339887498948482045868343656381177203091798057628621354486227052604628189024497072072041893911374
@@ -39,23 +34,24 @@ in float mapHeight;
 
 #define SHADOW_ALPHA 0.2
 
-float shadowCalc(float dotLightNormal, vec2 offset){
+float shadowCalc(vec4 pos, float dotLightNormal, vec2 offset){
     float bias = max(0.05 * (1.0 - dotLightNormal), 0.005);
-    vec3 pos = lightFragPos.xyz * 0.5 + 0.5;
+    if (pos.w < 0.0) return 1.0;
     if (pos.z > 1.0) return SHADOW_ALPHA;
-    float depth = texture(shadowMap, pos.xy + offset).r;
+    float depth = texture(shadowMap, vec3(pos.xy + offset, pos.w)).r;
     return depth + bias < pos.z ? SHADOW_ALPHA : 1.0;
 }
 
 float softShadows(float dotLightNormal){
-    vec2 texelSize = 1.0 / textureSize(shadowMap, 0);
+    vec4 pos = shadowCoordinates(position, -(view * vec4(position, 1.0)).z);
+    vec2 texelSize = 1.0 / textureSize(shadowMap, 0).xy;
     float shadow = 0.0;
     
     int size = 2;
     for (int x = -size; x <= size; ++x) {
         for (int y = -size; y <= size; ++y) {
             vec2 offset = vec2(x,y) * texelSize; //random21(vec2(x, y)) * texelSize;
-            float pcfDepth = shadowCalc(dotLightNormal, offset);
+            float pcfDepth = shadowCalc(pos, dotLightNormal, offset);
             shadow += pcfDepth;
         }
     }
@@ -109,7 +105,7 @@ void main(){
     vec3 albedo = texture(albedoMap, uv).rgb;
     float opacity = texture(opacityMap, uv).r;
 
-    float lighting = max(0.0, dot(normal, -normalize(sunDirection)));
+    float lighting = max(0.0, dot(normal, -lightDir));
 
     float shadow = softShadows(lighting);
 
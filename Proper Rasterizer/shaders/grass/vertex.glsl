@@ -1,22 +1,15 @@
 #version 330 core
 
-layout (location = 0) in vec3 inPosition;
-layout (location = 1) in vec2 vUV;
-layout (location = 2) in vec3 inNormal;
-layout (location = 3) in vec3 tangent;
-layout (location = 4) in vec3 bitangent;
-
-uniform mat4 projection;
-uniform mat4 view;
+#include "../common/vertex_format.glsl"
+#include "../common/frame.glsl"
 
 uniform sampler2D heightMap;
 
-uniform mat4 lightSpaceMatrix;
+uniform mat4 lightSpaceMatrix; // the cascade the shadow map pass renders
 uniform bool isShadowMap;
 
 uniform vec2 worldYBounds;
 
-uniform float time;
 uniform float spawnRadius;
 
 mat4 model;
@@ -27,7 +20,6 @@ out vec3 Normal;
 
 out mat3 TBN;
 
-out vec3 lightFragPos;
 
 flat out int m_ID;
 
@@ -135,6 +127,12 @@ vec2 randomInsideCircle(float radius, vec2 id){
 out float mapHeight;
 
 void main(){
+    vec3 inPosition = meshPosition();
+    vec3 inNormal = meshNormal();
+    vec2 vUV = vertexUV;
+    vec3 tangent = meshTangent();
+    vec3 bitangent = meshBitangent();
+
     vec2 id = vec2(gl_InstanceID * E * E, gl_InstanceID * PI);
 
     float size = 400.0;
@@ -201,6 +199,4 @@ void main(){
     TBN = mat3(T, B, N);
 
     Normal = N;
-
-    lightFragPos = vec3(lightSpaceMatrix * worldPos);
 }
\ No newline at end of file
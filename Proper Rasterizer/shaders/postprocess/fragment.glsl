@@ -1,24 +1,8 @@
 #version 330 core
 
 uniform sampler2D screenTexture;
-uniform sampler2D shadowMap;
 uniform sampler2D cameraDepthMap;
 
-uniform vec3 lightPos;
-uniform vec3 lightDir;
-
-uniform vec3 camPos;
-uniform vec3 camFwd;
-uniform vec3 camUp;
-uniform vec3 camRight;
-
-uniform mat4 projection;
-uniform mat4 view;
-
-uniform vec3 sunColor;
-
-uniform float time;
-
 #define USE_ACES 1
 #define USE_VIGNETTE 1
 
@@ -38,10 +22,8 @@ uniform float time;
 #define PI 3.1415926535897932384626433832795
 
 in vec2 Position;
-in vec4 FragPosLightSpace;
 
-uniform mat4 lightModel;
-uniform mat4 lightSpaceMatrix;
+#include "../common/shadows.glsl"
 
 out vec4 FragColor;
 
@@ -61,27 +43,25 @@ vec3 getWorldPosition(vec2 TexCoord){
     float z = depth * 2.0 - 1.0;
 
     vec4 clipSpacePosition = vec4(TexCoord * 2.0 - 1.0, z, 1.0);
-    vec4 viewSpacePosition = inverse(projection) * clipSpacePosition;
+    vec4 viewSpacePosition = inverseProjection * clipSpacePosition;
 
     viewSpacePosition /= viewSpacePosition.w;
 
-    vec4 worldSpacePosition = inverse(view) * viewSpacePosition;
+    vec4 worldSpacePosition = inverseView * viewSpacePosition;
 
     return worldSpacePosition.xyz;
 }
 
 float worldToShadow(vec3 worldPos){
     // returns if world position is in shadow
-    vec4 lightSpacePos = lightSpaceMatrix * vec4(worldPos, 1.0);
-    lightSpacePos /= lightSpacePos.w;
-
-    lightSpacePos = lightSpacePos * 0.5 + 0.5;
+    vec4 lightSpacePos = shadowCoordinates(worldPos, -(view * vec4(worldPos, 1.0)).z);
+    if (lightSpacePos.w < 0.0) return 1.0;
 
     float shadow = 1.0;
 
     float bias = 0.005;
 
-    float closestDepth = texture(shadowMap, lightSpacePos.xy).r;
+    float closestDepth = texture(shadowMap, lightSpacePos.xyw).r;
     float currentDepth = lightSpacePos.z;
 
     if(currentDepth - bias > closestDepth){
@@ -1,10 +1,10 @@
 #version 330 core
 
-layout (location=0) in vec3 aPos;
+#include "../common/vertex_format.glsl"
 
 uniform mat4 model;
 uniform mat4 lightSpaceMatrix;
 
 void main(){
-    gl_Position = lightSpaceMatrix * model * vec4(aPos, 1.0);
+    gl_Position = lightSpaceMatrix * model * vec4(meshPosition(), 1.0);
 }
\ No newline at end of file
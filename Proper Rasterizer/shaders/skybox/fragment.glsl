@@ -4,9 +4,9 @@ out vec4 FragColor;
 
 in vec3 texCoords;
 
-uniform samplerCube skybox;
+#include "../common/frame.glsl"
 
-uniform vec3 sunColor;
+uniform samplerCube skybox;
 
 void main(){
     vec3 color = texture(skybox, texCoords).rgb * sunColor;
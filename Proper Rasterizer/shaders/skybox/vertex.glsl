@@ -1,14 +1,14 @@
 #version 330 core
 
-layout (location = 0) in vec3 aPos;
+#include "../common/vertex_format.glsl"
+#include "../common/frame.glsl"
 
 out vec3 texCoords;
 
-uniform mat4 projection;
-uniform mat4 view;
-
 void main(){
-    vec4 pos = projection * view * vec4(aPos, 1.0);
+    vec3 aPos = meshPosition();
+    // the skybox stays centered on the camera, only the rotation of the view is used
+    vec4 pos = projection * mat4(mat3(view)) * vec4(aPos, 1.0);
     gl_Position = pos.xyww;
     texCoords = vec3(aPos.x, aPos.y, aPos.z);
 }
\ No newline at end of file
@@ -6,12 +6,12 @@ layout (location=1) in vec3 vFragColor;
 out vec3 Position;
 out vec3 FragColor;
 
+#include "../common/frame.glsl"
+
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
 
 void main(){
-    gl_Position = transpose(projection) * transpose(view) * transpose(model) * vec4(vPos, 1.0);
+    gl_Position = projection * view * transpose(model) * vec4(vPos, 1.0);
 
     Position = vPos;
     FragColor = vFragColor;
@@ -5,11 +5,7 @@ in vec3 Position;
 in vec3 Normal;
 in vec2 TexCoord;
 
-uniform vec3 sunPos;
-uniform vec3 sunDir;
-
-uniform vec3 camPos;
-uniform vec3 camFwd;
+#include "../common/frame.glsl"
 
 uniform sampler2D albedo;
 uniform samplerCube _Skybox;
@@ -18,6 +14,9 @@ uniform sampler2D heightMap;
 out vec4 FragColor;
 
 void main(){
+    // the direction towards the origin, not normalized, the refraction below depends on its length
+    vec3 sunDir = -lightPos;
+
     float diffuse = max(dot(Normal, normalize(-sunDir)), 0.0);
 
     // shallow = 84e4f1
@@ -25,7 +24,9 @@ void main(){
     vec3 shallow = vec3(0.52, 0.89, 0.94);
     vec3 deep = vec3(0.14, 0.38, 0.53);
 
-    vec3 viewDir = normalize(camPos - Position);
+    // the water was tuned with the camera's transform position, which is the negated world position,
+    // so the reflections keep their look with the shared frame uniforms
+    vec3 viewDir = normalize(-camPos - Position);
     // refract water and use albedo as color
     //vec3 refracted = refract(viewDir, Normal, 1.33);
     //vec3 color = texture(albedo, refracted.xy * 0.5 + 0.5).rgb;
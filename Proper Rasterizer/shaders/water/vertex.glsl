@@ -1,18 +1,15 @@
 #version 330 core
 
-layout (location = 0) in vec3 aPos;
-layout (location = 1) in vec2 aTexCoord;
+#include "../common/vertex_format.glsl"
+#include "../common/frame.glsl"
 
 uniform mat4 model;
-uniform mat4 view;
-uniform mat4 projection;
 
 out vec3 Position;
 out vec2 TexCoord;
 out vec3 Normal;
 
 // gerstner waves
-uniform float time;
 
 #define PI 3.1415926535897932384626433832795
 
@@ -53,7 +50,7 @@ vec4 MultipleGertsnerWaves(vec3 worldPos, float time){
 }
 
 void main(){
-    vec4 worldPos = model * vec4(aPos, 1.0);
+    vec4 worldPos = model * vec4(meshPosition(), 1.0);
     
     vec4 wave = MultipleGertsnerWaves(worldPos.xyz, time);
     worldPos.y += wave.w;
@@ -62,5 +59,5 @@ void main(){
 
     Position = worldPos.xyz;
     Normal = normalize(wave.xyz);
-    TexCoord = aTexCoord;
+    TexCoord = vertexUV;
 }
\ No newline at end of file
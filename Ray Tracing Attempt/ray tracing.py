@@ -3,11 +3,17 @@ import numpy
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
+import os
+import sys
+
+# the shader class with uniform reflection is shared with the rasterizer
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Proper Rasterizer"))
+
+from Shader import Shader
+
 import time
 import math
 
-from OpenGL.GL.shaders import compileShader, compileProgram
-
 start_time = time.time()
 
 def get_time():
@@ -128,12 +134,12 @@ class RayTracer:
         cameraFwd = self.cameraT.forward()
         cameraRight = self.cameraT.right()
 
-        glUniform1f(glGetUniformLocation(self.shader.program, "time"), get_time())
-        glUniform2f(glGetUniformLocation(self.shader.program, "resolution"), self.width, self.height)
+        self.shader.setFloat("time", get_time())
+        self.shader.setFloat("resolution", (self.width, self.height))
         
-        glUniform3f(glGetUniformLocation(self.shader.program, "cameraPos"), cameraPos[0], cameraPos[1], cameraPos[2])
-        glUniform3f(glGetUniformLocation(self.shader.program, "cameraFwd"), cameraFwd[0], cameraFwd[1], cameraFwd[2])
-        glUniform3f(glGetUniformLocation(self.shader.program, "cameraRight"), cameraRight[0], cameraRight[1], cameraRight[2])
+        self.shader.setFloat("cameraPos", cameraPos)
+        self.shader.setFloat("cameraFwd", cameraFwd)
+        self.shader.setFloat("cameraRight", cameraRight)
 
     def draw(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -154,33 +160,6 @@ class RayTracer:
 
         pygame.display.flip()
 
-class Shader:
-    def __init__(self, vertexFile, fragmentFile):
-        with open(vertexFile, "r") as f:
-            vertexSource = f.read()
-
-        with open(fragmentFile, "r") as f:
-            fragmentSource = f.read()
-
-        vertexShader = compileShader(vertexSource, GL_VERTEX_SHADER)
-        fragmentShader = compileShader(fragmentSource, GL_FRAGMENT_SHADER)
-        
-        # see if there are any errors
-        vCompileStatus = glGetShaderiv(vertexShader, GL_COMPILE_STATUS)
-        if vCompileStatus != GL_TRUE:
-            print(glGetShaderInfoLog(vertexShader))
-            raise Exception("Vertex shader compilation failed.")
-
-        fCompileStatus = glGetShaderiv(fragmentShader, GL_COMPILE_STATUS)
-        if fCompileStatus != GL_TRUE:
-            print(glGetShaderInfoLog(fragmentShader))
-            raise Exception("Fragment shader compilation failed.")
-
-        self.program = compileProgram(vertexShader, fragmentShader)
-
-    def use(self):
-        glUseProgram(self.program)
-
 if __name__ == "__main__":
     rt = RayTracer()
     rt.run()